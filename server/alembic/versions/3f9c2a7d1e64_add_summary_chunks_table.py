@@ -0,0 +1,40 @@
+"""add summary_chunks table
+
+Revision ID: 3f9c2a7d1e64
+Revises: be957960ff0b
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2a7d1e64'
+down_revision: Union[str, None] = 'be957960ff0b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('summary_chunks',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('summary_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('chunk_index', sa.Integer(), nullable=False),
+    sa.Column('first_page', sa.Integer(), nullable=False),
+    sa.Column('last_page', sa.Integer(), nullable=False),
+    sa.Column('source_hash', sa.String(length=64), nullable=False),
+    sa.Column('summarized_text', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['summary_id'], ['summaries.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('summary_id', 'source_hash', name='uq_summary_chunks_summary_hash')
+    )
+    op.create_index(op.f('ix_summary_chunks_summary_id'), 'summary_chunks', ['summary_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_summary_chunks_summary_id'), table_name='summary_chunks')
+    op.drop_table('summary_chunks')
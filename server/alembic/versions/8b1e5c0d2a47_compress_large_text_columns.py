@@ -0,0 +1,90 @@
+"""compress large text columns
+
+Revision ID: 8b1e5c0d2a47
+Revises: 3f9c2a7d1e64
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Callable, Dict, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.types import compress_text, decompress_text
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b1e5c0d2a47'
+down_revision: Union[str, None] = '3f9c2a7d1e64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 1回の読み込み・更新で処理する行数
+BATCH_SIZE = 500
+
+# テーブル -> {列名: NULL許可}
+COLUMNS: Dict[str, Dict[str, bool]] = {
+    'summaries': {'original_text': False, 'summarized_text': False},
+    'images': {'ocr_text': True},
+}
+
+
+def _convert_table(table: str, columns: Dict[str, bool], new_type, convert: Callable) -> None:
+    """列を新しい型の一時列に変換してから置き換える
+
+    行はID順にBATCH_SIZE件ずつ読み込み、変換して書き戻す。
+    """
+    with op.batch_alter_table(table) as batch:
+        for name in columns:
+            batch.add_column(sa.Column(f'{name}_new', new_type, nullable=True))
+
+    t = sa.table(
+        table,
+        sa.column('id'),
+        *[sa.column(name) for name in columns],
+        *[sa.column(f'{name}_new') for name in columns],
+    )
+    update = (
+        t.update()
+        .where(t.c.id == sa.bindparam('_id'))
+        .values({f'{name}_new': sa.bindparam(f'_{name}') for name in columns})
+    )
+
+    bind = op.get_bind()
+    last_id = None
+    while True:
+        query = sa.select(t.c.id, *[t.c[name] for name in columns]).order_by(t.c.id).limit(BATCH_SIZE)
+        if last_id is not None:
+            query = query.where(t.c.id > last_id)
+        rows = bind.execute(query).fetchall()
+        if not rows:
+            break
+        bind.execute(
+            update,
+            [
+                {
+                    '_id': row[0],
+                    **{
+                        f'_{name}': None if value is None else convert(value)
+                        for name, value in zip(columns, row[1:])
+                    },
+                }
+                for row in rows
+            ],
+        )
+        last_id = rows[-1][0]
+
+    with op.batch_alter_table(table) as batch:
+        for name, nullable in columns.items():
+            batch.drop_column(name)
+            batch.alter_column(f'{name}_new', new_column_name=name, nullable=nullable)
+
+
+def upgrade() -> None:
+    for table, columns in COLUMNS.items():
+        _convert_table(table, columns, sa.LargeBinary(), compress_text)
+
+
+def downgrade() -> None:
+    for table, columns in COLUMNS.items():
+        _convert_table(table, columns, sa.Text(), decompress_text)
@@ -0,0 +1,27 @@
+"""add summary generation key
+
+Revision ID: a6c2e9f4d8b3
+Revises: f5a9d3c7b1e2
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6c2e9f4d8b3'
+down_revision: Union[str, None] = 'f5a9d3c7b1e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('summaries', sa.Column('generation_key', sa.String(length=64), nullable=True))
+    op.add_column('summaries', sa.Column('generated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('summaries', 'generated_at')
+    op.drop_column('summaries', 'generation_key')
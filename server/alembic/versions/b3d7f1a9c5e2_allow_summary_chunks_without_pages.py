@@ -0,0 +1,32 @@
+"""allow summary_chunks without pages
+
+Revision ID: b3d7f1a9c5e2
+Revises: a6c2e9f4d8b3
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d7f1a9c5e2'
+down_revision: Union[str, None] = 'a6c2e9f4d8b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 全文の要約のチェックポイント（ページ境界で区切らないチャンク）はページ範囲を持たない
+    # SQLiteはALTER COLUMNに対応しないため、batchでテーブルを作り直す
+    with op.batch_alter_table('summary_chunks') as batch:
+        batch.alter_column('first_page', existing_type=sa.Integer(), nullable=True)
+        batch.alter_column('last_page', existing_type=sa.Integer(), nullable=True)
+
+
+def downgrade() -> None:
+    op.execute('DELETE FROM summary_chunks WHERE first_page IS NULL OR last_page IS NULL')
+    with op.batch_alter_table('summary_chunks') as batch:
+        batch.alter_column('last_page', existing_type=sa.Integer(), nullable=False)
+        batch.alter_column('first_page', existing_type=sa.Integer(), nullable=False)
@@ -0,0 +1,53 @@
+"""add summary search index
+
+Revision ID: c4d2e8f61a93
+Revises: 8b1e5c0d2a47
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d2e8f61a93'
+down_revision: Union[str, None] = '8b1e5c0d2a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# インデックスの内容はアプリケーションの起動時（インデックスが空の場合）に作成される
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS summary_search USING fts5("
+            "summary_id UNINDEXED, title, description, summarized_text, ocr_text, "
+            "tokenize = 'unicode61 remove_diacritics 0')"
+        )
+        op.execute(
+            "CREATE TABLE IF NOT EXISTS summary_search_ids ("
+            "doc_id INTEGER PRIMARY KEY, summary_id TEXT NOT NULL UNIQUE)"
+        )
+        return
+
+    op.execute(
+        "CREATE TABLE IF NOT EXISTS summary_search ("
+        "summary_id UUID PRIMARY KEY, "
+        "seq BIGSERIAL NOT NULL, "
+        "document TSVECTOR NOT NULL, "
+        "updated_at TIMESTAMP NOT NULL DEFAULT now())"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_summary_search_document "
+        "ON summary_search USING GIN (document)"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS summary_search_ids")
+    else:
+        op.execute("DROP INDEX IF EXISTS ix_summary_search_document")
+    op.execute("DROP TABLE IF EXISTS summary_search")
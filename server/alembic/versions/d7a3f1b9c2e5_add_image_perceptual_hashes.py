@@ -0,0 +1,39 @@
+"""add image perceptual hashes
+
+Revision ID: d7a3f1b9c2e5
+Revises: c4d2e8f61a93
+Create Date: 2026-10-19 15:00:00.000000
+
+既存の画像の知覚ハッシュはNULLのまま（近似重複の検索対象外）とする。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a3f1b9c2e5'
+down_revision: Union[str, None] = 'c4d2e8f61a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('images', sa.Column('dhash', sa.BigInteger(), nullable=True))
+    op.add_column('images', sa.Column('phash', sa.BigInteger(), nullable=True))
+    op.create_table('image_hash_bands',
+    sa.Column('image_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('band', sa.SmallInteger(), nullable=False),
+    sa.Column('value', sa.SmallInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['image_id'], ['images.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('image_id', 'band')
+    )
+    op.create_index('ix_image_hash_bands_band_value', 'image_hash_bands', ['band', 'value'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_image_hash_bands_band_value', table_name='image_hash_bands')
+    op.drop_table('image_hash_bands')
+    op.drop_column('images', 'phash')
+    op.drop_column('images', 'dhash')
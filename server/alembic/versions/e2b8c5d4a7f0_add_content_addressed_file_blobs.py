@@ -0,0 +1,39 @@
+"""add content addressed file blobs
+
+Revision ID: e2b8c5d4a7f0
+Revises: d7a3f1b9c2e5
+Create Date: 2026-10-19 18:00:00.000000
+
+既存の画像のファイルは以前の形式（UPLOAD_DIR/{summary_id}/{uuid}_{ファイル名}）のまま残し、
+content_hashはNULLとする（参照数の管理の対象外で、画像の削除時にファイルを直接削除する）。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b8c5d4a7f0'
+down_revision: Union[str, None] = 'd7a3f1b9c2e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('file_blobs',
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('file_path', sa.String(length=255), nullable=False),
+    sa.Column('file_size', sa.BigInteger(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('content_hash')
+    )
+    op.add_column('images', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_images_content_hash'), 'images', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_images_content_hash'), table_name='images')
+    op.drop_column('images', 'content_hash')
+    op.drop_table('file_blobs')
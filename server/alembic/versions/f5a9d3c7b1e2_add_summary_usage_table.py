@@ -0,0 +1,46 @@
+"""add summary usage table
+
+Revision ID: f5a9d3c7b1e2
+Revises: e2b8c5d4a7f0
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5a9d3c7b1e2'
+down_revision: Union[str, None] = 'e2b8c5d4a7f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('summary_usage',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('summary_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('run_id', sa.String(length=36), nullable=False),
+    sa.Column('chunk_index', sa.Integer(), nullable=True),
+    sa.Column('model', sa.String(length=255), nullable=False),
+    sa.Column('prompt_tokens', sa.Integer(), nullable=False),
+    sa.Column('completion_tokens', sa.Integer(), nullable=False),
+    sa.Column('cached_tokens', sa.Integer(), nullable=False),
+    sa.Column('cache_write_tokens', sa.Integer(), nullable=False),
+    sa.Column('cost', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['summary_id'], ['summaries.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_summary_usage_summary_id'), 'summary_usage', ['summary_id'], unique=False)
+    op.create_index(op.f('ix_summary_usage_run_id'), 'summary_usage', ['run_id'], unique=False)
+    op.create_index(op.f('ix_summary_usage_created_at'), 'summary_usage', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_summary_usage_created_at'), table_name='summary_usage')
+    op.drop_index(op.f('ix_summary_usage_run_id'), table_name='summary_usage')
+    op.drop_index(op.f('ix_summary_usage_summary_id'), table_name='summary_usage')
+    op.drop_table('summary_usage')
@@ -0,0 +1,202 @@
+"""アドミッション制御（同時実行数の制限）モジュール
+
+OCR・要約生成のように1リクエストでCPU・メモリ・AI APIを大きく使うエンドポイントの
+同時実行数をエンドポイントごとに制限する。上限に達している場合は先着順の待ち行列で待たせ、
+待ち行列が満杯の場合は429、待ち時間の上限を超えた場合は503を、いずれもRetry-After付きで返す。
+
+エンドポイントにはFastAPIの依存関係として追加する（パス操作関数の終了時に枠を解放する）::
+
+    @router.post("/generate", dependencies=[Depends(generate_limiter, scope="function")])
+
+制限はプロセスごと（ワーカー数が複数の場合は全体の上限がワーカー数倍になる）。
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Optional
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+from app.metrics import (
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_QUEUE_DEPTH,
+    ADMISSION_QUEUE_WAIT,
+    ADMISSION_REJECTED,
+)
+
+logger = logging.getLogger(__name__)
+
+# Retry-Afterの範囲（秒）
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 600
+
+# 処理時間の指数移動平均の重み（Retry-Afterの見積もりに使用）
+DURATION_SMOOTHING = 0.2
+
+
+class AdmissionLimiter:
+    """エンドポイントの同時実行数を制限するクラス
+
+    イベントループ上でのみ使用する（同期のパス操作関数でも、依存関係はイベントループで実行される）。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        max_queue: int,
+        queue_timeout: float,
+    ):
+        """
+        Args:
+            name: エンドポイント名（メトリクスのラベル・ログに使用）
+            max_concurrency: 同時実行数の上限（0以下の場合は制限しない）
+            max_queue: 実行待ちの最大数（0の場合は待たずに拒否する）
+            queue_timeout: 実行待ちの最大時間（秒）
+        """
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._average_duration: Optional[float] = None
+
+    @property
+    def active(self) -> int:
+        """実行中のリクエスト数"""
+        return self._active
+
+    @property
+    def waiting(self) -> int:
+        """実行待ちのリクエスト数"""
+        return len(self._waiters)
+
+    async def __call__(self) -> AsyncIterator[None]:
+        """FastAPIの依存関係として実行枠を確保し、終了時に解放する"""
+        await self.acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+
+    async def acquire(self) -> None:
+        """実行枠を確保する（空きがない場合は待ち行列で待つ）
+
+        Raises:
+            HTTPException: 待ち行列が満杯の場合（429）、待ち時間の上限を超えた場合（503）
+        """
+        if self.max_concurrency <= 0 or (self._active < self.max_concurrency and not self._waiters):
+            self._admit()
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self._reject("queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        ADMISSION_QUEUE_DEPTH.labels(self.name).set(len(self._waiters))
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            # 待ち時間の終了と同時に枠を譲られていた場合
+            if future.done() and not future.cancelled():
+                if isinstance(e, asyncio.CancelledError):
+                    self._hand_over()
+                    raise
+            elif isinstance(e, asyncio.TimeoutError):
+                self._reject("timeout")
+            else:
+                raise
+        finally:
+            if future in self._waiters:
+                self._waiters.remove(future)
+            ADMISSION_QUEUE_DEPTH.labels(self.name).set(len(self._waiters))
+            ADMISSION_QUEUE_WAIT.labels(self.name).observe(time.perf_counter() - start)
+
+    def release(self, duration: Optional[float] = None) -> None:
+        """実行枠を解放する（待っているリクエストがあれば先頭に譲る）
+
+        Args:
+            duration: 枠を確保していた時間（秒、Retry-Afterの見積もりに使用）
+        """
+        if duration is not None:
+            if self._average_duration is None:
+                self._average_duration = duration
+            else:
+                self._average_duration += DURATION_SMOOTHING * (duration - self._average_duration)
+        self._hand_over()
+
+    def _admit(self) -> None:
+        self._active += 1
+        ADMISSION_IN_FLIGHT.labels(self.name).set(self._active)
+
+    def _hand_over(self) -> None:
+        """実行中の枠を待ち行列の先頭に譲る（待っているリクエストがなければ解放する）"""
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                # 実行中の数はそのまま引き継ぐ
+                future.set_result(None)
+                return
+        self._active -= 1
+        ADMISSION_IN_FLIGHT.labels(self.name).set(self._active)
+
+    def retry_after(self) -> int:
+        """再試行までの目安（秒）
+
+        処理時間の移動平均から、待ち行列のリクエストがすべて実行されるまでの時間を見積もる。
+        まだ処理時間の記録がない場合は待ち時間の上限を使用する。
+        """
+        if self._average_duration is None:
+            estimate = self.queue_timeout
+        else:
+            rounds = (len(self._waiters) + 1) / max(self.max_concurrency, 1)
+            estimate = self._average_duration * rounds
+        return int(min(max(math.ceil(estimate), MIN_RETRY_AFTER), MAX_RETRY_AFTER))
+
+    def _reject(self, reason: str) -> None:
+        """リクエストを拒否する
+
+        Raises:
+            HTTPException: queue_fullの場合は429、timeoutの場合は503
+        """
+        ADMISSION_REJECTED.labels(self.name, reason).inc()
+        retry_after = self.retry_after()
+        logger.warning(
+            "同時実行数の上限により拒否: endpoint=%s, reason=%s, 実行中=%d, 待ち=%d, Retry-After=%d",
+            self.name, reason, self._active, len(self._waiters), retry_after,
+        )
+        if reason == "queue_full":
+            status_code = status.HTTP_429_TOO_MANY_REQUESTS
+            detail = "処理中のリクエストが多すぎます。しばらくしてから再試行してください。"
+        else:
+            status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+            detail = "処理の順番待ちがタイムアウトしました。しばらくしてから再試行してください。"
+        raise HTTPException(
+            status_code=status_code,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+# エンドポイントごとのインスタンス
+generate_limiter = AdmissionLimiter(
+    "summaries.generate",
+    max_concurrency=settings.GENERATE_MAX_CONCURRENCY,
+    max_queue=settings.GENERATE_MAX_QUEUE,
+    queue_timeout=settings.GENERATE_QUEUE_TIMEOUT,
+)
+
+ocr_limiter = AdmissionLimiter(
+    "ocr.process",
+    max_concurrency=settings.OCR_MAX_CONCURRENCY,
+    max_queue=settings.OCR_MAX_QUEUE,
+    queue_timeout=settings.OCR_QUEUE_TIMEOUT,
+)
@@ -0,0 +1,78 @@
+"""一括要約APIエンドポイントモジュール
+
+多数の書籍のOCRから要約までを1回の依頼で実行するAPIエンドポイントを提供する。
+"""
+
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import get_db
+from app.models import Summary
+from app.schemas import BatchRequest, BatchStatus
+from app.services.batch_service import batch_scheduler
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.post("", response_model=BatchStatus, status_code=status.HTTP_202_ACCEPTED)
+def start_batch(
+    request: BatchRequest,
+    db: Session = Depends(get_db),
+) -> dict:
+    """複数の書籍の要約を一括で開始する
+
+    書籍ごとにパイプラインジョブ（OCR→要約）を実行する。同時に処理する書籍数は
+    全バッチの合計でBATCH_MAX_RUNNINGまでとし、複数のバッチの間では1冊ずつ順番に開始する。
+
+    Args:
+        request: 一括要約リクエスト
+        db: データベースセッション
+
+    Returns:
+        開始したバッチのステータス
+    """
+    # 重複を除く（指定された順序を保つ）
+    summary_ids = list(dict.fromkeys(request.summary_ids))
+    if len(summary_ids) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"一度に指定できる要約は{settings.BATCH_MAX_ITEMS}件までです",
+        )
+
+    found = {
+        row.id for row in db.query(Summary.id).filter(Summary.id.in_(summary_ids))
+    }
+    missing = [str(summary_id) for summary_id in summary_ids if summary_id not in found]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"要約が見つかりません: {', '.join(missing)}",
+        )
+
+    batch_id = batch_scheduler.submit(summary_ids, request.custom_instructions)
+    logger.info(f"一括要約開始: batch_id={batch_id}, 書籍数={len(summary_ids)}")
+    return batch_scheduler.get_status(batch_id)
+
+
+@router.get("/{batch_id}", response_model=BatchStatus)
+def get_batch_status(batch_id: str) -> dict:
+    """一括要約のステータス（書籍ごとの状態と全体の進捗）を取得する
+
+    Args:
+        batch_id: バッチID
+
+    Returns:
+        バッチのステータス
+    """
+    batch_status = batch_scheduler.get_status(batch_id)
+    if batch_status is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"バッチID {batch_id} が見つかりません",
+        )
+    return batch_status
@@ -4,17 +4,28 @@
 """
 
 import logging
+import os
 import uuid
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, Query, status
+from fastapi.responses import Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.dependencies import verify_upload_size
+from app.exceptions import FileOperationError
 from app.models import Image, Summary
-from app.schemas import ImageList, ImageDetail, ImageBase
+from app.responses import FastJSONResponse
+from app.schemas import (
+    ImageList, ImageDetail, ImageDuplicate, ImageDuplicateList, ImageUploadResult
+)
 from app.services import file_service
+from app.services.duplicate_service import SCOPE_LIBRARY, SCOPE_SUMMARY, duplicate_service
+from app.services.image_hash import BAND_COUNT, PageHashes
+from app.services.thumbnail_service import thumbnail_service
+from app.static_files import cached_file_response
 from app.utils import get_or_404, get_optional, SummaryConstants
 
 logger = logging.getLogger(__name__)
@@ -22,14 +33,24 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-@router.post("/upload", response_model=List[ImageBase], status_code=status.HTTP_201_CREATED)
+# アップロード時に返す近似重複の最大件数（1ページあたり）
+UPLOAD_DUPLICATE_LIMIT = 5
+
+
+@router.post("/upload", response_model=List[ImageUploadResult], status_code=status.HTTP_201_CREATED)
 async def upload_images(
     files: List[UploadFile] = File(...),
     summary_id: Optional[uuid.UUID] = None,
     db: Session = Depends(get_db),
-) -> List[Image]:
+) -> List[ImageUploadResult]:
     """複数の書籍ページ画像をアップロードする
 
+    各ページの知覚ハッシュを計算し、ライブラリ内（同じアップロードの他のページを含む）の
+    近似重複をduplicatesとして返す。
+
+    データベースの操作とファイルの保存はスレッドプールで実行する（イベントループ上で
+    コネクションプールの空きを待つと、接続を返却する他のリクエストも進まなくなるため）。
+
     Args:
         files: アップロードするファイルのリスト
         summary_id: 関連付ける要約ID（省略時は一時的な要約を作成）
@@ -46,22 +67,22 @@ async def upload_images(
 
     # サマリーIDが指定されている場合、存在確認
     if summary_id:
-        get_or_404(db, Summary, summary_id, "要約")
+        await run_in_threadpool(get_or_404, db, Summary, summary_id, "要約")
     else:
         # 一時的なサマリーを作成
-        summary_id = _create_temporary_summary(db)
+        summary_id = await run_in_threadpool(_create_temporary_summary, db)
 
     # ファイルサイズの検証
     await _validate_file_sizes(files)
 
     # ファイルの保存
-    saved_files = await file_service.save_multiple_files(files, str(summary_id))
+    saved_files = await file_service.save_multiple_files(files)
 
-    # データベースに画像情報を保存
-    db_images = _save_images_to_db(db, summary_id, saved_files)
+    # 知覚ハッシュの計算・データベースへの保存・近似重複の検索
+    results = await run_in_threadpool(_register_uploads, db, summary_id, saved_files)
 
-    logger.info(f"画像アップロード完了: {len(db_images)}件, summary_id={summary_id}")
-    return db_images
+    logger.info(f"画像アップロード完了: {len(results)}件, summary_id={summary_id}")
+    return results
 
 
 @router.get("/{summary_id}", response_model=ImageList)
@@ -90,7 +111,7 @@ def get_images_by_summary(
     return {"items": images, "total": len(images)}
 
 
-@router.get("/{image_id}/detail", response_model=ImageDetail)
+@router.get("/{image_id}/detail", response_model=ImageDetail, response_class=FastJSONResponse)
 def get_image_detail(
     image_id: uuid.UUID,
     db: Session = Depends(get_db),
@@ -107,6 +128,83 @@ def get_image_detail(
     return get_or_404(db, Image, image_id, "画像")
 
 
+@router.get("/{image_id}/duplicates", response_model=ImageDuplicateList)
+def get_image_duplicates(
+    image_id: uuid.UUID,
+    scope: str = Query(SCOPE_SUMMARY, pattern=f"^({SCOPE_SUMMARY}|{SCOPE_LIBRARY})$",
+                       description="検索範囲（summary: 同じ要約内、library: すべての要約）"),
+    max_distance: Optional[int] = Query(None, ge=0, le=BAND_COUNT - 1,
+                                        description="最大のハミング距離（省略時は設定値）"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+) -> dict:
+    """画像の近似重複（同じページの撮り直し・再アップロード）を取得する
+
+    Args:
+        image_id: 画像ID
+        scope: 検索範囲
+        max_distance: 最大のハミング距離
+        limit: 最大件数
+        db: データベースセッション
+
+    Returns:
+        距離の小さい順の近似重複の画像とトータル件数
+    """
+    image = get_or_404(db, Image, image_id, "画像")
+    duplicates = duplicate_service.find_duplicates(
+        db, image, scope=scope, max_distance=max_distance, limit=limit
+    )
+    return {"items": duplicates, "total": len(duplicates)}
+
+
+@router.get("/{image_id}/thumbnail", response_class=Response)
+def get_image_thumbnail(
+    request: Request,
+    image_id: uuid.UUID,
+    width: int = Query(320, ge=1, le=4096, description="幅（THUMBNAIL_WIDTHSのいずれかに切り上げる）"),
+    format: Optional[str] = Query(None, pattern="^(webp|jpeg)$",
+                                  description="形式（省略時はAcceptヘッダーがWebPに対応していればwebp）"),
+    db: Session = Depends(get_db),
+) -> Response:
+    """画像のサムネイルを取得する
+
+    初回の要求時に縮小画像を作成してディスクにキャッシュする。ETag・Cache-Control付きで返し、
+    If-None-Matchが一致する場合は304、Rangeが指定された場合は部分を返す。
+
+    Args:
+        request: リクエスト
+        image_id: 画像ID
+        width: 幅
+        format: 形式（webp / jpeg）
+        db: データベースセッション
+
+    Returns:
+        サムネイル画像
+    """
+    image = get_or_404(db, Image, image_id, "画像")
+
+    vary = None
+    if format is None:
+        format = "webp" if "image/webp" in request.headers.get("accept", "") else "jpeg"
+        vary = "Accept"
+
+    try:
+        thumbnail = thumbnail_service.get_thumbnail(image, width, format)
+    except FileOperationError as e:
+        if not os.path.exists(image.file_path):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="画像ファイルが見つかりません",
+            )
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=e.message,
+        )
+    return cached_file_response(
+        request, thumbnail.path, thumbnail.etag, media_type=thumbnail.media_type, vary=vary
+    )
+
+
 @router.delete("/{image_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_image(
     image_id: uuid.UUID,
@@ -120,8 +218,9 @@ def delete_image(
     """
     image = get_or_404(db, Image, image_id, "画像")
 
-    # ファイルの削除
-    file_service.delete_file(image.file_path)
+    # ファイルの削除（コンテンツアドレス方式のファイルは参照数を減らし、ガベージコレクションで削除する）
+    if image.content_hash is None:
+        file_service.delete_file(image.file_path)
 
     # データベースから削除
     db.delete(image)
@@ -167,10 +266,40 @@ async def _validate_file_sizes(files: List[UploadFile]) -> None:
         verify_upload_size(len(content))
 
 
+def _register_uploads(
+    db: Session, summary_id: uuid.UUID, saved_files: List[dict]
+) -> List[ImageUploadResult]:
+    """保存したファイルを画像として登録し、近似重複とともに返す
+
+    Args:
+        db: データベースセッション
+        summary_id: 要約ID
+        saved_files: 保存されたファイル情報のリスト
+
+    Returns:
+        アップロードされた画像情報のリスト
+    """
+    hashes = [duplicate_service.compute(f["file_path"]) for f in saved_files]
+    db_images = _save_images_to_db(db, summary_id, saved_files, hashes)
+
+    results = []
+    for image in db_images:
+        result = ImageUploadResult.model_validate(image)
+        duplicates = duplicate_service.find_duplicates(
+            db, image, scope=SCOPE_LIBRARY, limit=UPLOAD_DUPLICATE_LIMIT
+        )
+        if duplicates:
+            logger.info(f"近似重複のページ: image_id={image.id}, 件数={len(duplicates)}")
+        result.duplicates = [ImageDuplicate.model_validate(match) for match in duplicates]
+        results.append(result)
+    return results
+
+
 def _save_images_to_db(
     db: Session,
     summary_id: uuid.UUID,
     saved_files: List[dict],
+    hashes: List[Optional[PageHashes]],
 ) -> List[Image]:
     """画像情報をデータベースに保存する
 
@@ -178,20 +307,23 @@ def _save_images_to_db(
         db: データベースセッション
         summary_id: 要約ID
         saved_files: 保存されたファイル情報のリスト
+        hashes: ファイルごとの知覚ハッシュ（計算できなかった場合はNone）
 
     Returns:
         保存された画像オブジェクトのリスト
     """
     db_images = []
-    for file_info in saved_files:
+    for file_info, page_hashes in zip(saved_files, hashes):
         db_image = Image(
             summary_id=summary_id,
             file_path=file_info["file_path"],
+            content_hash=file_info["content_hash"],
             file_name=file_info["file_name"],
             file_size=file_info["file_size"],
             mime_type=file_info["mime_type"],
             page_number=file_info["page_number"],
         )
+        duplicate_service.register(db_image, page_hashes)
         db.add(db_image)
         db_images.append(db_image)
 
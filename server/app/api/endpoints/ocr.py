@@ -3,20 +3,32 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 import uuid
 
+from app.admission import ocr_limiter
 from app.database import get_db
 from app.models import Image
+from app.responses import FastJSONResponse
 from app.schemas import OCRRequest, OCRResponse
 from app.services import get_ocr_service
+from app.services.duplicate_service import duplicate_service
 
 router = APIRouter()
 
 
-@router.post("/process", response_model=OCRResponse)
+@router.post(
+    "/process",
+    response_model=OCRResponse,
+    response_class=FastJSONResponse,
+    dependencies=[Depends(ocr_limiter, scope="function")],
+)
 def process_ocr(
     request: OCRRequest,
     db: Session = Depends(get_db)
 ):
-    """アップロードされた画像のOCR処理を実行する"""
+    """アップロードされた画像のOCR処理を実行する
+
+    同時実行数はOCR_MAX_CONCURRENCYまでに制限し、上限を超えたリクエストは待ち行列で待たせる
+    （満杯の場合は429、待ち時間の上限を超えた場合は503）。
+    """
     # 画像の存在確認
     images = []
     for image_id in request.image_ids:
@@ -27,7 +39,22 @@ def process_ocr(
                 detail=f"ID {image_id} の画像が見つかりません"
             )
         images.append(image)
-    
+
+    # 近似重複のページのOCR結果を再利用し、残りのページのみOCR処理する
+    reused = duplicate_service.reuse_ocr_texts(db, images)
+    if reused:
+        db.commit()
+    reused_results = [
+        {
+            "image_id": image.id,
+            "ocr_text": image.ocr_text,
+            "success": True,
+            "reused_from": reused[image.id],
+        }
+        for image in images if image.id in reused
+    ]
+    images = [image for image in images if image.id not in reused]
+
     # OCRサービスを取得
     ocr_service = get_ocr_service()
     
@@ -51,13 +78,13 @@ def process_ocr(
     db.commit()
     
     return {
-        "results": job_status["results"],
+        "results": reused_results + job_status["results"],
         "job_id": job_id,
         "status": job_status["status"]
     }
 
 
-@router.get("/status/{job_id}", response_model=OCRResponse)
+@router.get("/status/{job_id}", response_model=OCRResponse, response_class=FastJSONResponse)
 def get_ocr_status(
     job_id: str,
     db: Session = Depends(get_db)
@@ -0,0 +1,133 @@
+"""パイプラインAPIエンドポイントモジュール
+
+OCRから要約までを1つのジョブとして実行するAPIエンドポイントを提供する。
+"""
+
+import asyncio
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.models import Image, Summary
+from app.responses import FastJSONResponse, dumps
+from app.schemas import PipelineRequest, SummaryJobStatus
+from app.services.duplicate_service import duplicate_service
+from app.services.pipeline import start_pipeline_job
+from app.services.prompts import BookContext
+from app.services.summary_jobs import summary_job_manager
+from app.utils import get_or_404
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# ストリーム配信時のポーリング間隔（秒）
+STREAM_POLL_INTERVAL = 0.5
+
+
+@router.post(
+    "",
+    response_model=SummaryJobStatus,
+    response_class=FastJSONResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def start_pipeline(
+    request: PipelineRequest,
+    db: Session = Depends(get_db),
+) -> dict:
+    """OCRと要約を1つのジョブとして開始する
+
+    OCRが完了したページから順にチャンクを組み立て、チャンクサイズに
+    達した時点でAIに送信する。OCR済みのページと、OCR済みの近似重複がある
+    ページ（OCR結果を再利用）は再処理しない。
+
+    Args:
+        request: パイプライン実行リクエスト
+        db: データベースセッション
+
+    Returns:
+        開始したジョブのステータス
+    """
+    summary = get_or_404(db, Summary, request.summary_id, "要約")
+
+    images = (
+        db.query(Image)
+        .filter(Image.summary_id == request.summary_id)
+        .order_by(Image.page_number)
+        .all()
+    )
+    if not images:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="この要約に関連する画像がありません",
+        )
+
+    if duplicate_service.reuse_ocr_texts(db, images):
+        db.commit()
+
+    job_id = start_pipeline_job(
+        request.summary_id,
+        images,
+        request.custom_instructions,
+        book=BookContext.from_summary(summary),
+    )
+    logger.info(f"パイプライン開始: job_id={job_id}, summary_id={request.summary_id}")
+    return summary_job_manager.get_job_status(job_id)
+
+
+@router.get("/{job_id}", response_model=SummaryJobStatus, response_class=FastJSONResponse)
+def get_pipeline_status(job_id: str) -> dict:
+    """パイプラインジョブのステータスを取得する
+
+    Args:
+        job_id: ジョブID
+
+    Returns:
+        ジョブのステータス
+    """
+    return _get_job_status_or_404(job_id)
+
+
+@router.get("/{job_id}/stream")
+async def stream_pipeline_status(job_id: str) -> StreamingResponse:
+    """パイプラインジョブの進捗をServer-Sent Eventsで配信する
+
+    ジョブの状態が変わるたびにステータスを送信し、終了時にストリームを閉じる。
+
+    Args:
+        job_id: ジョブID
+
+    Returns:
+        text/event-stream形式のレスポンス
+    """
+    _get_job_status_or_404(job_id)
+
+    async def event_stream():
+        last_version = -1
+        while True:
+            job_status = summary_job_manager.get_job_status(job_id)
+            if job_status is None:
+                return
+            if job_status["version"] != last_version:
+                last_version = job_status["version"]
+                payload = SummaryJobStatus(**job_status).model_dump(mode="json")
+                yield b"data: " + dumps(payload) + b"\n\n"
+            if job_status["status"] in ("completed", "failed"):
+                return
+            await asyncio.sleep(STREAM_POLL_INTERVAL)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+def _get_job_status_or_404(job_id: str) -> dict:
+    """ジョブのステータスを取得し、存在しない場合は404エラーを発生させる"""
+    job_status = summary_job_manager.get_job_status(job_id)
+    if job_status is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"ジョブID {job_id} が見つかりません",
+        )
+    return job_status
@@ -3,16 +3,24 @@
 要約の作成、取得、更新、削除のAPIエンドポイントを提供する。
 """
 
+import hashlib
 import logging
 import uuid
-from typing import Optional
+from datetime import datetime
+from typing import Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy import func
-from sqlalchemy.orm import Session
-
-from app.database import get_db
+from sqlalchemy.orm import Session, defer
+
+from app.admission import generate_limiter
+from app.compression import compress, etag_matches, negotiate_encoding, summary_response_cache
+from app.config import settings
+from app.database import SessionLocal, get_db
+from app.exceptions import SummaryGenerationError
+from app.metrics import RESPONSE_CACHE_REQUESTS, SINGLE_FLIGHT_COALESCED
 from app.models import Summary, Image
+from app.responses import FastJSONResponse, dumps
 from app.schemas import (
     SummaryCreate,
     SummaryUpdate,
@@ -20,16 +28,37 @@ from app.schemas import (
     SummaryDetail,
     SummaryList,
     SummaryGenerate,
+    OriginalTextRange,
+    SummarySearchResult,
+    SummaryUsageReport,
+    SummaryJobStatus,
 )
 from app.services import summary_service
+from app.services.chunk_checkpoint import ChunkCheckpoint, fingerprint
+from app.services.generate_jobs import start_generate_job
+from app.services.incremental_summary import incremental_summary_service
+from app.services.prompts import BookContext, PromptTemplates
+from app.services.search_service import SearchQuery, search_service
+from app.services.single_flight import SingleFlight, SingleFlightTimeoutError, advisory_lock
+from app.services.summary_jobs import summary_job_manager
+from app.services.summary_text import assemble_original_text, load_text_column
+from app.services.usage_service import UsageRecorder, new_run_id, track_usage, usage_service
 from app.utils import get_or_404, SummaryConstants
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# 同じ内容の要約生成の重複実行を抑止する（プロセス内）
+generate_single_flight = SingleFlight("summaries.generate")
+
 
-@router.post("", response_model=SummaryDetail, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "",
+    response_model=SummaryDetail,
+    response_class=FastJSONResponse,
+    status_code=status.HTTP_201_CREATED,
+)
 def create_summary(
     summary: SummaryCreate,
     db: Session = Depends(get_db),
@@ -67,19 +96,36 @@ def create_summary(
         )
 
 
-@router.post("/generate", response_model=SummaryDetail)
+@router.post(
+    "/generate",
+    response_model=Union[SummaryDetail, SummaryJobStatus],
+    response_class=FastJSONResponse,
+    responses={status.HTTP_202_ACCEPTED: {"model": SummaryJobStatus}},
+    dependencies=[Depends(generate_limiter, scope="function")],
+)
 def generate_summary(
     request: SummaryGenerate,
+    response: Response,
     db: Session = Depends(get_db),
-) -> Summary:
+) -> dict:
     """画像からOCRテキストを抽出し、要約を生成する
 
+    差分要約（incremental）の場合は、前回から元ページの内容が変わったチャンクのみ
+    AIに送信し、その他のチャンクは保存済みの結果を再利用する。
+    同時実行数はGENERATE_MAX_CONCURRENCYまでに制限する（app/admission.py）。
+    同じ内容（要約・カスタム指示・ページ）の生成が実行中の場合は新たに生成せず、
+    その結果を待って返す（app/services/single_flight.py）。
+
+    backgroundを指定した場合は、生成をバックグラウンドのジョブとして開始し、
+    ジョブのステータスを202ですぐに返す（進捗はGET /api/summaries/generate/{job_id}で取得する）。
+
     Args:
-        request: 要約生成リクエスト（summary_idとcustom_instructionsを含む）
+        request: 要約生成リクエスト（summary_id・custom_instructions・incremental・backgroundを含む）
+        response: レスポンス（ジョブとして開始した場合のステータスコードの設定に使用）
         db: データベースセッション
 
     Returns:
-        生成された要約
+        生成された要約（backgroundの場合はジョブのステータス）
     """
     summary_id = request.summary_id
     custom_instructions = request.custom_instructions
@@ -111,36 +157,193 @@ def generate_summary(
             detail="OCRテキストが抽出されていません。先にOCR処理を実行してください。",
         )
 
-    # 要約の生成
+    incremental = (
+        settings.INCREMENTAL_SUMMARY if request.incremental is None else request.incremental
+    )
+
+    # 同じ内容（要約・指示・ページ）の生成が実行中の場合は、その結果を待って返す
+    key = _generation_key(summary_id, custom_instructions, images)
+
+    if request.background:
+        job_id = start_generate_job(
+            summary_id,
+            len(images),
+            lambda recorder: _generate_in_background(
+                summary_id, custom_instructions, incremental, key, recorder
+            ),
+            callback_url=settings.GENERATE_CALLBACK_URL,
+        )
+        logger.info(f"要約生成ジョブ開始: job_id={job_id}, summary_id={summary_id}")
+        response.status_code = status.HTTP_202_ACCEPTED
+        return summary_job_manager.get_job_status(job_id)
+
     try:
-        summarized_text = summary_service.summarize_text(
-            original_text,
-            custom_instructions=custom_instructions,
+        return generate_single_flight.run(
+            key,
+            lambda: _generate(db, summary, images, original_text, custom_instructions, incremental, key),
+            timeout=settings.GENERATE_SINGLE_FLIGHT_TIMEOUT,
         )
-    except Exception as e:
-        logger.error(f"要約生成エラー: {e}")
+    except SingleFlightTimeoutError as e:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"要約の生成中にエラーが発生しました: {e}",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=e.message,
+            headers={"Retry-After": "60"},
         )
 
-    # 要約の更新
-    summary.original_text = original_text
-    summary.summarized_text = str(summarized_text)
-    summary.custom_instructions = custom_instructions
 
-    try:
-        db.commit()
-        db.refresh(summary)
-        logger.info(f"要約生成完了: summary_id={summary_id}")
-        return summary
-    except Exception as e:
-        logger.error(f"データベース更新エラー: {e}")
-        db.rollback()
+@router.get("/generate/{job_id}", response_model=SummaryJobStatus, response_class=FastJSONResponse)
+def get_generate_job_status(job_id: str) -> dict:
+    """要約生成ジョブのステータス（進捗・トークン使用量）を取得する
+
+    Args:
+        job_id: ジョブID
+
+    Returns:
+        ジョブのステータス
+    """
+    job_status = summary_job_manager.get_job_status(job_id)
+    if job_status is None:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"データベース更新中にエラーが発生しました: {e}",
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"ジョブID {job_id} が見つかりません",
         )
+    return job_status
+
+
+def _generate_in_background(
+    summary_id: uuid.UUID,
+    custom_instructions: Optional[str],
+    incremental: bool,
+    key: str,
+    recorder: UsageRecorder,
+) -> str:
+    """要約生成ジョブのスレッドで要約を生成する（専用のセッションを使用する）
+
+    Returns:
+        要約テキスト
+
+    Raises:
+        SummaryGenerationError: 要約を生成できなかった場合
+    """
+    db = SessionLocal()
+    try:
+        summary = db.get(Summary, summary_id)
+        if summary is None:
+            raise SummaryGenerationError(f"要約が見つかりません: {summary_id}")
+        images = (
+            db.query(Image)
+            .filter(Image.summary_id == summary_id)
+            .order_by(Image.page_number)
+            .all()
+        )
+        original_text = _combine_ocr_texts(images)
+        try:
+            detail = generate_single_flight.run(
+                key,
+                lambda: _generate(
+                    db, summary, images, original_text, custom_instructions, incremental, key, recorder
+                ),
+                timeout=settings.GENERATE_SINGLE_FLIGHT_TIMEOUT,
+            )
+        except HTTPException as e:
+            raise SummaryGenerationError(e.detail) from e
+        return detail["summarized_text"]
+    finally:
+        db.close()
+
+
+def _generate(
+    db: Session,
+    summary: Summary,
+    images: list,
+    original_text: str,
+    custom_instructions: Optional[str],
+    incremental: bool,
+    key: str,
+    recorder: Optional[UsageRecorder] = None,
+) -> dict:
+    """要約を生成して保存する
+
+    他のワーカーが同じ内容の生成を実行中の場合はその完了を待ち、
+    待っている間に保存された結果があればそれを返す。
+    チャンクの結果は要約するたびにコミットする（app/services/chunk_checkpoint.py）ため、
+    失敗・再起動の後に再実行すると要約済みのチャンクから再開する。
+
+    Args:
+        db: データベースセッション
+        summary: 要約
+        images: 要約に含める画像（ページ順）
+        original_text: 結合したOCRテキスト
+        custom_instructions: カスタム指示
+        incremental: 差分要約を行うか
+        key: 生成の内容のキー
+        recorder: トークン使用量の記録先（省略時は新しく作成する）
+
+    Returns:
+        生成された要約
+    """
+    summary_id = summary.id
+    requested_at = datetime.utcnow()
+    with advisory_lock(key, settings.GENERATE_SINGLE_FLIGHT_TIMEOUT) as waited:
+        if waited:
+            db.refresh(summary)
+            if (
+                summary.generation_key == key
+                and summary.generated_at is not None
+                and summary.generated_at >= requested_at
+            ):
+                SINGLE_FLIGHT_COALESCED.labels("summaries.generate", "cluster").inc()
+                logger.info(f"他のワーカーで生成された要約を返します: summary_id={summary_id}")
+                return _summary_detail(summary, original_text, summary.summarized_text)
+
+        # 要約の生成（トークン使用量は生成IDごとに記録し、失敗した場合も保存する）
+        run_id = new_run_id()
+        try:
+            with track_usage(recorder) as recorder:
+                if incremental:
+                    summarized_text = incremental_summary_service.summarize(
+                        db, summary, images, custom_instructions
+                    ).summarized_text
+                else:
+                    # 長いテキストはチャンクごとに保存し、前回の失敗・中断の続きから再開する
+                    instructions = custom_instructions or PromptTemplates.DEFAULT_INSTRUCTION
+                    summarized_text = summary_service.summarize_text(
+                        original_text,
+                        custom_instructions=custom_instructions,
+                        book=BookContext.from_summary(summary),
+                        checkpoint=ChunkCheckpoint(
+                            db, summary_id, fingerprint(summary_service.model, instructions)
+                        ),
+                    )
+        except Exception as e:
+            logger.error(f"要約生成エラー: {e}")
+            db.rollback()
+            usage_service.save(db, summary_id, run_id, recorder, commit=True)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"要約の生成中にエラーが発生しました: {e}",
+            )
+
+        # 要約の更新（保存しない設定の場合、元テキストは取得時にページから組み立てる）
+        summary.original_text = original_text if settings.STORE_ORIGINAL_TEXT else ""
+        summary.summarized_text = str(summarized_text)
+        summary.custom_instructions = custom_instructions
+        summary.generation_key = key
+        summary.generated_at = datetime.utcnow()
+        usage_service.save(db, summary_id, run_id, recorder)
+
+        try:
+            db.commit()
+            db.refresh(summary)
+            logger.info(f"要約生成完了: summary_id={summary_id}")
+            return _summary_detail(summary, original_text, summary.summarized_text)
+        except Exception as e:
+            logger.error(f"データベース更新エラー: {e}")
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"データベース更新中にエラーが発生しました: {e}",
+            )
 
 
 @router.get("", response_model=SummaryList)
@@ -161,8 +364,10 @@ def get_summaries(
     Returns:
         要約一覧とページネーション情報
     """
-    # 一時的な要約を除外するフィルタ
-    base_query = db.query(Summary).filter(
+    # 一時的な要約を除外するフィルタ（一覧ではテキスト列を読み込まない）
+    base_query = db.query(Summary).options(
+        defer(Summary.original_text), defer(Summary.summarized_text)
+    ).filter(
         Summary.description.isnot(None),
         func.lower(Summary.title) != SummaryConstants.TEMPORARY_TITLE.lower(),
     )
@@ -183,24 +388,239 @@ def get_summaries(
     }
 
 
-@router.get("/{summary_id}", response_model=SummaryDetail)
+@router.get("/search", response_model=SummarySearchResult)
+def search_summaries(
+    q: str = Query(..., min_length=1, max_length=200, description="検索語（空白区切りでAND検索）"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+    snippets: bool = True,
+    db: Session = Depends(get_db),
+) -> dict:
+    """タイトル・説明・要約テキスト・OCRテキストを全文検索する
+
+    関連度順に返す。一致件数が多い場合は、新しいものから上限件数
+    （SEARCH_MAX_CANDIDATES）までを対象にする。一時的な要約は含まれない。
+    インデックスは書き込み後にバックグラウンドで更新されるため、
+    直後の変更は反映されていない場合がある。
+
+    Args:
+        q: 検索語
+        skip: スキップする件数
+        limit: 取得する最大件数
+        snippets: 一致箇所のスニペットを含めるかどうか
+        db: データベースセッション
+
+    Returns:
+        検索結果とページネーション情報
+    """
+    if not settings.SEARCH_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="全文検索は無効になっています",
+        )
+
+    if SearchQuery.parse(q).is_empty:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="検索語に文字または数字を含めてください",
+        )
+
+    result = search_service.search(db, q, limit=limit, offset=skip, with_snippets=snippets)
+
+    return {
+        "items": [
+            {
+                **SummaryBase.model_validate(hit.summary).model_dump(),
+                "score": hit.score,
+                "snippet": hit.snippet,
+                "matched_field": hit.matched_field,
+                "page_number": hit.page_number,
+            }
+            for hit in result.hits
+        ],
+        "total": result.total,
+        "total_capped": result.total_capped,
+        "page": skip // limit + 1,
+        "page_size": limit,
+        "query": q,
+    }
+
+
+@router.get("/{summary_id}", response_model=SummaryDetail, response_class=FastJSONResponse)
 def get_summary(
     summary_id: uuid.UUID,
+    request: Request,
+    include_original_text: bool = True,
+    max_text_length: Optional[int] = Query(None, ge=0),
     db: Session = Depends(get_db),
-) -> Summary:
+) -> Response:
     """特定の要約詳細を取得する
 
+    元テキストが保存されていない場合はページのOCRテキストから組み立てる。
+    テキスト列は必要な場合のみ、必要な長さだけ読み込む。
+
+    レスポンスの内容は要約・ページの更新日時と取得条件で決まるため、これらから
+    ETagを作成し、If-None-Matchが一致する場合はテキストを読み込まずに304を返す。
+    エンコード（圧縮）済みの本文はETag・圧縮方式ごとにキャッシュし、同じ表現の
+    2回目以降の取得ではテキストの読み込みと圧縮を行わない。
+
     Args:
         summary_id: 要約ID
+        request: リクエスト（If-None-Match・Accept-Encodingの参照に使用）
+        include_original_text: 元テキストを含めるかどうか
+        max_text_length: 元テキスト・要約テキストの最大文字数（省略時は全文）
         db: データベースセッション
 
     Returns:
-        要約詳細
+        要約詳細のJSON（変更がない場合は304）
+    """
+    summary = get_or_404(
+        db,
+        Summary,
+        summary_id,
+        "要約",
+        options=[defer(Summary.original_text), defer(Summary.summarized_text)],
+    )
+    etag = _summary_etag(db, summary, include_original_text, max_text_length)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if etag_matches(etag, request.headers.get("if-none-match")):
+        RESPONSE_CACHE_REQUESTS.labels("not_modified").inc()
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    cache_key = (summary_id, etag, encoding)
+    cached = summary_response_cache.get(cache_key)
+    if cached is not None:
+        RESPONSE_CACHE_REQUESTS.labels("hit").inc()
+        body, content_encoding = cached
+    else:
+        RESPONSE_CACHE_REQUESTS.labels("miss").inc()
+        detail = _load_summary_detail(db, summary, include_original_text, max_text_length)
+        body = dumps(SummaryDetail(**detail).model_dump(mode="json"))
+        content_encoding = None
+        if encoding and len(body) >= settings.COMPRESSION_MIN_SIZE:
+            body, content_encoding = compress(body, encoding), encoding
+        summary_response_cache.put(cache_key, body, content_encoding)
+
+    if content_encoding:
+        headers["Content-Encoding"] = content_encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _summary_etag(
+    db: Session, summary: Summary, include_original_text: bool, max_text_length: Optional[int]
+) -> str:
+    """要約詳細のETag（要約の更新日時・取得条件、元テキストを含める場合はページの更新状況から作成）
+
+    元テキストを保存しない設定ではページのOCRテキストから組み立てるため、
+    ページ数と最新のページの更新日時も含める。
     """
-    return get_or_404(db, Summary, summary_id, "要約")
+    parts = [
+        str(summary.id),
+        summary.updated_at.isoformat(),
+        str(include_original_text),
+        str(max_text_length),
+    ]
+    if include_original_text:
+        page_count, pages_updated_at = (
+            db.query(func.count(Image.id), func.max(Image.updated_at))
+            .filter(Image.summary_id == summary.id)
+            .one()
+        )
+        parts += [str(page_count), pages_updated_at.isoformat() if pages_updated_at else ""]
+    digest = hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()[:32]
+    return f'W/"{digest}"'
+
+
+def _load_summary_detail(
+    db: Session, summary: Summary, include_original_text: bool, max_text_length: Optional[int]
+) -> dict:
+    """要約詳細のテキストを読み込み、レスポンスを作成する"""
+    summary_id = summary.id
+    summarized_text, summarized_truncated = load_text_column(
+        db, Summary.summarized_text, summary_id, max_text_length
+    )
+
+    original_text = None
+    original_truncated = False
+    if include_original_text:
+        original_text, original_truncated = load_text_column(
+            db, Summary.original_text, summary_id, max_text_length
+        )
+        if not original_text:
+            assembled = assemble_original_text(db, summary_id, max_length=max_text_length)
+            original_text, original_truncated = assembled.text, assembled.truncated
 
+    return _summary_detail(
+        summary, original_text, summarized_text, original_truncated, summarized_truncated
+    )
+
+
+@router.get("/{summary_id}/original-text", response_model=OriginalTextRange, response_class=FastJSONResponse)
+def get_original_text(
+    summary_id: uuid.UUID,
+    start_page: Optional[int] = Query(None, ge=1),
+    end_page: Optional[int] = Query(None, ge=1),
+    max_length: Optional[int] = Query(None, ge=0),
+    db: Session = Depends(get_db),
+) -> dict:
+    """ページ範囲を指定して元テキストを取得する
+
+    ページのOCRテキストから組み立てるため、Summary.original_textを
+    保存しない設定でも利用できる。
+
+    Args:
+        summary_id: 要約ID
+        start_page: 先頭のページ番号（省略時は最初から）
+        end_page: 末尾のページ番号（省略時は最後まで）
+        max_length: 最大文字数（省略時は全文）
+        db: データベースセッション
 
-@router.put("/{summary_id}", response_model=SummaryDetail)
+    Returns:
+        ページ範囲の元テキスト
+    """
+    if start_page is not None and end_page is not None and start_page > end_page:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_pageはend_page以下で指定してください",
+        )
+    get_or_404(db, Summary, summary_id, "要約", options=[defer(Summary.original_text), defer(Summary.summarized_text)])
+
+    assembled = assemble_original_text(db, summary_id, start_page, end_page, max_length)
+    return {
+        "summary_id": summary_id,
+        "start_page": assembled.start_page,
+        "end_page": assembled.end_page,
+        "page_count": assembled.page_count,
+        "total_pages": assembled.total_pages,
+        "text": assembled.text,
+        "truncated": assembled.truncated,
+    }
+
+
+@router.get("/{summary_id}/usage", response_model=SummaryUsageReport)
+def get_summary_usage(
+    summary_id: uuid.UUID,
+    runs: int = Query(10, ge=1, le=100, description="返す生成の数（新しい順）"),
+    db: Session = Depends(get_db),
+) -> dict:
+    """要約の生成で使用したトークン数・費用を取得する
+
+    合計・モデルごと・生成ごと（チャンクごとの内訳を含む）に集計する。
+
+    Args:
+        summary_id: 要約ID
+        runs: 返す生成の数
+        db: データベースセッション
+
+    Returns:
+        トークン使用量の集計
+    """
+    get_or_404(db, Summary, summary_id, "要約", options=[defer(Summary.original_text), defer(Summary.summarized_text)])
+    return usage_service.summary_report(db, summary_id, runs_limit=runs)
+
+
+@router.put("/{summary_id}", response_model=SummaryDetail, response_class=FastJSONResponse)
 def update_summary(
     summary_id: uuid.UUID,
     summary_update: SummaryUpdate,
@@ -246,9 +666,45 @@ def delete_summary(
     summary = get_or_404(db, Summary, summary_id, "要約")
 
     db.delete(summary)
+    summary_response_cache.invalidate(summary_id)
     db.commit()
 
 
+def _summary_detail(
+    summary: Summary,
+    original_text: Optional[str],
+    summarized_text: str,
+    original_truncated: bool = False,
+    summarized_truncated: bool = False,
+) -> dict:
+    """要約詳細のレスポンスを作成する
+
+    テキスト列はモデルから読み込まず、呼び出し元で取得したものを使用する。
+
+    Args:
+        summary: 要約（テキスト列は遅延読み込みでもよい）
+        original_text: 元テキスト
+        summarized_text: 要約テキスト
+        original_truncated: 元テキストを切り詰めたかどうか
+        summarized_truncated: 要約テキストを切り詰めたかどうか
+
+    Returns:
+        SummaryDetail形式の辞書
+    """
+    return {
+        "id": summary.id,
+        "title": summary.title,
+        "description": summary.description,
+        "custom_instructions": summary.custom_instructions,
+        "created_at": summary.created_at,
+        "updated_at": summary.updated_at,
+        "original_text": original_text,
+        "summarized_text": summarized_text,
+        "original_text_truncated": original_truncated,
+        "summarized_text_truncated": summarized_truncated,
+    }
+
+
 def _combine_ocr_texts(images: list) -> str:
     """画像のOCRテキストを結合する
 
@@ -260,3 +716,17 @@ def _combine_ocr_texts(images: list) -> str:
     """
     texts = [image.ocr_text for image in images if image.ocr_text]
     return "\n\n".join(texts)
+
+
+def _generation_key(
+    summary_id: uuid.UUID, custom_instructions: Optional[str], images: list
+) -> str:
+    """要約の生成の内容（要約ID・指示・ページの構成とOCRテキスト）を表すキー"""
+    pages = hashlib.sha256()
+    for image in images:
+        text_hash = hashlib.sha256((image.ocr_text or "").encode("utf-8")).hexdigest()
+        pages.update(f"{image.id}:{image.page_number}:{text_hash}\n".encode("utf-8"))
+    instructions = hashlib.sha256((custom_instructions or "").encode("utf-8")).hexdigest()
+    return hashlib.sha256(
+        f"{summary_id}\0{instructions}\0{pages.hexdigest()}".encode("utf-8")
+    ).hexdigest()
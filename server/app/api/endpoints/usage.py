@@ -0,0 +1,56 @@
+"""トークン使用量APIエンドポイントモジュール
+
+AI API呼び出しのトークン数・費用の集計を提供する。
+要約ごとの内訳は GET /summaries/{summary_id}/usage で取得する。
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.schemas import UsageReport
+from app.services.usage_service import usage_service
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get("", response_model=UsageReport)
+def get_usage(
+    since: Optional[datetime] = Query(None, description="期間の開始（UTC）"),
+    until: Optional[datetime] = Query(None, description="期間の終了（UTC、この時刻を含まない）"),
+    limit: int = Query(20, ge=1, le=100, description="返す要約の数（トークン数の多い順）"),
+    db: Session = Depends(get_db),
+) -> dict:
+    """期間内のトークン使用量・費用を集計する
+
+    合計・モデルごとの集計と、トークン数の多い要約を返す。
+
+    Args:
+        since: 期間の開始
+        until: 期間の終了
+        limit: 返す要約の数
+        db: データベースセッション
+
+    Returns:
+        トークン使用量の集計
+    """
+    since, until = _to_naive_utc(since), _to_naive_utc(until)
+    if since is not None and until is not None and since >= until:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="sinceはuntilより前の日時を指定してください",
+        )
+    return usage_service.report(db, since, until, limit)
+
+
+def _to_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """タイムゾーン付きの日時をUTCに変換する（created_atはタイムゾーンなしのUTCで保存している）"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
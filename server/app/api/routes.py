@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.endpoints import images, ocr, summaries
+from app.api.endpoints import batches, images, ocr, pipeline, summaries, usage
 
 # メインAPIルーター
 api_router = APIRouter()
@@ -9,3 +9,6 @@ api_router = APIRouter()
 api_router.include_router(images.router, prefix="/images", tags=["images"])
 api_router.include_router(ocr.router, prefix="/ocr", tags=["ocr"])
 api_router.include_router(summaries.router, prefix="/summaries", tags=["summaries"])
+api_router.include_router(pipeline.router, prefix="/pipeline", tags=["pipeline"])
+api_router.include_router(batches.router, prefix="/batches", tags=["batches"])
+api_router.include_router(usage.router, prefix="/usage", tags=["usage"])
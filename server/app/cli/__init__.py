@@ -0,0 +1,7 @@
+"""コマンドラインツール
+
+HTTPを経由せずに、サーバーと同じサービスを使って処理を実行する::
+
+    python -m app.cli batch <ディレクトリ>      # ページ画像を取り込み、一括要約を実行する
+    python -m app.cli summarize <ディレクトリ>  # データベースを使わずに要約し、結果をJSONLに書き出す
+"""
@@ -0,0 +1,29 @@
+"""コマンドラインツールのエントリーポイント（python -m app.cli）"""
+
+import argparse
+import sys
+from typing import List, Optional
+
+from app.cli import batch, summarize
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """サブコマンドを実行する
+
+    Args:
+        argv: コマンドライン引数（省略時はsys.argv）
+
+    Returns:
+        終了コード
+    """
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="書籍画像要約のコマンドラインツール")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    batch.add_parser(subparsers)
+    summarize.add_parser(subparsers)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
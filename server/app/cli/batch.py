@@ -0,0 +1,134 @@
+"""一括要約のサブコマンド（python -m app.cli batch）
+
+ページ画像のディレクトリを書籍ごとに要約として取り込み（アップロードと同じく
+コンテンツアドレス方式で保存し、知覚ハッシュを登録する）、一括要約（app/services/batch_service.py）を
+実行して完了まで進捗を表示する。結果はデータベースに保存され、APIやWeb画面から参照できる。
+"""
+
+import argparse
+import json
+import time
+import uuid
+from typing import List, Optional
+
+from app.cli.pages import BookDirectory, find_books
+from app.database import Base, SessionLocal, engine
+from app.models import Image, Summary
+from app.services.batch_service import batch_scheduler
+from app.services.duplicate_service import duplicate_service
+from app.services.file_service import file_service
+
+
+def add_parser(subparsers) -> None:
+    """batchサブコマンドを登録する"""
+    parser = subparsers.add_parser(
+        "batch",
+        help="ページ画像のディレクトリを取り込み、一括要約を実行する",
+        description=(
+            "ディレクトリ直下の画像を1冊、またはサブディレクトリごとに1冊として取り込み、"
+            "OCRから要約までを一括で実行する（ページ順はファイル名の自然順）。"
+        ),
+    )
+    parser.add_argument("directory", help="ページ画像のディレクトリ（または書籍ごとのサブディレクトリを含むディレクトリ）")
+    parser.add_argument("--instructions", default=None, help="カスタム指示（全書籍に共通）")
+    parser.add_argument(
+        "--poll-interval", type=float, default=2.0, help="進捗を確認する間隔（秒、デフォルト: 2）"
+    )
+    parser.set_defaults(handler=run)
+
+
+def run(args: argparse.Namespace) -> int:
+    """書籍を取り込み、一括要約の完了まで待つ
+
+    Returns:
+        終了コード（失敗した書籍がある場合は1）
+    """
+    books = find_books(args.directory)
+    if not books:
+        print(f"ページ画像が見つかりません: {args.directory}")
+        return 1
+
+    Base.metadata.create_all(bind=engine)
+    summary_ids = [import_book(book) for book in books]
+    print(f"{len(books)}冊を取り込みました（{sum(len(book.pages) for book in books)}ページ）")
+
+    batch_id = batch_scheduler.submit(summary_ids, args.instructions)
+    status = wait_for_batch(batch_id, args.poll_interval)
+
+    for book, item in zip(books, status["items"]):
+        line = {"title": book.title, "summary_id": item["summary_id"], "status": item["status"]}
+        if item["error"]:
+            line["error"] = item["error"]
+        print(json.dumps(line, ensure_ascii=False))
+    print(
+        f"完了: {status['completed']}冊、失敗: {status['failed']}冊、"
+        f"トークン: {status['usage'].get('prompt_tokens', 0) + status['usage'].get('completion_tokens', 0)}、"
+        f"費用: ${status['usage'].get('cost', 0.0):.4f}"
+    )
+    return 1 if status["failed"] else 0
+
+
+def import_book(book: BookDirectory, description: Optional[str] = None) -> uuid.UUID:
+    """ページ画像のディレクトリを要約と画像として登録する
+
+    Args:
+        book: ページ画像のディレクトリ
+        description: 要約の説明
+
+    Returns:
+        作成した要約のID
+    """
+    db = SessionLocal()
+    try:
+        summary = Summary(
+            title=book.title,
+            description=description or f"{book.path} から取り込み",
+            original_text="",
+            summarized_text="",
+        )
+        db.add(summary)
+        db.flush()
+        for page_number, path in enumerate(book.pages, start=1):
+            file_info = file_service.save_local_file(path)
+            image = Image(
+                summary_id=summary.id,
+                file_path=file_info["file_path"],
+                content_hash=file_info["content_hash"],
+                file_name=file_info["file_name"],
+                file_size=file_info["file_size"],
+                mime_type=file_info["mime_type"],
+                page_number=page_number,
+            )
+            duplicate_service.register(image, duplicate_service.compute(file_info["file_path"]))
+            db.add(image)
+        db.commit()
+        return summary.id
+    except BaseException:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def wait_for_batch(batch_id: str, poll_interval: float) -> dict:
+    """一括要約の完了まで待ち、進捗が変わるたびに表示する
+
+    Returns:
+        完了時のバッチのステータス
+    """
+    last: Optional[List[int]] = None
+    while True:
+        status = batch_scheduler.get_status(batch_id)
+        progress = [
+            status["completed"], status["failed"], status["pages_done"], status["chunks_done"]
+        ]
+        if progress != last:
+            last = progress
+            print(
+                f"[{status['status']}] 完了 {status['completed'] + status['failed']}/{status['total']}冊、"
+                f"処理中 {status['processing']}冊、ページ {status['pages_done']}/{status['pages_total']}、"
+                f"チャンク {status['chunks_done']}"
+            )
+        if status["status"] in ("completed", "failed"):
+            return status
+        time.sleep(poll_interval)
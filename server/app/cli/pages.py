@@ -0,0 +1,72 @@
+"""ページ画像のディレクトリの読み込み
+
+1冊の書籍は1つのディレクトリのページ画像とし、ページ順はファイル名の自然順
+（page2.png < page10.png）とする。指定したディレクトリ直下に画像がある場合はその1冊、
+ない場合は画像を含むサブディレクトリをそれぞれ1冊として扱う。
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from typing import List
+
+# ページ画像として扱う拡張子
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tif", ".tiff", ".webp"}
+
+_DIGITS = re.compile(r"(\d+)")
+
+
+@dataclass
+class BookDirectory:
+    """ページ画像のディレクトリ（1冊）"""
+
+    title: str
+    path: str
+    pages: List[str]  # ページ順の画像ファイルのパス
+
+
+def natural_key(name: str) -> list:
+    """ファイル名の数字部分を数値として比較するためのキー"""
+    return [int(part) if part.isdigit() else part.lower() for part in _DIGITS.split(name)]
+
+
+def list_pages(directory: str) -> List[str]:
+    """ディレクトリ直下のページ画像をページ順に取得する"""
+    names = [
+        entry.name
+        for entry in os.scandir(directory)
+        if entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS
+    ]
+    return [os.path.join(directory, name) for name in sorted(names, key=natural_key)]
+
+
+def find_books(root: str) -> List[BookDirectory]:
+    """ディレクトリから書籍（ページ画像のディレクトリ）を探す
+
+    Args:
+        root: ページ画像のディレクトリ、または書籍ごとのサブディレクトリを含むディレクトリ
+
+    Returns:
+        書籍のリスト（サブディレクトリの場合は名前の自然順）
+
+    Raises:
+        NotADirectoryError: rootがディレクトリでない場合
+    """
+    root = os.path.abspath(root)
+    if not os.path.isdir(root):
+        raise NotADirectoryError(root)
+
+    pages = list_pages(root)
+    if pages:
+        return [BookDirectory(title=os.path.basename(root), path=root, pages=pages)]
+
+    books = []
+    subdirectories = sorted(
+        (entry.name for entry in os.scandir(root) if entry.is_dir()), key=natural_key
+    )
+    for name in subdirectories:
+        path = os.path.join(root, name)
+        pages = list_pages(path)
+        if pages:
+            books.append(BookDirectory(title=name, path=path, pages=pages))
+    return books
@@ -0,0 +1,358 @@
+"""オフライン要約のサブコマンド（python -m app.cli summarize）
+
+データベース・HTTPを使わずに、ページ画像のディレクトリからOCRと要約を実行し、
+書籍ごとの結果をJSONLに書き出す（過去の蔵書の一括デジタル化用）。
+
+    - 処理はSummaryPipeline（app/services/pipeline.py）で行う。ページのOCRを並列で先行させ、
+      チャンクサイズに達したページから順にAIに送信する
+    - OCRモデルとAIクライアントはプロセス内のインスタンスを全書籍で共有する
+      （--jobsで複数の書籍を同時に処理する場合も同じ）
+    - OCR結果・チャンクの要約・完了した書籍をチェックポイントファイル（JSONL）に追記し、
+      中断後に同じコマンドを再実行すると続きから処理する
+"""
+
+import argparse
+import contextvars
+import hashlib
+import json
+import logging
+import math
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from app.cli.pages import BookDirectory, find_books
+from app.exceptions import AppException
+from app.services.pipeline import PipelinePage, SummaryPipeline
+from app.services.prompts import BookContext, PromptTemplates
+from app.services.summary_service import summary_service
+from app.services.usage_service import track_usage
+
+logger = logging.getLogger(__name__)
+
+
+def add_parser(subparsers) -> None:
+    """summarizeサブコマンドを登録する"""
+    parser = subparsers.add_parser(
+        "summarize",
+        help="ページ画像のディレクトリをオフラインで要約し、結果をJSONLに書き出す",
+        description=(
+            "ディレクトリ直下の画像を1冊、またはサブディレクトリごとに1冊として、OCRと要約を実行する"
+            "（データベースは使用しない）。中断した場合は同じコマンドで続きから再開する。"
+        ),
+    )
+    parser.add_argument("directory", help="ページ画像のディレクトリ（または書籍ごとのサブディレクトリを含むディレクトリ）")
+    parser.add_argument("-o", "--output", default="summaries.jsonl", help="結果の出力先（JSONL、デフォルト: summaries.jsonl）")
+    parser.add_argument(
+        "--checkpoint", default=None, help="チェックポイントファイル（デフォルト: 出力先に.checkpointを付けたパス）"
+    )
+    parser.add_argument("--no-resume", action="store_true", help="チェックポイントと出力を破棄して最初から処理する")
+    parser.add_argument("--instructions", default=None, help="カスタム指示（全書籍に共通）")
+    parser.add_argument("--jobs", type=int, default=1, help="同時に処理する書籍数（デフォルト: 1）")
+    parser.add_argument(
+        "--chunk-size", type=int, default=None, help="AIに送信するチャンクの目安サイズ（文字数、デフォルト: PIPELINE_CHUNK_SIZE）"
+    )
+    parser.add_argument(
+        "--ocr-workers", type=int, default=None, help="1冊あたりのOCRの並列数（デフォルト: PIPELINE_OCR_WORKERS）"
+    )
+    parser.add_argument("--include-text", action="store_true", help="結果にOCRテキスト（元テキスト）を含める")
+    parser.add_argument("--stats", default=None, help="処理時間などの集計をJSONで書き出すパス")
+    parser.set_defaults(handler=run)
+
+
+class Checkpoint:
+    """中断した処理を再開するためのチェックポイントファイル（追記のみのJSONL）
+
+    レコードの種類:
+        - page: ページのOCR結果（ファイルのパス・サイズ・更新日時で識別する）
+        - chunk: チャンクの要約（指示・書籍・チャンクのテキストのハッシュで識別する）
+        - book: 完了した書籍（結果は出力先に書き込み済み）
+
+    複数の書籍を同時に処理するスレッドから追記されるため、ロックで保護する。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._pages: Dict[str, str] = {}
+        self._chunks: Dict[str, str] = {}
+        self._books: set = set()
+        self._lock = threading.Lock()
+        self._load()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 書き込み途中で中断した最後の行
+                    continue
+                if record.get("type") == "page":
+                    self._pages[record["key"]] = record["text"]
+                elif record.get("type") == "chunk":
+                    self._chunks[record["key"]] = record["text"]
+                elif record.get("type") == "book":
+                    self._books.add(record["key"])
+
+    def page_text(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._pages.get(key)
+
+    def chunk_text(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._chunks.get(key)
+
+    def is_done(self, key: str) -> bool:
+        with self._lock:
+            return key in self._books
+
+    def save_page(self, key: str, text: str) -> None:
+        self._append({"type": "page", "key": key, "text": text}, self._pages, text)
+
+    def save_chunk(self, key: str, text: str) -> None:
+        self._append({"type": "chunk", "key": key, "text": text}, self._chunks, text)
+
+    def mark_done(self, key: str) -> None:
+        with self._lock:
+            self._books.add(key)
+            self._write({"type": "book", "key": key})
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def _append(self, record: Dict[str, Any], cache: Dict[str, str], text: str) -> None:
+        with self._lock:
+            cache[record["key"]] = text
+            self._write(record)
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        """1行を書き込む（ロック取得済みで呼び出すこと）"""
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+
+@dataclass
+class ChunkCounts:
+    """1冊の書籍のチャンク数"""
+
+    summarized: int = 0
+    resumed: int = 0  # チェックポイントから再利用した数
+
+
+# 処理中の書籍のチャンク数（パイプラインのAIスレッドにはsubmit_with_contextで引き継がれる）
+_chunk_counts: contextvars.ContextVar[Optional[ChunkCounts]] = contextvars.ContextVar(
+    "cli_chunk_counts", default=None
+)
+
+
+class CheckpointedSummaryService:
+    """チャンクの要約をチェックポイントに保存・再利用する要約サービス
+
+    SummaryPipelineに要約サービスとして渡す（clientとprocess_chunkのみ使用される）。
+    """
+
+    def __init__(self, summary_svc, checkpoint: Checkpoint):
+        self._summary_service = summary_svc
+        self._checkpoint = checkpoint
+
+    @property
+    def client(self):
+        return self._summary_service.client
+
+    def process_chunk(self, chunk: str, instructions: str, book: Optional[BookContext] = None) -> str:
+        key = _hash(instructions, book.title if book else "", book.description if book else "", chunk)
+        counts = _chunk_counts.get() or ChunkCounts()
+        text = self._checkpoint.chunk_text(key)
+        if text is not None:
+            counts.resumed += 1
+            return text
+        text = self._summary_service.process_chunk(chunk, instructions, book)
+        self._checkpoint.save_chunk(key, text)
+        counts.summarized += 1
+        return text
+
+
+def run(args: argparse.Namespace) -> int:
+    """書籍を要約し、結果をJSONLに書き出す
+
+    Returns:
+        終了コード（失敗した書籍がある場合は1）
+    """
+    books = find_books(args.directory)
+    if not books:
+        print(f"ページ画像が見つかりません: {args.directory}")
+        return 1
+    if not summary_service.client:
+        print("AIクライアントが初期化されていません。APIキーを設定してください。")
+        return 1
+
+    checkpoint_path = args.checkpoint or f"{args.output}.checkpoint"
+    if args.no_resume:
+        for path in (checkpoint_path, args.output):
+            if os.path.exists(path):
+                os.remove(path)
+
+    checkpoint = Checkpoint(checkpoint_path)
+    summarizer = CheckpointedSummaryService(summary_service, checkpoint)
+    instructions = args.instructions or PromptTemplates.DEFAULT_INSTRUCTION
+    output_lock = threading.Lock()
+    results: List[Dict[str, Any]] = []
+    skipped = 0
+
+    pending = []
+    for book in books:
+        if checkpoint.is_done(_book_key(book, instructions)):
+            skipped += 1
+        else:
+            pending.append(book)
+    print(f"{len(books)}冊（完了済み{skipped}冊をスキップ）、チェックポイント: {checkpoint_path}")
+
+    def process(book: BookDirectory) -> None:
+        result = summarize_book(book, summarizer, checkpoint, args)
+        label = "失敗" if result["error"] else "一部失敗" if result["errors"] else "完了"
+        with output_lock:
+            with open(args.output, "a", encoding="utf-8") as f:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+            results.append(result)
+            print(
+                f"{label}: {book.title}（{result['pages']}ページ、{result['timings']['seconds']:.1f}秒）"
+                + (f" {result['error']}" if result["error"] else "")
+            )
+        # 一部のページ・チャンクが失敗した書籍は、再実行時にその部分のみ処理し直す
+        if result["error"] is None and not result["errors"]:
+            checkpoint.mark_done(_book_key(book, instructions))
+
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.jobs), thread_name_prefix="cli-book") as pool:
+            for future in [pool.submit(process, book) for book in pending]:
+                future.result()
+    finally:
+        checkpoint.close()
+
+    stats = build_stats(results, time.perf_counter() - start, skipped)
+    print(json.dumps(stats, ensure_ascii=False))
+    if args.stats:
+        with open(args.stats, "w", encoding="utf-8") as f:
+            json.dump(stats, f, ensure_ascii=False, indent=2)
+    return 1 if stats["failed"] else 0
+
+
+def summarize_book(
+    book: BookDirectory,
+    summarizer: CheckpointedSummaryService,
+    checkpoint: Checkpoint,
+    args: argparse.Namespace,
+) -> Dict[str, Any]:
+    """1冊の書籍のOCRと要約を実行する
+
+    Returns:
+        出力する結果（1行分）
+    """
+    start = time.perf_counter()
+    ocr_done_at = start
+    page_keys: Dict[int, str] = {}
+    pages: List[PipelinePage] = []
+    for page_number, path in enumerate(book.pages, start=1):
+        key = _page_key(path)
+        page_keys[page_number] = key
+        pages.append(PipelinePage(page_number, path, ocr_text=checkpoint.page_text(key)))
+    resumed_pages = sum(1 for page in pages if page.ocr_text is not None)
+
+    def on_page(page: PipelinePage, text: str, error: Optional[str]) -> None:
+        nonlocal ocr_done_at
+        ocr_done_at = time.perf_counter()
+        # 失敗したページは再開時にOCRし直す
+        if page.ocr_text is None and error is None:
+            checkpoint.save_page(page_keys[page.page_number], text)
+
+    pipeline = SummaryPipeline(
+        summary_svc=summarizer, chunk_size=args.chunk_size, ocr_workers=args.ocr_workers
+    )
+    counts = ChunkCounts()
+    token = _chunk_counts.set(counts)
+    result = None
+    error = None
+    try:
+        with track_usage() as recorder:
+            result = pipeline.run(
+                pages, args.instructions, on_page=on_page, book=BookContext(title=book.title)
+            )
+    except AppException as e:
+        error = e.message
+        logger.error("書籍の要約に失敗: %s, error=%s", book.path, e.message)
+    finally:
+        _chunk_counts.reset(token)
+
+    output: Dict[str, Any] = {
+        "title": book.title,
+        "path": book.path,
+        "pages": len(book.pages),
+        "summary": result.summarized_text if result else None,
+        "errors": result.errors if result else [],
+        "error": error,
+        "timings": {
+            "seconds": round(time.perf_counter() - start, 3),
+            "ocr_seconds": round(ocr_done_at - start, 3),
+        },
+        "pages_ocr": len(book.pages) - resumed_pages,
+        "pages_resumed": resumed_pages,
+        "chunks_summarized": counts.summarized,
+        "chunks_resumed": counts.resumed,
+        "usage": recorder.totals(),
+    }
+    if args.include_text:
+        output["original_text"] = result.original_text if result else None
+    return output
+
+
+def build_stats(results: List[Dict[str, Any]], seconds: float, skipped: int) -> Dict[str, Any]:
+    """処理時間・ページ数・トークン数を集計する"""
+    book_seconds = sorted(result["timings"]["seconds"] for result in results)
+    pages = sum(result["pages"] for result in results)
+    usage: Dict[str, float] = {}
+    for result in results:
+        for name, value in result["usage"].items():
+            usage[name] = usage.get(name, 0) + value
+    return {
+        "books": len(results),
+        "skipped": skipped,
+        "completed": sum(1 for result in results if result["error"] is None),
+        "failed": sum(1 for result in results if result["error"] is not None),
+        "pages": pages,
+        "pages_ocr": sum(result["pages_ocr"] for result in results),
+        "pages_resumed": sum(result["pages_resumed"] for result in results),
+        "chunks_summarized": sum(result["chunks_summarized"] for result in results),
+        "chunks_resumed": sum(result["chunks_resumed"] for result in results),
+        "seconds": round(seconds, 3),
+        "pages_per_second": round(pages / seconds, 3) if seconds > 0 else None,
+        "book_seconds": {
+            "p50": round(statistics.median(book_seconds), 3) if book_seconds else None,
+            "p95": round(book_seconds[math.ceil(0.95 * len(book_seconds)) - 1], 3) if book_seconds else None,
+            "max": book_seconds[-1] if book_seconds else None,
+        },
+        "usage": usage,
+    }
+
+
+def _hash(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def _page_key(path: str) -> str:
+    """ページ画像の識別子（ファイルが更新された場合は別のページとして扱う）"""
+    stat = os.stat(path)
+    return _hash(os.path.abspath(path), str(stat.st_size), str(stat.st_mtime_ns))
+
+
+def _book_key(book: BookDirectory, instructions: str) -> str:
+    """書籍の識別子（ページ・指示が変わった場合は別の書籍として扱う）"""
+    return _hash(instructions, *(_page_key(path) for path in book.pages))
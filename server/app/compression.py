@@ -0,0 +1,244 @@
+"""レスポンスの圧縮モジュール
+
+JSON（とテキスト）のレスポンスを、リクエストのAccept-Encodingに応じてzstd / br / gzipで
+圧縮する（COMPRESSION_ENCODINGSの優先順、q値が同じ場合はサーバーの優先順）。
+COMPRESSION_MIN_SIZE未満のレスポンスと、ストリーミング（SSE等）のレスポンスは圧縮しない。
+
+要約の詳細のように内容が要約の更新日時で決まるレスポンスは、エンドポイントで
+圧縮済みの本文をCompressedResponseCacheに保持し、同じ表現の2回目以降の取得では
+再圧縮しない（エンドポイントでContent-Encodingを付けたレスポンスはミドルウェアで圧縮しない）。
+
+brはbrotli、zstdはzstandardがインストールされている場合のみ使用する。
+"""
+
+import gzip
+import logging
+import threading
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.metrics import RESPONSE_COMPRESSION_BYTES
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+# リクエストごとに圧縮するため、圧縮率より速度を優先したレベル
+COMPRESSION_LEVELS = {"gzip": 6, "br": 5, "zstd": 3}
+
+# 圧縮するレスポンスのメディアタイプ
+COMPRESSIBLE_MEDIA_TYPES = ("application/json", "text/plain")
+
+_INSTALLED = {"gzip": True, "br": HAS_BROTLI, "zstd": HAS_ZSTD}
+
+
+def available_encodings() -> List[str]:
+    """使用できる圧縮方式（優先順）"""
+    return [encoding for encoding in settings.COMPRESSION_ENCODINGS if _INSTALLED.get(encoding)]
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Accept-Encodingから使用する圧縮方式を選ぶ
+
+    Args:
+        accept_encoding: Accept-Encodingヘッダーの値
+
+    Returns:
+        圧縮方式（gzip / br / zstd）、圧縮しない場合はNone
+    """
+    if not settings.COMPRESSION_ENABLED or not accept_encoding:
+        return None
+
+    qualities = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        name = name.strip().lower()
+        if name:
+            qualities[name] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in available_encodings():
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """本文を圧縮する
+
+    Args:
+        body: 圧縮する本文
+        encoding: 圧縮方式（gzip / br / zstd）
+
+    Returns:
+        圧縮した本文
+    """
+    level = COMPRESSION_LEVELS[encoding]
+    if encoding == "gzip":
+        compressed = gzip.compress(body, compresslevel=level, mtime=0)
+    elif encoding == "br":
+        compressed = brotli.compress(body, quality=level)
+    elif encoding == "zstd":
+        compressed = zstandard.ZstdCompressor(level=level).compress(body)
+    else:
+        raise ValueError(f"未対応の圧縮方式です: {encoding}")
+    RESPONSE_COMPRESSION_BYTES.labels(encoding, "input").inc(len(body))
+    RESPONSE_COMPRESSION_BYTES.labels(encoding, "output").inc(len(compressed))
+    return compressed
+
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """If-None-MatchにETagが含まれるかどうか（弱い比較）"""
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+class CompressedResponseCache:
+    """エンコード済みのレスポンス本文を保持するLRUキャッシュ
+
+    キーの先頭の要素（要約ID）ごとに削除できる。本文の合計サイズが上限を超えた場合は
+    最も長く使われていないものから削除する。
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        """
+        Args:
+            max_bytes: 本文の合計サイズの上限（省略時はCOMPRESSION_CACHE_MAX_BYTES）
+        """
+        self._max_bytes = settings.COMPRESSION_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._entries: "OrderedDict[Tuple[Hashable, ...], Tuple[bytes, Optional[str]]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[Tuple[bytes, Optional[str]]]:
+        """キャッシュされた本文と圧縮方式を取得する（ない場合はNone）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Tuple[Hashable, ...], body: bytes, encoding: Optional[str]) -> None:
+        """本文と圧縮方式を保存する（上限より大きい本文は保存しない）"""
+        if len(body) > self._max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous[0])
+            self._entries[key] = (body, encoding)
+            self._size += len(body)
+            while self._size > self._max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def invalidate(self, owner: Hashable) -> int:
+        """キーの先頭の要素が一致するものを削除する
+
+        Returns:
+            削除した件数
+        """
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == owner]
+            for key in keys:
+                self._size -= len(self._entries.pop(key)[0])
+        return len(keys)
+
+
+class CompressionMiddleware:
+    """Accept-Encodingに応じてレスポンスを圧縮するASGIミドルウェア
+
+    本文を1回で送信するレスポンスのみ圧縮する（複数回に分けて送信するストリーミングの
+    レスポンスはそのまま送る）。圧縮はスレッドプールで行い、イベントループを止めない。
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None):
+        """
+        Args:
+            app: ASGIアプリケーション
+            minimum_size: 圧縮する最小サイズ（バイト、省略時はCOMPRESSION_MIN_SIZE）
+        """
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                media_type = headers.get("content-type", "").split(";")[0].strip()
+                if "content-encoding" in headers or media_type not in COMPRESSIBLE_MEDIA_TYPES:
+                    passthrough = True
+                    await send(message)
+                else:
+                    # 本文の大きさが分かるまで送信を保留する
+                    start_message = message
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = await run_in_threadpool(compress, body, encoding)
+            headers = MutableHeaders(raw=start_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            if len(compressed) < len(body):
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(compressed))
+                body = compressed
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+# 要約詳細のレスポンスのキャッシュ（キーは要約ID・ETag・圧縮方式）
+summary_response_cache = CompressedResponseCache()
@@ -1,8 +1,12 @@
+import time
+
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.config import settings
+from app.metrics import DB_POOL_CHECKOUT_DURATION
+from app.tracing import instrument_session_commits
 
 # データベースエンジンを作成
 engine = create_engine(
@@ -10,8 +14,30 @@ engine = create_engine(
     connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
 )
 
+
+def _instrument_pool_checkout(pool) -> None:
+    """コネクションプールからの接続取得時間を計測する
+
+    SQLAlchemyのプールイベントには取得開始のフックがないため、
+    プールのconnectメソッドをラップして待ち時間を含めて計測する。
+    """
+    pool_connect = pool.connect
+
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            return pool_connect()
+        finally:
+            DB_POOL_CHECKOUT_DURATION.observe(time.perf_counter() - start)
+
+    pool.connect = timed_connect
+
+
+_instrument_pool_checkout(engine.pool)
+
 # セッションファクトリを作成
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+instrument_session_commits(SessionLocal)
 
 # モデルのベースクラスを作成
 Base = declarative_base()
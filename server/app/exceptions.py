@@ -76,6 +76,16 @@ class APIConnectionError(AIClientError):
         super().__init__(message=message)
 
 
+class ProviderUnavailableError(AIClientError):
+    """AIプロバイダーの一時的なエラー（5xx）"""
+
+    def __init__(self, provider: str, status_code: Optional[int] = None):
+        message = f"{provider} APIが一時的に利用できません"
+        if status_code:
+            message += f" (HTTP {status_code})"
+        super().__init__(message=message)
+
+
 class ConfigurationError(AppException):
     """設定エラー"""
 
@@ -0,0 +1,175 @@
+"""ロギング設定モジュール
+
+ログ出力をキュー経由で専用スレッドに任せ、リクエスト処理スレッドで
+ファイルI/Oが発生しないようにする。ログレベル・出力形式・ローテーションは
+Settingsから読み込む。
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import (
+    QueueHandler,
+    QueueListener,
+    RotatingFileHandler,
+    TimedRotatingFileHandler,
+)
+from typing import Dict, Optional
+
+# LogRecordの標準属性（JSON出力時にextraと区別するため）
+_RESERVED_ATTRS = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", None, None)).keys()
+) | {"message", "asctime"}
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class JSONFormatter(logging.Formatter):
+    """ログを1行のJSONとして出力するフォーマッター"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        # extraで渡された属性のみを追加する
+        for key in record.__dict__.keys() - _RESERVED_ATTRS:
+            if not key.startswith("_"):
+                payload[key] = record.__dict__[key]
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class ThreadQueueHandler(QueueHandler):
+    """同一プロセス内のスレッドにログを渡すQueueHandler
+
+    標準のQueueHandler.prepareは別プロセスへの受け渡し（pickle）を前提に、
+    呼び出し元スレッドでメッセージの整形とレコードのコピーを行う。
+    スレッド間の受け渡しではそれらは不要なため、レコードをそのまま渡して
+    整形はすべてリスナースレッドで行う。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """大量に出力されるDEBUGログを間引くフィルター
+
+    ロガー名の前方一致でサンプリング率を指定する（例: {"app.services.ocr_service": 0.1}）。
+    INFO以上のログは間引かない。乱数を使わず、N件に1件を通過させる。
+    """
+
+    def __init__(self, sample_rates: Dict[str, float]):
+        super().__init__()
+        # 長いプレフィックスを優先して照合する
+        self._rules = sorted(
+            ((prefix, rate) for prefix, rate in sample_rates.items()),
+            key=lambda rule: len(rule[0]),
+            reverse=True,
+        )
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or not self._rules:
+            return True
+        for prefix, rate in self._rules:
+            if record.name == prefix or record.name.startswith(prefix + "."):
+                if rate >= 1.0:
+                    return True
+                if rate <= 0.0:
+                    return False
+                interval = round(1 / rate)
+                with self._lock:
+                    count = self._counters.get(prefix, 0)
+                    self._counters[prefix] = count + 1
+                return count % interval == 0
+        return True
+
+
+def _create_file_handler(config) -> logging.Handler:
+    """設定に応じたローテーション付きファイルハンドラーを作成する"""
+    os.makedirs(config.LOG_DIR, exist_ok=True)
+    log_path = os.path.join(config.LOG_DIR, "app.log")
+    if config.LOG_ROTATION == "time":
+        return TimedRotatingFileHandler(
+            log_path,
+            when=config.LOG_ROTATION_WHEN,
+            backupCount=config.LOG_BACKUP_COUNT,
+            encoding="utf-8",
+        )
+    return RotatingFileHandler(
+        log_path,
+        maxBytes=config.LOG_MAX_BYTES,
+        backupCount=config.LOG_BACKUP_COUNT,
+        encoding="utf-8",
+    )
+
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(config) -> QueueListener:
+    """キュー経由の非同期ロギングを設定する
+
+    ルートロガーにはQueueHandlerのみを登録し、実際の出力（標準出力・ファイル）は
+    QueueListenerのスレッドで行う。再呼び出し時は前回のリスナーを停止して置き換える。
+
+    Args:
+        config: アプリケーション設定
+
+    Returns:
+        開始したQueueListener
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    formatter = (
+        JSONFormatter() if config.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+    )
+    handlers = [logging.StreamHandler(sys.stdout), _create_file_handler(config)]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = ThreadQueueHandler(log_queue)
+    # 間引きはキュー投入前に行い、不要なレコードのコストを抑える
+    queue_handler.addFilter(SamplingFilter(config.LOG_SAMPLE_RATES))
+
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+        handler.close()
+    root_logger.addHandler(queue_handler)
+    root_logger.setLevel(config.LOG_LEVEL.upper())
+
+    # デバッグモードではアプリケーションのロガーのみDEBUGにする
+    logging.getLogger("app").setLevel(logging.DEBUG if config.DEBUG else logging.NOTSET)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging() -> None:
+    """キューに残ったログを出力してリスナーを停止する"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,500 @@
+"""メトリクス収集モジュール
+
+Prometheusテキスト形式で公開できるカウンター・ゲージ・ヒストグラムを提供する。
+記録処理はリクエストのホットパスで呼ばれるため、ラベルごとの子メトリクスを
+キャッシュし、記録時はロック1回と数値演算のみで済むようにしている。
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# デフォルトのヒストグラム境界値（秒）
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0,
+)
+
+
+def _format_value(value: float) -> str:
+    """数値をPrometheus形式の文字列に変換する"""
+    if value == float("inf"):
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _escape_label(value: str) -> str:
+    """ラベル値をエスケープする"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """ラベル部分の文字列を生成する"""
+    pairs = [f'{n}="{_escape_label(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """メトリクスの基底クラス"""
+
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+        # 呼び出し時の引数そのままをキーにした検索用キャッシュ
+        self._lookup: Dict[tuple, "_Metric"] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        """ラベル値に対応する子メトリクスを取得する
+
+        Args:
+            *values: ラベル値（labelnamesと同じ順序）
+
+        Returns:
+            子メトリクス
+        """
+        child = self._lookup.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(
+                    f"ラベル数が一致しません: {self.name} expects {self.labelnames}"
+                )
+            key = tuple(str(v) for v in values)
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+                self._lookup[values] = child
+        return child
+
+    def _new_child(self) -> "_Metric":
+        raise NotImplementedError
+
+    def _samples(self) -> Iterable[Tuple[str, Tuple[str, ...], str, float]]:
+        """(サフィックス, ラベル値, 追加ラベル, 値)を列挙する"""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        """Prometheusテキスト形式の行を生成する"""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        for suffix, values, extra, value in self._samples():
+            labels = _format_labels(self.labelnames, values, extra)
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+
+class Counter(_Metric):
+    """単調増加するカウンター"""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """ラベルなしカウンターを加算する"""
+        self._default.inc(amount)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            yield "", values, "", child._value
+
+
+class _GaugeChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        self._value = float(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value -= amount
+
+
+class Gauge(_Metric):
+    """増減する現在値"""
+
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        """ラベルなしゲージに値を設定する"""
+        self._default.set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        """ラベルなしゲージを加算する"""
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        """ラベルなしゲージを減算する"""
+        self._default.dec(amount)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            yield "", values, "", child._value
+
+
+class _HistogramChild:
+    __slots__ = ("_upper_bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self._upper_bounds = upper_bounds
+        self._counts = [0] * (len(upper_bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def time(self) -> "_Timer":
+        """経過時間を記録するコンテキストマネージャーを返す"""
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child: _HistogramChild):
+        self._child = child
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._child.observe(time.perf_counter() - self._start)
+
+
+class Histogram(_Metric):
+    """値の分布を記録するヒストグラム"""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self._upper_bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self._upper_bounds)
+
+    def observe(self, value: float) -> None:
+        """ラベルなしヒストグラムに値を記録する"""
+        self._default.observe(value)
+
+    def time(self) -> _Timer:
+        """ラベルなしヒストグラムに経過時間を記録する"""
+        return self._default.time()
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            with child._lock:
+                counts = list(child._counts)
+                total = child._sum
+            cumulative = 0
+            for bound, count in zip(self._upper_bounds + (float("inf"),), counts):
+                cumulative += count
+                yield "_bucket", values, f'le="{_format_value(bound)}"', cumulative
+            yield "_count", values, "", cumulative
+            yield "_sum", values, "", total
+
+
+class MetricsRegistry:
+    """メトリクスを登録し、まとめて出力するレジストリ"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """メトリクスを登録する
+
+        Args:
+            metric: 登録するメトリクス
+
+        Returns:
+            登録したメトリクス（同名が登録済みの場合は既存のもの）
+        """
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """カウンターを作成して登録する"""
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """ゲージを作成して登録する"""
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Optional[Sequence[float]] = None,
+    ) -> Histogram:
+        """ヒストグラムを作成して登録する"""
+        return self.register(
+            Histogram(name, documentation, labelnames, buckets or DEFAULT_BUCKETS)
+        )
+
+    def render(self) -> str:
+        """登録済みの全メトリクスをPrometheusテキスト形式で出力する"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Prometheusテキスト形式のContent-Type
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# グローバルレジストリ
+registry = MetricsRegistry()
+
+
+# ============================================
+# アプリケーションのメトリクス定義
+# ============================================
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTPリクエストの処理時間（秒）",
+    ("method", "route", "status"),
+)
+
+OCR_PAGE_DURATION = registry.histogram(
+    "ocr_page_duration_seconds",
+    "1ページあたりのOCR処理時間（秒）",
+    ("engine", "outcome"),
+)
+
+LLM_REQUEST_DURATION = registry.histogram(
+    "llm_request_duration_seconds",
+    "AI API呼び出しの処理時間（秒）",
+    ("model", "outcome"),
+)
+
+LLM_TOKENS = registry.counter(
+    "llm_tokens_total",
+    "AI API呼び出しで使用したトークン数（prompt: 入力、completion: 出力、cached: プロンプトキャッシュから読み込んだ入力、cache_write: キャッシュに書き込んだ入力）",
+    ("model", "kind"),
+)
+
+LLM_COST = registry.counter(
+    "llm_cost_usd_total",
+    "AI API呼び出しの費用の見積もり（USD、価格が不明なモデルは含まない）",
+    ("model",),
+)
+
+LLM_RETRIES = registry.counter(
+    "llm_retries_total",
+    "AI API呼び出しのリトライ回数",
+    ("model", "reason"),
+)
+
+LLM_FAILOVERS = registry.counter(
+    "llm_failovers_total",
+    "AI API呼び出しの失敗により他のモデルに切り替えた回数（失敗したモデル・エラーの種類）",
+    ("model", "reason"),
+)
+
+LLM_ROUTE_LATENCY = registry.gauge(
+    "llm_route_latency_seconds",
+    "モデルの選択に使用する処理時間の移動平均（秒）",
+    ("model",),
+)
+
+LLM_RATE_LIMIT_REMAINING = registry.gauge(
+    "llm_rate_limit_remaining_ratio",
+    "レスポンスヘッダーから取得したレート制限の残量の割合",
+    ("model",),
+)
+
+LLM_RATE_LIMIT_WAIT = registry.histogram(
+    "llm_rate_limit_wait_seconds",
+    "レート制限の回復・呼び出しの間隔を待った時間（秒）",
+    ("model",),
+)
+
+JOB_QUEUE_DEPTH = registry.gauge(
+    "job_queue_depth",
+    "未完了のジョブ数",
+    ("kind",),
+)
+
+JOB_ITEMS_PROCESSED = registry.counter(
+    "job_items_processed_total",
+    "ジョブで処理済みのアイテム数（ページ・チャンク）",
+    ("kind",),
+)
+
+SUMMARY_CHUNKS = registry.counter(
+    "summary_chunks_total",
+    "要約で処理したチャンク数（reused: 差分要約のキャッシュを再利用、resumed: チェックポイントから再開、summarized: AIで要約）",
+    ("outcome",),
+)
+
+DB_POOL_CHECKOUT_DURATION = registry.histogram(
+    "db_pool_checkout_duration_seconds",
+    "コネクションプールからの接続取得時間（秒）",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+
+UPLOAD_BYTES = registry.counter(
+    "upload_bytes_total",
+    "アップロードされたバイト数",
+)
+
+UPLOAD_DEDUPLICATED_BYTES = registry.counter(
+    "upload_deduplicated_bytes_total",
+    "保存済みのファイルと同じ内容のため保存を省略したバイト数",
+)
+
+FILE_GC_REMOVED = registry.counter(
+    "file_gc_removed_total",
+    "ガベージコレクションで削除したファイル数（blob: 参照されないファイル、orphan: 登録のないファイル、temp: 書き込み途中のファイル）",
+    ("kind",),
+)
+
+THUMBNAIL_REQUESTS = registry.counter(
+    "thumbnail_requests_total",
+    "サムネイルの要求数（hit: キャッシュを使用、created: 作成）",
+    ("outcome",),
+)
+
+UPLOAD_THROUGHPUT = registry.histogram(
+    "upload_throughput_bytes_per_second",
+    "ファイル保存のスループット（バイト/秒）",
+    buckets=(1e5, 1e6, 5e6, 1e7, 5e7, 1e8, 5e8, 1e9),
+)
+
+SEARCH_QUERY_DURATION = registry.histogram(
+    "search_query_duration_seconds",
+    "全文検索の処理時間（秒、スニペット作成を含む）",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+SEARCH_INDEX_UPDATES = registry.counter(
+    "search_index_updates_total",
+    "全文検索インデックスの更新数（indexed: 登録・更新、removed: 削除、error: 失敗）",
+    ("outcome",),
+)
+
+OCR_PAGES_REUSED = registry.counter(
+    "ocr_pages_reused_total",
+    "他のページからOCR結果を再利用したページ数（exact: 同じ内容のファイル、similar: 近似重複）",
+    ("match",),
+)
+
+JANITOR_RECLAIMED = registry.counter(
+    "janitor_reclaimed_total",
+    "定期清掃で削除した件数（temporary_summary: 一時的な要約、image: 画像、job: ジョブ、file: ファイル）",
+    ("kind",),
+)
+
+JANITOR_RECLAIMED_BYTES = registry.counter(
+    "janitor_reclaimed_bytes_total",
+    "定期清掃で削除したファイルの合計サイズ（バイト）",
+)
+
+ADMISSION_QUEUE_DEPTH = registry.gauge(
+    "admission_queue_depth",
+    "同時実行数の上限により実行待ちのリクエスト数",
+    ("endpoint",),
+)
+
+ADMISSION_IN_FLIGHT = registry.gauge(
+    "admission_in_flight",
+    "同時実行数の制限の対象で実行中のリクエスト数",
+    ("endpoint",),
+)
+
+ADMISSION_QUEUE_WAIT = registry.histogram(
+    "admission_queue_wait_seconds",
+    "同時実行数の上限による待ち時間（秒）",
+    ("endpoint",),
+)
+
+ADMISSION_REJECTED = registry.counter(
+    "admission_rejected_total",
+    "同時実行数の上限により拒否したリクエスト数（queue_full: 待ち行列が満杯（429）、timeout: 待ち時間の上限（503））",
+    ("endpoint", "reason"),
+)
+
+SINGLE_FLIGHT_COALESCED = registry.counter(
+    "single_flight_coalesced_total",
+    "同じ内容の処理が実行中だったため、新たに実行せずその結果を使用した数（scope: process / cluster）",
+    ("name", "scope"),
+)
+
+JOB_CALLBACKS = registry.counter(
+    "job_callbacks_total",
+    "ジョブ完了時のコールバック（Webhook）の送信数（outcome: delivered / failed）",
+    ("outcome",),
+)
+
+RESPONSE_COMPRESSION_BYTES = registry.counter(
+    "response_compression_bytes_total",
+    "圧縮したレスポンスのサイズ（stage: input（圧縮前） / output（圧縮後））",
+    ("encoding", "stage"),
+)
+
+RESPONSE_CACHE_REQUESTS = registry.counter(
+    "response_cache_requests_total",
+    "要約詳細のレスポンスのキャッシュの利用（outcome: hit / miss / not_modified（304））",
+    ("outcome",),
+)
@@ -1,5 +1,9 @@
 from app.models.summary import Summary
 from app.models.image import Image
+from app.models.summary_chunk import SummaryChunk
+from app.models.image_hash_band import ImageHashBand
+from app.models.file_blob import FileBlob
+from app.models.summary_usage import SummaryUsage
 
 # モデルをここにインポートすることで、他のモジュールから簡単にインポートできるようになります
 # 例: from app.models import Summary, Image
@@ -0,0 +1,74 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String, event, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.database import Base
+from app.models.image import Image
+
+
+class FileBlob(Base):
+    """コンテンツアドレス方式で保存したファイル（内容のSHA-256で命名）
+
+    同じ内容のファイルは1つだけ保存し、参照する画像の数をref_countで管理する。
+    ref_countが0になったファイルはガベージコレクションで削除する。
+    """
+    __tablename__ = "file_blobs"
+
+    content_hash = Column(String(64), primary_key=True)
+    file_path = Column(String(255), nullable=False)
+    file_size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # 参照数が最後に変わった日時（ガベージコレクションの猶予期間の基準）
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<FileBlob(content_hash={self.content_hash}, ref_count={self.ref_count})>"
+
+
+# 画像の追加・削除と同じトランザクションで参照数を更新する
+# （要約の削除による画像の連鎖削除も含む。Query.deleteによる一括削除は対象外）
+
+@event.listens_for(Image, "after_insert")
+def _increment_ref_count(mapper, connection, target: Image) -> None:
+    if not target.content_hash:
+        return
+    now = datetime.utcnow()
+    values = {
+        "content_hash": target.content_hash,
+        "file_path": target.file_path,
+        "file_size": target.file_size,
+        "ref_count": 1,
+        "created_at": now,
+        "updated_at": now,
+    }
+    table = FileBlob.__table__
+    if connection.dialect.name in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+        stmt = dialect_insert(table).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.content_hash],
+            set_={"ref_count": table.c.ref_count + 1, "updated_at": now},
+        )
+        connection.execute(stmt)
+        return
+
+    result = connection.execute(
+        update(table)
+        .where(table.c.content_hash == target.content_hash)
+        .values(ref_count=table.c.ref_count + 1, updated_at=now)
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(**values))
+
+
+@event.listens_for(Image, "after_delete")
+def _decrement_ref_count(mapper, connection, target: Image) -> None:
+    if not target.content_hash:
+        return
+    table = FileBlob.__table__
+    connection.execute(
+        update(table)
+        .where(table.c.content_hash == target.content_hash)
+        .values(ref_count=table.c.ref_count - 1, updated_at=datetime.utcnow())
+    )
@@ -1,10 +1,11 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey
+from sqlalchemy import BigInteger, Column, String, Integer, DateTime, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
 from app.database import Base
+from app.models.types import CompressedText
 
 
 class Image(Base):
@@ -14,15 +15,25 @@ class Image(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     summary_id = Column(UUID(as_uuid=True), ForeignKey("summaries.id"), nullable=False)
     file_path = Column(String(255), nullable=False)
+    # ファイル内容のSHA-256（コンテンツアドレス方式で保存したファイル。以前の形式のファイルはNULL）
+    content_hash = Column(String(64), nullable=True, index=True)
     file_name = Column(String(255), nullable=False)
     file_size = Column(Integer, nullable=False)
     mime_type = Column(String(100), nullable=False)
-    ocr_text = Column(Text, nullable=True)
+    ocr_text = Column(CompressedText, nullable=True)
     page_number = Column(Integer, nullable=False)
+    # 知覚ハッシュ（64ビットを符号付きで保存、白紙・未計算の場合はNULL）
+    dhash = Column(BigInteger, nullable=True)
+    phash = Column(BigInteger, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # OCRテキスト・ページ番号等の更新日時（要約詳細のETagに使用、追加前の画像はNULL）
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
     
     # リレーションシップ
     summary = relationship("Summary", back_populates="images")
+    hash_bands = relationship(
+        "ImageHashBand", back_populates="image", cascade="all, delete-orphan"
+    )
     
     def __repr__(self):
         return f"<Image(id={self.id}, file_name='{self.file_name}', page_number={self.page_number})>"
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, ForeignKey, Index, SmallInteger
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+
+from app.database import Base
+
+
+class ImageHashBand(Base):
+    """画像の知覚ハッシュ（pHash）を8ビットずつに分割したバンド
+
+    ハミング距離が小さい画像は少なくとも1つのバンドが一致するため、
+    (band, value)のインデックスで近似重複の候補を検索する。
+    """
+    __tablename__ = "image_hash_bands"
+    __table_args__ = (
+        Index("ix_image_hash_bands_band_value", "band", "value"),
+    )
+
+    image_id = Column(
+        UUID(as_uuid=True), ForeignKey("images.id", ondelete="CASCADE"), primary_key=True
+    )
+    band = Column(SmallInteger, primary_key=True)
+    value = Column(SmallInteger, nullable=False)
+
+    # リレーションシップ
+    image = relationship("Image", back_populates="hash_bands")
+
+    def __repr__(self):
+        return f"<ImageHashBand(image_id={self.image_id}, band={self.band}, value={self.value})>"
@@ -2,9 +2,10 @@ import uuid
 from datetime import datetime
 from sqlalchemy import Column, String, Text, DateTime, func
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 
 from app.database import Base
+from app.models.types import CompressedText
 
 
 class Summary(Base):
@@ -15,13 +16,24 @@ class Summary(Base):
     title = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)
     custom_instructions = Column(Text, nullable=True)  # カスタム指示
-    original_text = Column(Text, nullable=False)
-    summarized_text = Column(Text, nullable=False)
+    # 大きなテキストは圧縮して保存し、参照されるまで読み込まない
+    original_text = deferred(Column(CompressedText, nullable=False))
+    summarized_text = deferred(Column(CompressedText, nullable=False))
+    # 最後に生成した要約の内容（要約・指示・ページ）のキーと生成日時（同時に送信された生成の重複の抑止に使用）
+    generation_key = Column(String(64), nullable=True)
+    generated_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     # リレーションシップ
     images = relationship("Image", back_populates="summary", cascade="all, delete-orphan")
+    chunks = relationship(
+        "SummaryChunk",
+        back_populates="summary",
+        cascade="all, delete-orphan",
+        order_by="SummaryChunk.chunk_index",
+    )
+    usage = relationship("SummaryUsage", back_populates="summary", cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<Summary(id={self.id}, title='{self.title}')>"
@@ -0,0 +1,38 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+
+from app.database import Base
+
+
+class SummaryChunk(Base):
+    """チャンク単位の要約結果モデル
+
+    再生成時に元ページの内容が変わっていないチャンクの結果を再利用するため、
+    元テキストと指示のハッシュとともに保存する。要約の途中で失敗・中断した場合の
+    チェックポイントを兼ねる（app/services/chunk_checkpoint.py）。ページ境界で区切らない
+    全文の要約のチャンクは、ページ範囲をNULLとする。
+    """
+    __tablename__ = "summary_chunks"
+    __table_args__ = (
+        UniqueConstraint("summary_id", "source_hash", name="uq_summary_chunks_summary_hash"),
+    )
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    summary_id = Column(
+        UUID(as_uuid=True), ForeignKey("summaries.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    chunk_index = Column(Integer, nullable=False)
+    first_page = Column(Integer, nullable=True)
+    last_page = Column(Integer, nullable=True)
+    source_hash = Column(String(64), nullable=False)
+    summarized_text = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    # リレーションシップ
+    summary = relationship("Summary", back_populates="chunks")
+    
+    def __repr__(self):
+        return f"<SummaryChunk(summary_id={self.summary_id}, index={self.chunk_index}, pages={self.first_page}-{self.last_page})>"
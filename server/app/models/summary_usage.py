@@ -0,0 +1,36 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+
+from app.database import Base
+
+
+class SummaryUsage(Base):
+    """AI API呼び出しごとのトークン使用量・費用モデル
+
+    要約の生成1回（run_id、パイプラインジョブの場合はジョブID）の呼び出しを
+    チャンク番号・モデルとともに記録し、要約・チャンク・モデルごとに集計する。
+    """
+    __tablename__ = "summary_usage"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    summary_id = Column(
+        UUID(as_uuid=True), ForeignKey("summaries.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    run_id = Column(String(36), nullable=False, index=True)
+    chunk_index = Column(Integer, nullable=True)  # チャンク分割しない場合はNULL
+    model = Column(String(255), nullable=False)
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    cached_tokens = Column(Integer, nullable=False, default=0)
+    cache_write_tokens = Column(Integer, nullable=False, default=0)
+    cost = Column(Float, nullable=True)  # 費用の見積もり（USD、価格が不明なモデルはNULL）
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    # リレーションシップ
+    summary = relationship("Summary", back_populates="usage")
+    
+    def __repr__(self):
+        return f"<SummaryUsage(summary_id={self.summary_id}, run_id={self.run_id}, model={self.model})>"
@@ -0,0 +1,137 @@
+"""カスタムカラム型モジュール
+
+大きなテキスト列を圧縮して保存するCompressedText型を提供する。
+アプリケーションからは通常の文字列として読み書きできる。
+
+保存形式（先頭2バイトがヘッダー）:
+    1バイト目: 形式のバージョン（現在は1）
+    2バイト目: 圧縮方式（0: 非圧縮UTF-8, 1: zlib, 2: zstd）
+    3バイト目以降: 本体
+
+TEXT_COMPRESSION_MIN_SIZE未満の値は圧縮せずに保存する（短い値は圧縮しても
+小さくならず、展開のコストだけがかかるため）。
+"""
+
+import logging
+import zlib
+from functools import lru_cache
+from typing import Optional, Union
+
+from sqlalchemy import LargeBinary
+from sqlalchemy.types import TypeDecorator
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+FORMAT_VERSION = 1
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+
+_CODEC_IDS = {"none": CODEC_RAW, "zlib": CODEC_ZLIB, "zstd": CODEC_ZSTD}
+
+
+@lru_cache(maxsize=None)
+def _resolve_codec(name: str) -> int:
+    """設定値から圧縮方式を決定する（zstdが使えない場合はzlib）"""
+    codec = _CODEC_IDS.get(name.lower())
+    if codec is None:
+        logger.warning("不明なTEXT_COMPRESSION: %s（zlibを使用）", name)
+        return CODEC_ZLIB
+    if codec == CODEC_ZSTD and not HAS_ZSTD:
+        logger.warning("zstandardがインストールされていないため、zlibで圧縮します")
+        return CODEC_ZLIB
+    return codec
+
+
+def compress_text(
+    value: str,
+    codec: Optional[int] = None,
+    min_size: Optional[int] = None,
+    level: Optional[int] = None,
+) -> bytes:
+    """文字列をヘッダー付きのバイト列に変換する
+
+    Args:
+        value: 変換する文字列
+        codec: 圧縮方式（省略時は設定値）
+        min_size: 圧縮する最小サイズ（バイト、省略時は設定値）
+        level: 圧縮レベル（省略時は設定値）
+
+    Returns:
+        保存用のバイト列
+    """
+    data = value.encode("utf-8")
+    codec = _resolve_codec(settings.TEXT_COMPRESSION) if codec is None else codec
+    min_size = settings.TEXT_COMPRESSION_MIN_SIZE if min_size is None else min_size
+    level = settings.TEXT_COMPRESSION_LEVEL if level is None else level
+
+    if codec != CODEC_RAW and len(data) >= min_size:
+        if codec == CODEC_ZSTD:
+            compressed = zstandard.ZstdCompressor(level=level).compress(data)
+        else:
+            compressed = zlib.compress(data, min(level, 9))
+        # 圧縮しても小さくならない場合はそのまま保存する
+        if len(compressed) < len(data):
+            return bytes((FORMAT_VERSION, codec)) + compressed
+    return bytes((FORMAT_VERSION, CODEC_RAW)) + data
+
+
+def decompress_text(value: Union[bytes, memoryview, str]) -> str:
+    """保存されたバイト列を文字列に戻す
+
+    移行前のテキスト列から読み込んだ文字列はそのまま返す。
+
+    Args:
+        value: 保存されたバイト列
+
+    Returns:
+        元の文字列
+
+    Raises:
+        ValueError: 未対応の形式の場合
+    """
+    if isinstance(value, str):
+        return value
+    data = bytes(value)
+    if len(data) < 2 or data[0] != FORMAT_VERSION:
+        raise ValueError(f"未対応の圧縮テキスト形式です: version={data[:1]!r}")
+    codec, body = data[1], data[2:]
+    if codec == CODEC_RAW:
+        return body.decode("utf-8")
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(body).decode("utf-8")
+    if codec == CODEC_ZSTD:
+        if not HAS_ZSTD:
+            raise ValueError("zstdで圧縮されたテキストの展開にはzstandardが必要です")
+        return zstandard.ZstdDecompressor().decompress(body).decode("utf-8")
+    raise ValueError(f"未対応の圧縮方式です: codec={codec}")
+
+
+class CompressedText(TypeDecorator):
+    """圧縮して保存するテキスト型
+
+    データベース上はバイナリ列（PostgreSQLではbytea、SQLiteではBLOB）になるため、
+    SQL上で文字列関数や部分一致検索は使用できない。
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value: Optional[str], dialect) -> Optional[bytes]:
+        if value is None:
+            return None
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect) -> Optional[str]:
+        if value is None:
+            return None
+        return decompress_text(value)
@@ -0,0 +1,46 @@
+"""JSONレスポンスモジュール
+
+要約の詳細・OCR結果など、大きなテキスト（数MBの日本語）を含むレスポンスを
+orjsonで直列化するレスポンスクラスを提供する。標準のJSONResponse（json.dumps）より
+数倍速く、ensure_ascii=Falseと同じく日本語をエスケープせずUTF-8で出力する。
+
+orjsonがインストールされていない場合は標準のjsonで直列化する（出力は同じ）。
+レスポンスモデルの検証・変換はFastAPIが行い、このクラスは変換後の値を直列化するのみ。
+"""
+
+import json
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def dumps(content: Any) -> bytes:
+    """値をUTF-8のJSONに直列化する（orjsonがない場合は標準のjson）
+
+    Args:
+        content: JSONに変換できる値（レスポンスモデルで変換済みのもの）
+
+    Returns:
+        UTF-8のJSON
+    """
+    if HAS_ORJSON:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """orjsonで直列化するJSONレスポンス
+
+    大きなテキストを返すエンドポイントでresponse_classに指定する。
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,11 +1,19 @@
 from app.schemas.summary import (
     SummaryBase, SummaryCreate, SummaryUpdate,
-    SummaryDetail, SummaryList, SummaryGenerate
+    SummaryDetail, SummaryList, SummaryGenerate, OriginalTextRange,
+    SummarySearchHit, SummarySearchResult
 )
 from app.schemas.image import (
     ImageBase, ImageCreate, ImageDetail, ImageList,
+    ImageDuplicate, ImageDuplicateList, ImageUploadResult,
     OCRRequest, OCRResult, OCRResponse
 )
+from app.schemas.job import PipelineRequest, SummaryJobStatus
+from app.schemas.batch import BatchRequest, BatchItemStatus, BatchStatus
+from app.schemas.usage import (
+    UsageTotals, ModelUsage, ChunkUsage, RunUsage,
+    SummaryUsageReport, SummaryUsageItem, UsageReport
+)
 
 # スキーマをここにインポートすることで、他のモジュールから簡単にインポートできるようになります
 # 例: from app.schemas import SummaryCreate, ImageDetail
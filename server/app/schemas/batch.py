@@ -0,0 +1,43 @@
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+from pydantic import BaseModel, Field
+
+from app.schemas.usage import UsageTotals
+
+
+# リクエスト用スキーマ
+class BatchRequest(BaseModel):
+    """一括要約リクエスト"""
+    summary_ids: List[UUID] = Field(..., min_length=1, description="要約IDのリスト（この順に開始する）")
+    custom_instructions: Optional[str] = Field(None, description="カスタム指示（全書籍に共通、デフォルトは要約）")
+
+
+# レスポンス用スキーマ
+class BatchItemStatus(BaseModel):
+    """一括要約の書籍ごとのステータス"""
+    summary_id: UUID
+    status: str
+    job_id: Optional[str] = Field(None, description="パイプラインジョブのID（開始前はnull）")
+    pages_total: Optional[int] = None
+    pages_done: Optional[int] = None
+    chunks_done: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BatchStatus(BaseModel):
+    """一括要約のステータス"""
+    batch_id: str
+    status: str
+    total: int = Field(..., description="書籍数")
+    pending: int = Field(..., description="開始待ちの書籍数")
+    processing: int = Field(..., description="処理中の書籍数")
+    completed: int = Field(..., description="完了した書籍数")
+    failed: int = Field(..., description="失敗した書籍数")
+    pages_total: int = Field(..., description="開始した書籍のページ数の合計")
+    pages_done: int
+    chunks_dispatched: int
+    chunks_done: int
+    usage: UsageTotals = Field(..., description="トークン使用量・費用の合計（処理中は途中までの合計）")
+    items: List[BatchItemStatus]
+    created_at: datetime
@@ -31,6 +31,36 @@ class ImageBase(BaseModel):
     }
 
 
+class ImageDuplicate(BaseModel):
+    """近似重複の画像"""
+    image_id: UUID
+    summary_id: UUID
+    page_number: int
+    file_name: str
+    distance: int = Field(..., description="dHash・pHashのハミング距離の大きい方（0-64）")
+    dhash_distance: int
+    phash_distance: int
+    has_ocr_text: bool
+    same_summary: bool
+
+    model_config = {
+        "from_attributes": True
+    }
+
+
+class ImageUploadResult(ImageBase):
+    """アップロードされた画像の情報"""
+    duplicates: List[ImageDuplicate] = Field(
+        default_factory=list, description="ライブラリ内の近似重複の画像（警告用）"
+    )
+
+
+class ImageDuplicateList(BaseModel):
+    """近似重複の画像一覧レスポンス"""
+    items: List[ImageDuplicate]
+    total: int
+
+
 class ImageDetail(ImageBase):
     """画像の詳細情報"""
     file_path: str
@@ -64,6 +94,7 @@ class OCRResult(BaseModel):
     ocr_text: str
     success: bool
     error: Optional[str] = None
+    reused_from: Optional[UUID] = Field(None, description="OCR結果を再利用した近似重複の画像ID")
 
 
 class OCRResponse(BaseModel):
@@ -0,0 +1,32 @@
+from typing import List, Optional
+from uuid import UUID
+from pydantic import BaseModel, Field
+
+from app.schemas.usage import UsageTotals
+
+
+# リクエスト用スキーマ
+class PipelineRequest(BaseModel):
+    """パイプライン実行リクエスト"""
+    summary_id: UUID = Field(..., description="要約ID")
+    custom_instructions: Optional[str] = Field(None, description="カスタム指示（デフォルトは要約）")
+
+
+# レスポンス用スキーマ
+class SummaryJobStatus(BaseModel):
+    """要約ジョブのステータス"""
+    job_id: str
+    summary_id: UUID
+    status: str
+    pages_total: int
+    pages_done: int
+    chunks_total: Optional[int] = Field(None, description="要約するチャンク数（不明な間はnull）")
+    chunks_dispatched: int
+    chunks_done: int
+    errors: List[str] = []
+    partial_text: Optional[str] = Field(
+        None, description="処理中の途中結果（完了したチャンクの結果をチャンク順に結合、完了後はnull）"
+    )
+    summarized_text: Optional[str] = None
+    error: Optional[str] = None
+    usage: Optional[UsageTotals] = Field(None, description="トークン使用量・費用（処理中は途中までの合計）")
@@ -23,6 +23,12 @@ class SummaryGenerate(BaseModel):
     """要約生成リクエスト"""
     summary_id: UUID = Field(..., description="要約ID")
     custom_instructions: Optional[str] = Field(None, description="カスタム指示（デフォルトは要約）")
+    incremental: Optional[bool] = Field(
+        None, description="変更のあったチャンクのみ再要約する（省略時は設定値INCREMENTAL_SUMMARY）"
+    )
+    background: bool = Field(
+        False, description="バックグラウンドのジョブとして実行し、ジョブのステータスを202ですぐに返す"
+    )
 
 
 # レスポンス用スキーマ
@@ -42,14 +48,51 @@ class SummaryBase(BaseModel):
 
 class SummaryDetail(SummaryBase):
     """要約の詳細情報"""
-    original_text: str
+    original_text: Optional[str] = Field(None, description="元テキスト（除外した場合はnull）")
     summarized_text: str
+    original_text_truncated: bool = Field(False, description="元テキストを切り詰めたかどうか")
+    summarized_text_truncated: bool = Field(False, description="要約テキストを切り詰めたかどうか")
 
     model_config = {
         "from_attributes": True
     }
 
 
+class OriginalTextRange(BaseModel):
+    """ページ範囲を指定した元テキスト"""
+    summary_id: UUID
+    start_page: Optional[int] = Field(None, description="含まれる先頭のページ番号")
+    end_page: Optional[int] = Field(None, description="含まれる末尾のページ番号")
+    page_count: int = Field(..., description="含まれるページ数")
+    total_pages: int = Field(..., description="OCRテキストのある全ページ数")
+    text: str
+    truncated: bool = False
+
+
+class SummarySearchHit(SummaryBase):
+    """全文検索の結果（1件）"""
+    score: float = Field(..., description="関連度（大きいほど関連が高い）")
+    snippet: Optional[str] = Field(
+        None, description="一致箇所の抜粋（HTMLエスケープ済み、一致部分は<mark>で囲む）"
+    )
+    matched_field: Optional[str] = Field(
+        None, description="抜粋元の項目（summarized_text / description / ocr_text）"
+    )
+    page_number: Optional[int] = Field(None, description="OCRテキストに一致した場合のページ番号")
+
+
+class SummarySearchResult(BaseModel):
+    """全文検索レスポンス"""
+    items: List[SummarySearchHit]
+    total: int
+    total_capped: bool = Field(
+        False, description="一致件数が多く、新しいものから上限件数までを対象にした場合はtrue"
+    )
+    page: int
+    page_size: int
+    query: str
+
+
 class SummaryList(BaseModel):
     """要約一覧レスポンス"""
     items: List[SummaryBase]
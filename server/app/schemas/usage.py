@@ -0,0 +1,56 @@
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+from pydantic import BaseModel, Field
+
+
+# レスポンス用スキーマ
+class UsageTotals(BaseModel):
+    """トークン使用量・費用の合計"""
+    calls: int = Field(0, description="AI API呼び出し回数")
+    prompt_tokens: int = Field(0, description="入力トークン数（キャッシュから読み込んだ分を含む）")
+    completion_tokens: int = Field(0, description="出力トークン数")
+    cached_tokens: int = Field(0, description="プロンプトキャッシュから読み込んだ入力トークン数")
+    cache_write_tokens: int = Field(0, description="プロンプトキャッシュに書き込んだ入力トークン数")
+    cost: float = Field(0.0, description="費用の見積もり（USD、価格が不明な呼び出しは含まない）")
+    unpriced_calls: int = Field(0, description="価格が不明なモデルの呼び出し回数")
+
+
+class ModelUsage(UsageTotals):
+    """モデルごとの使用量"""
+    model: str
+
+
+class ChunkUsage(UsageTotals):
+    """チャンクごとの使用量"""
+    chunk_index: Optional[int] = Field(None, description="チャンク番号（0始まり、分割しない場合はnull）")
+
+
+class RunUsage(UsageTotals):
+    """要約の生成1回ごとの使用量"""
+    run_id: str = Field(..., description="生成ID（パイプラインジョブの場合はジョブID）")
+    started_at: datetime
+    chunks: List[ChunkUsage] = []
+
+
+class SummaryUsageReport(BaseModel):
+    """要約のトークン使用量レスポンス"""
+    summary_id: UUID
+    total: UsageTotals
+    models: List[ModelUsage]
+    runs: List[RunUsage] = Field(..., description="生成ごとの使用量（新しい順）")
+
+
+class SummaryUsageItem(UsageTotals):
+    """要約ごとの使用量（集計の1件）"""
+    summary_id: UUID
+    title: str
+
+
+class UsageReport(BaseModel):
+    """期間内のトークン使用量の集計レスポンス"""
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    total: UsageTotals
+    models: List[ModelUsage]
+    summaries: List[SummaryUsageItem] = Field(..., description="トークン数の多い要約（多い順）")
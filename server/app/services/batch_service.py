@@ -0,0 +1,293 @@
+"""一括要約（バッチ）モジュール
+
+夜間にまとめて取り込んだ多数の書籍を、1回の依頼でOCRから要約まで実行する。
+書籍ごとの処理はパイプラインジョブ（app/services/pipeline.py）で行い、
+バッチ全体では同時に実行するジョブ数をBATCH_MAX_RUNNINGまでに制限する
+（AI APIの呼び出しはレート制限（app/services/rate_limiter.py）を全体で共有する）。
+
+複数のバッチが登録されている場合は、バッチ間で1冊ずつ順番に実行枠を割り当てる
+（大きなバッチの後に登録された小さなバッチが、大きなバッチの完了まで待たされないようにする）。
+
+バッチの状態はプロセス内に保持する（パイプラインジョブと同じく、再起動すると失われる）。
+"""
+
+import logging
+import threading
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config import settings
+from app.database import SessionLocal
+from app.exceptions import AppException, SummaryGenerationError
+from app.metrics import JOB_QUEUE_DEPTH
+from app.models import Image, Summary
+from app.services.duplicate_service import duplicate_service
+from app.services.janitor import janitor
+from app.services.job_manager import JobStatus
+from app.services.pipeline import start_pipeline_job
+from app.services.prompts import BookContext
+from app.services.summary_jobs import SummaryJobManager, summary_job_manager
+
+logger = logging.getLogger(__name__)
+
+# 書籍ごとの進捗のうち、バッチ全体で合計する項目
+_PROGRESS_FIELDS = ("pages_total", "pages_done", "chunks_dispatched", "chunks_done")
+
+
+@dataclass
+class BatchItem:
+    """バッチ内の1冊"""
+
+    summary_id: str
+    status: JobStatus = JobStatus.PENDING
+    job_id: Optional[str] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class Batch:
+    """バッチ情報"""
+
+    batch_id: str
+    items: List[BatchItem]
+    custom_instructions: Optional[str] = None
+    next_index: int = 0  # 次に開始する書籍の位置
+    created_at: datetime = field(default_factory=datetime.now)
+    updated_at: datetime = field(default_factory=datetime.now)
+
+    @property
+    def is_finished(self) -> bool:
+        """すべての書籍が終了状態かどうか"""
+        return all(item.status in (JobStatus.COMPLETED, JobStatus.FAILED) for item in self.items)
+
+
+class BatchScheduler:
+    """複数の書籍の要約を、全体の同時実行数を守りながら公平に実行するクラス
+
+    バッチはAPIスレッドから登録され、パイプラインジョブの終了時にジョブのスレッドから
+    次の書籍を開始するため、すべての操作をロックで保護する。
+    """
+
+    def __init__(
+        self,
+        job_mgr: Optional[SummaryJobManager] = None,
+        max_running: Optional[int] = None,
+    ):
+        """
+        Args:
+            job_mgr: パイプラインジョブのジョブマネージャー（省略時はグローバルインスタンスを使用）
+            max_running: 同時に実行する書籍数（省略時はBATCH_MAX_RUNNING）
+        """
+        self._job_mgr = job_mgr or summary_job_manager
+        self._max_running = max(1, max_running or settings.BATCH_MAX_RUNNING)
+        self._batches: Dict[str, Batch] = {}
+        # 開始待ちの書籍があるバッチ（先頭のバッチから1冊ずつ開始し、末尾に回す）
+        self._ready: Deque[str] = deque()
+        self._running = 0
+        self._lock = threading.Lock()
+
+    def submit(self, summary_ids: List[uuid.UUID], custom_instructions: Optional[str] = None) -> str:
+        """バッチを登録し、実行枠の空きに応じて書籍の処理を開始する
+
+        Args:
+            summary_ids: 要約IDのリスト（この順に開始する）
+            custom_instructions: カスタム指示（全書籍に共通）
+
+        Returns:
+            バッチID
+        """
+        batch_id = str(uuid.uuid4())
+        batch = Batch(
+            batch_id=batch_id,
+            items=[BatchItem(summary_id=str(summary_id)) for summary_id in summary_ids],
+            custom_instructions=custom_instructions,
+        )
+        with self._lock:
+            self._batches[batch_id] = batch
+            if batch.items:
+                self._ready.append(batch_id)
+        JOB_QUEUE_DEPTH.labels("batch_item").inc(len(batch.items))
+        logger.info("バッチ登録: batch_id=%s, 書籍数=%d", batch_id, len(batch.items))
+        self._dispatch()
+        return batch_id
+
+    def get_status(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """バッチのステータス（書籍ごとの状態と全体の進捗）を取得する
+
+        Args:
+            batch_id: バッチID
+
+        Returns:
+            バッチのステータス（BatchStatusと同じ項目）、見つからない場合はNone
+        """
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if batch is None:
+                return None
+            items = [
+                (item.summary_id, item.status, item.job_id, item.error) for item in batch.items
+            ]
+            finished = batch.is_finished
+            created_at = batch.created_at
+
+        counts = {status: 0 for status in JobStatus}
+        progress = dict.fromkeys(_PROGRESS_FIELDS, 0)
+        usage: Dict[str, float] = {}
+        item_statuses = []
+        for summary_id, status, job_id, error in items:
+            counts[status] += 1
+            job_status = self._job_mgr.get_job_status(job_id) if job_id else None
+            if job_status is not None:
+                for name in _PROGRESS_FIELDS:
+                    progress[name] += job_status[name]
+                for name, value in (job_status["usage"] or {}).items():
+                    usage[name] = usage.get(name, 0) + value
+            item_statuses.append({
+                "summary_id": summary_id,
+                "status": status.value,
+                "job_id": job_id,
+                "pages_total": job_status["pages_total"] if job_status else None,
+                "pages_done": job_status["pages_done"] if job_status else None,
+                "chunks_done": job_status["chunks_done"] if job_status else None,
+                "error": error,
+            })
+
+        if finished:
+            status = JobStatus.COMPLETED if counts[JobStatus.COMPLETED] else JobStatus.FAILED
+        elif counts[JobStatus.PENDING] == len(items):
+            status = JobStatus.PENDING
+        else:
+            status = JobStatus.PROCESSING
+        return {
+            "batch_id": batch_id,
+            "status": status.value,
+            "total": len(items),
+            "pending": counts[JobStatus.PENDING],
+            "processing": counts[JobStatus.PROCESSING],
+            "completed": counts[JobStatus.COMPLETED],
+            "failed": counts[JobStatus.FAILED],
+            **progress,
+            "usage": usage,
+            "items": item_statuses,
+            "created_at": created_at,
+        }
+
+    def cleanup_old_batches(self, max_age_hours: int = 24) -> int:
+        """終了済みの古いバッチを削除する
+
+        Args:
+            max_age_hours: 削除対象の経過時間（時間）
+
+        Returns:
+            削除されたバッチ数
+        """
+        cutoff = datetime.now() - timedelta(hours=max_age_hours)
+        with self._lock:
+            old_batches = [
+                batch_id
+                for batch_id, batch in self._batches.items()
+                if batch.is_finished and batch.updated_at < cutoff
+            ]
+            for batch_id in old_batches:
+                del self._batches[batch_id]
+
+        if old_batches:
+            logger.info("古いバッチを削除: %d件", len(old_batches))
+        return len(old_batches)
+
+    def _dispatch(self) -> None:
+        """実行枠に空きがあれば、バッチを順番に回して次の書籍を開始する"""
+        while True:
+            with self._lock:
+                if self._running >= self._max_running or not self._ready:
+                    return
+                batch = self._batches[self._ready.popleft()]
+                item = batch.items[batch.next_index]
+                batch.next_index += 1
+                if batch.next_index < len(batch.items):
+                    self._ready.append(batch.batch_id)
+                item.status = JobStatus.PROCESSING
+                batch.updated_at = datetime.now()
+                self._running += 1
+            JOB_QUEUE_DEPTH.labels("batch_item").dec()
+            self._start(batch, item)
+
+    def _start(self, batch: Batch, item: BatchItem) -> None:
+        """書籍のパイプラインジョブを開始する（開始できない場合は失敗として記録する）"""
+        db = SessionLocal()
+        try:
+            summary_id = uuid.UUID(item.summary_id)
+            summary = db.get(Summary, summary_id)
+            if summary is None:
+                raise SummaryGenerationError(f"要約が見つかりません: {summary_id}")
+            images = (
+                db.query(Image)
+                .filter(Image.summary_id == summary_id)
+                .order_by(Image.page_number)
+                .all()
+            )
+            if not images:
+                raise SummaryGenerationError("この要約に関連する画像がありません")
+            if duplicate_service.reuse_ocr_texts(db, images):
+                db.commit()
+
+            job_id = start_pipeline_job(
+                summary_id,
+                images,
+                batch.custom_instructions,
+                job_mgr=self._job_mgr,
+                book=BookContext.from_summary(summary),
+                on_finish=lambda finished_job_id: self._finish(batch, item, finished_job_id),
+            )
+            with self._lock:
+                # ジョブが既に終了している場合は上書きしない
+                item.job_id = item.job_id or job_id
+            logger.info(
+                "バッチの書籍を開始: batch_id=%s, summary_id=%s, job_id=%s",
+                batch.batch_id, item.summary_id, job_id,
+            )
+        except (AppException, SQLAlchemyError) as e:
+            db.rollback()
+            message = e.message if isinstance(e, AppException) else f"データベースエラー: {e}"
+            logger.error(
+                "バッチの書籍を開始できません: batch_id=%s, summary_id=%s, error=%s",
+                batch.batch_id, item.summary_id, message,
+            )
+            # 次の書籍は呼び出し元（_dispatch）のループで開始する
+            self._finish(batch, item, None, error=message, dispatch=False)
+        finally:
+            db.close()
+
+    def _finish(
+        self,
+        batch: Batch,
+        item: BatchItem,
+        job_id: Optional[str],
+        error: Optional[str] = None,
+        dispatch: bool = True,
+    ) -> None:
+        """書籍の終了を記録し、次の書籍を開始する"""
+        job = self._job_mgr.get_job(job_id) if job_id else None
+        if job is not None and job.status == JobStatus.FAILED:
+            error = job.error
+        with self._lock:
+            item.job_id = job_id or item.job_id
+            item.status = JobStatus.FAILED if error else JobStatus.COMPLETED
+            item.error = error
+            batch.updated_at = datetime.now()
+            self._running -= 1
+            finished = batch.is_finished
+        if finished:
+            logger.info("バッチ完了: batch_id=%s", batch.batch_id)
+        if dispatch:
+            self._dispatch()
+
+
+# グローバルインスタンス
+batch_scheduler = BatchScheduler()
+janitor.register_job_store("batch", batch_scheduler.cleanup_old_batches)
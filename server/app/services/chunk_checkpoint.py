@@ -0,0 +1,133 @@
+"""チャンク単位のチェックポイントモジュール
+
+長いテキストの要約では、チャンクの結果を要約し終えるたびにsummary_chunksテーブルへ
+コミットする（要約ID・チャンクのハッシュで一意）。途中のチャンクで失敗した場合や
+プロセスが再起動した場合も、同じ内容の生成を再実行すると保存済みのチャンクを再利用し、
+残りのチャンクのみAIに送信する。
+
+差分要約（app/services/incremental_summary.py）のチャンクはページ範囲とともに保存し、
+全文の要約（SummaryService._process_long_text）のチャンクはページに対応しないため
+ページ範囲なし（NULL）で保存する。全文の要約のチェックポイントは、すべてのチャンクの
+要約に成功した時点で削除する。
+"""
+
+import hashlib
+import logging
+import uuid
+from typing import Dict, Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.models import SummaryChunk
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint(model: str, instructions: str) -> str:
+    """チャンクの結果に影響する処理条件（モデル・指示）を文字列にする"""
+    return f"{model}\0{instructions}"
+
+
+def chunk_hash(fingerprint: str, text: str) -> str:
+    """処理条件とチャンクのテキストからチャンクのハッシュを計算する
+
+    Args:
+        fingerprint: ハッシュに含める処理条件（モデル・指示など）
+        text: チャンクのテキスト
+
+    Returns:
+        SHA-256の16進文字列
+    """
+    return hashlib.sha256(fingerprint.encode("utf-8") + b"\0" + text.encode("utf-8")).hexdigest()
+
+
+class ChunkCheckpoint:
+    """要約のチャンクの結果をデータベースに1件ずつ保存し、再実行時に読み込むクラス
+
+    保存は呼び出し元のセッションでコミットするため、要約の生成を始める前に
+    セッションに未コミットの変更がないこと（または一緒にコミットしてよいこと）。
+    """
+
+    def __init__(self, db: Session, summary_id: uuid.UUID, fingerprint: str):
+        """
+        Args:
+            db: データベースセッション
+            summary_id: 要約ID
+            fingerprint: チャンクのハッシュに含める処理条件（モデル・指示など）
+        """
+        self._db = db
+        self._summary_id = summary_id
+        self._fingerprint = fingerprint
+
+    def chunk_hash(self, text: str) -> str:
+        """チャンクのハッシュ"""
+        return chunk_hash(self._fingerprint, text)
+
+    def load(self) -> Dict[str, str]:
+        """保存済みのチャンクの結果を読み込む
+
+        Returns:
+            チャンクのハッシュと要約結果の辞書
+        """
+        rows = self._db.query(SummaryChunk.source_hash, SummaryChunk.summarized_text).filter(
+            SummaryChunk.summary_id == self._summary_id
+        )
+        return {row.source_hash: row.summarized_text for row in rows}
+
+    def save(
+        self,
+        index: int,
+        source_hash: str,
+        text: str,
+        first_page: Optional[int] = None,
+        last_page: Optional[int] = None,
+    ) -> None:
+        """チャンクの結果を保存してコミットする
+
+        保存に失敗しても要約の生成は続ける（再実行時にそのチャンクを再度要約するのみ）。
+
+        Args:
+            index: チャンク番号（0始まり）
+            source_hash: チャンクのハッシュ
+            text: 要約結果
+            first_page: チャンクの最初のページ番号（ページに対応しない場合はNone）
+            last_page: チャンクの最後のページ番号（ページに対応しない場合はNone）
+        """
+        try:
+            self._db.add(
+                SummaryChunk(
+                    summary_id=self._summary_id,
+                    chunk_index=index,
+                    first_page=first_page,
+                    last_page=last_page,
+                    source_hash=source_hash,
+                    summarized_text=text,
+                )
+            )
+            self._db.commit()
+        except SQLAlchemyError as e:
+            self._db.rollback()
+            logger.warning(
+                "チャンクのチェックポイントを保存できません: summary_id=%s, チャンク=%d, error=%s",
+                self._summary_id, index + 1, e,
+            )
+
+    def clear(self) -> None:
+        """ページに対応しないチャンク（全文の要約のチェックポイント）を削除してコミットする"""
+        try:
+            deleted = (
+                self._db.query(SummaryChunk)
+                .filter(SummaryChunk.summary_id == self._summary_id, SummaryChunk.first_page.is_(None))
+                .delete(synchronize_session=False)
+            )
+            self._db.commit()
+        except SQLAlchemyError as e:
+            self._db.rollback()
+            logger.warning(
+                "チャンクのチェックポイントを削除できません: summary_id=%s, error=%s",
+                self._summary_id, e,
+            )
+            return
+        if deleted:
+            logger.debug("チャンクのチェックポイントを削除: summary_id=%s, 件数=%d", self._summary_id, deleted)
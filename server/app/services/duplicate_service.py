@@ -0,0 +1,228 @@
+"""近似重複ページ検出モジュール
+
+アップロード時に計算した知覚ハッシュ（app.services.image_hash）で、同じ要約内や
+ライブラリ全体から同じページの画像（撮り直し・再アップロード）を検索する。
+IMAGE_DUPLICATE_REUSE_OCRを有効にした場合、同じ内容のファイルや同じ要約内の十分に近い画像に
+OCR結果があれば、OCRを行わずにそのテキストを再利用する（章扉など余白の多いページは、
+内容が異なっても知覚ハッシュが近くなるため、他の要約の近似重複のテキストは使用しない）。
+"""
+
+import logging
+import uuid
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.metrics import OCR_PAGES_REUSED
+from app.models import Image, ImageHashBand
+from app.services.image_hash import (
+    BAND_COUNT,
+    PageHashes,
+    compute_hashes,
+    hamming_distance,
+    hash_bands,
+    to_signed,
+    to_unsigned,
+)
+
+logger = logging.getLogger(__name__)
+
+# 検索範囲
+SCOPE_SUMMARY = "summary"
+SCOPE_LIBRARY = "library"
+
+# OCR結果のコピー元として確認する最大件数
+SOURCE_CANDIDATES = 5
+
+
+@dataclass
+class DuplicateMatch:
+    """近似重複の画像"""
+
+    image_id: uuid.UUID
+    summary_id: uuid.UUID
+    page_number: int
+    file_name: str
+    dhash_distance: int
+    phash_distance: int
+    has_ocr_text: bool
+    same_summary: bool
+
+    @property
+    def distance(self) -> int:
+        """dHash・pHashのハミング距離の大きい方"""
+        return max(self.dhash_distance, self.phash_distance)
+
+
+class DuplicateService:
+    """知覚ハッシュの登録と近似重複の検索を行うサービス"""
+
+    def compute(self, image_path: str) -> Optional[PageHashes]:
+        """画像ファイルの知覚ハッシュを計算する（無効な設定の場合はNone）"""
+        if not settings.IMAGE_HASH_ENABLED:
+            return None
+        return compute_hashes(image_path)
+
+    def register(self, image: Image, hashes: Optional[PageHashes]) -> None:
+        """画像に知覚ハッシュと検索用のバンドを設定する（コミットは呼び出し元で行う）
+
+        Args:
+            image: 画像
+            hashes: 知覚ハッシュ（Noneの場合は何もしない）
+        """
+        if hashes is None:
+            return
+        image.dhash = to_signed(hashes.dhash)
+        image.phash = to_signed(hashes.phash)
+        image.hash_bands = [
+            ImageHashBand(band=band, value=value)
+            for band, value in enumerate(hash_bands(hashes.phash))
+        ]
+
+    def find_duplicates(
+        self,
+        db: Session,
+        image: Image,
+        scope: str = SCOPE_LIBRARY,
+        max_distance: Optional[int] = None,
+        limit: int = 20,
+    ) -> List[DuplicateMatch]:
+        """画像の近似重複を距離の小さい順に検索する
+
+        dHash・pHashの両方のハミング距離がmax_distance以下の画像を返す。
+        pHashのバンドが1つ以上一致する画像を候補にするため、max_distanceは
+        BAND_COUNT - 1（7）までに制限する。
+
+        Args:
+            db: データベースセッション
+            image: 検索元の画像
+            scope: 検索範囲（summary: 同じ要約内、library: すべての要約）
+            max_distance: 最大のハミング距離（省略時は設定値）
+            limit: 最大件数
+
+        Returns:
+            近似重複の画像
+        """
+        if image.phash is None or image.dhash is None:
+            return []
+        max_distance = settings.IMAGE_DUPLICATE_MAX_DISTANCE if max_distance is None else max_distance
+        max_distance = min(max_distance, BAND_COUNT - 1)
+
+        phash = to_unsigned(image.phash)
+        dhash = to_unsigned(image.dhash)
+        band_match = or_(*(
+            and_(ImageHashBand.band == band, ImageHashBand.value == value)
+            for band, value in enumerate(hash_bands(phash))
+        ))
+        query = (
+            db.query(
+                Image.id,
+                Image.summary_id,
+                Image.page_number,
+                Image.file_name,
+                Image.dhash,
+                Image.phash,
+                Image.ocr_text.isnot(None).label("has_ocr_text"),
+            )
+            .join(ImageHashBand, ImageHashBand.image_id == Image.id)
+            .filter(band_match, Image.id != image.id)
+            .distinct()
+        )
+        if scope == SCOPE_SUMMARY:
+            query = query.filter(Image.summary_id == image.summary_id)
+
+        matches = []
+        for row in query:
+            match = DuplicateMatch(
+                image_id=row.id,
+                summary_id=row.summary_id,
+                page_number=row.page_number,
+                file_name=row.file_name,
+                dhash_distance=hamming_distance(dhash, to_unsigned(row.dhash)),
+                phash_distance=hamming_distance(phash, to_unsigned(row.phash)),
+                has_ocr_text=bool(row.has_ocr_text),
+                same_summary=row.summary_id == image.summary_id,
+            )
+            if match.distance <= max_distance:
+                matches.append(match)
+        matches.sort(key=lambda m: (m.distance, not m.same_summary, m.page_number))
+        return matches[:limit]
+
+    def reuse_ocr_texts(self, db: Session, images: List[Image]) -> Dict[uuid.UUID, uuid.UUID]:
+        """OCR結果のない画像に、同じページの画像のOCR結果をコピーする（コミットは呼び出し元で行う）
+
+        同じ内容のファイル（content_hashが一致、すべての要約が対象）の画像を優先し、なければ
+        同じ要約内で距離がIMAGE_DUPLICATE_REUSE_DISTANCE以下の近似重複の画像を使用する。
+        OCR結果が空の画像は使用しない。
+
+        Args:
+            db: データベースセッション
+            images: OCRを行う予定の画像
+
+        Returns:
+            OCR結果を再利用した画像ID -> コピー元の画像ID
+        """
+        if not settings.IMAGE_DUPLICATE_REUSE_OCR:
+            return {}
+
+        reused: Dict[uuid.UUID, uuid.UUID] = {}
+        for image in images:
+            if image.ocr_text:
+                continue
+            source = self._find_exact_ocr_source(db, image)
+            match_kind = "exact"
+            if source is None:
+                source = self._find_similar_ocr_source(db, image)
+                match_kind = "similar"
+            if source is None:
+                continue
+            source_id, ocr_text = source
+            image.ocr_text = ocr_text
+            reused[image.id] = source_id
+            OCR_PAGES_REUSED.labels(match_kind).inc()
+            logger.info(
+                "OCR結果を再利用: image_id=%s, source=%s, match=%s", image.id, source_id, match_kind
+            )
+        return reused
+
+    def _find_exact_ocr_source(self, db: Session, image: Image) -> Optional[Tuple[uuid.UUID, str]]:
+        """同じ内容のファイルでOCR済みの画像を探す"""
+        if not image.content_hash:
+            return None
+        rows = (
+            db.query(Image.id, Image.ocr_text)
+            .filter(
+                Image.content_hash == image.content_hash,
+                Image.id != image.id,
+                Image.ocr_text.isnot(None),
+            )
+            .limit(SOURCE_CANDIDATES)
+        )
+        for row in rows:
+            if row.ocr_text:
+                return row.id, row.ocr_text
+        return None
+
+    def _find_similar_ocr_source(self, db: Session, image: Image) -> Optional[Tuple[uuid.UUID, str]]:
+        """同じ要約内の近似重複でOCR済みの画像を探す"""
+        candidates = self.find_duplicates(
+            db,
+            image,
+            scope=SCOPE_SUMMARY,
+            max_distance=settings.IMAGE_DUPLICATE_REUSE_DISTANCE,
+            limit=SOURCE_CANDIDATES,
+        )
+        for match in candidates:
+            if not match.has_ocr_text:
+                continue
+            ocr_text = db.query(Image.ocr_text).filter(Image.id == match.image_id).scalar()
+            if ocr_text:
+                return match.image_id, ocr_text
+        return None
+
+
+# シングルトンインスタンス
+duplicate_service = DuplicateService()
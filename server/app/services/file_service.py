@@ -1,58 +1,136 @@
+import hashlib
+import logging
+import mimetypes
 import os
+import re
+import time
 import uuid
-import shutil
-from typing import List, Dict, Any, Optional
+from datetime import datetime, timedelta
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
 from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
 
 from app.config import settings
+from app.metrics import FILE_GC_REMOVED, UPLOAD_BYTES, UPLOAD_DEDUPLICATED_BYTES, UPLOAD_THROUGHPUT
+from app.models import FileBlob
+from app.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# コンテンツアドレス方式のファイルと書き込み途中のファイルの保存先（UPLOAD_DIR配下）
+BLOB_DIR_NAME = "blobs"
+TEMP_DIR_NAME = "tmp"
+
+# 書き込み時の読み込み単位（バイト）
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# ガベージコレクションで1回のクエリに含めるハッシュ数
+GC_BATCH_SIZE = 500
+
+_EXTENSION_PATTERN = re.compile(r"^\.[a-z0-9]{1,8}$")
 
 
 class FileService:
-    """ファイル操作サービス"""
-    
+    """ファイル操作サービス
+
+    アップロードされたファイルは内容のSHA-256で命名して保存する
+    （UPLOAD_DIR/blobs/{先頭2文字}/{ハッシュ}{拡張子}）。同じ内容のファイルは1つだけ保存し、
+    参照数はfile_blobsテーブルで画像の追加・削除時に更新する（app/models/file_blob.py）。
+    """
+
     def __init__(self):
         """アップロードディレクトリの初期化"""
         os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-    
-    async def save_upload_file(self, file: UploadFile, sub_dir: Optional[str] = None) -> Dict[str, Any]:
-        """アップロードされたファイルを保存する"""
-        # ファイル名の生成（UUID + 元のファイル名）
+        self.blob_dir = os.path.join(settings.UPLOAD_DIR, BLOB_DIR_NAME)
+        self.temp_dir = os.path.join(settings.UPLOAD_DIR, TEMP_DIR_NAME)
+
+    async def save_upload_file(self, file: UploadFile) -> Dict[str, Any]:
+        """アップロードされたファイルを保存する
+
+        一時ファイルに書き込みながらSHA-256を計算し、同じ内容のファイルがなければ
+        ハッシュ名のパスに移動する。既にある場合は一時ファイルを削除し、既存のファイルを使用する。
+
+        Args:
+            file: アップロードされたファイル
+
+        Returns:
+            保存したファイルの情報（content_hash: 内容のSHA-256、deduplicated: 既存のファイルを使用したか）
+        """
+        # 書き込みとハッシュの計算はイベントループを止めないようスレッドプールで実行する
+        file_info = await run_in_threadpool(self._save_stream, file.file, file.filename or "unknown")
+        file_info["mime_type"] = file.content_type or "application/octet-stream"
+        return file_info
+
+    def save_local_file(self, path: str) -> Dict[str, Any]:
+        """ローカルのファイルをアップロードされたファイルと同じ方法で保存する（CLIからの取り込み用）
+
+        Args:
+            path: 保存するファイルのパス
+
+        Returns:
+            保存したファイルの情報（save_upload_fileと同じ）
+        """
+        with open(path, "rb") as stream:
+            file_info = self._save_stream(stream, os.path.basename(path))
+        file_info["mime_type"] = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        return file_info
+
+    def _save_stream(self, stream: BinaryIO, original_filename: str) -> Dict[str, Any]:
+        """ファイルの内容を一時ファイルに書き込み、ハッシュ名のパスに保存する"""
         file_id = str(uuid.uuid4())
-        original_filename = file.filename or "unknown"
-        filename = f"{file_id}_{original_filename}"
-        
-        # 保存先ディレクトリの設定
-        save_dir = settings.UPLOAD_DIR
-        if sub_dir:
-            save_dir = os.path.join(save_dir, sub_dir)
-            os.makedirs(save_dir, exist_ok=True)
-        
-        # ファイルパスの生成
-        file_path = os.path.join(save_dir, filename)
-        
-        # ファイルの保存
-        with open(file_path, "wb") as buffer:
-            # ファイルの内容をコピー
-            shutil.copyfileobj(file.file, buffer)
-        
+        os.makedirs(self.temp_dir, exist_ok=True)
+        temp_path = os.path.join(self.temp_dir, f"{file_id}.part")
+
+        # ファイルの保存（書き込みと同時にハッシュを計算する）
+        with span("file.save_upload", **{"file.name": original_filename}) as save_span:
+            start = time.perf_counter()
+            hasher = hashlib.sha256()
+            file_size = 0
+            try:
+                with open(temp_path, "wb") as buffer:
+                    while chunk := stream.read(COPY_CHUNK_SIZE):
+                        hasher.update(chunk)
+                        buffer.write(chunk)
+                        file_size += len(chunk)
+                content_hash = hasher.hexdigest()
+                file_path, deduplicated = self._store_blob(
+                    temp_path, content_hash, os.path.splitext(original_filename)[1]
+                )
+            except BaseException:
+                self.delete_file(temp_path)
+                raise
+            elapsed = time.perf_counter() - start
+            save_span.set_attribute("file.size", file_size)
+            save_span.set_attribute("file.deduplicated", deduplicated)
+
+        # 保存スループットを記録
+        UPLOAD_BYTES.inc(file_size)
+        if deduplicated:
+            UPLOAD_DEDUPLICATED_BYTES.inc(file_size)
+        if elapsed > 0:
+            UPLOAD_THROUGHPUT.observe(file_size / elapsed)
+
         # ファイル情報を返す
         return {
             "file_id": file_id,
             "file_name": original_filename,
             "file_path": file_path,
-            "file_size": os.path.getsize(file_path),
-            "mime_type": file.content_type or "application/octet-stream"
+            "file_size": file_size,
+            "content_hash": content_hash,
+            "deduplicated": deduplicated,
         }
-    
-    async def save_multiple_files(self, files: List[UploadFile], sub_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+
+    async def save_multiple_files(self, files: List[UploadFile]) -> List[Dict[str, Any]]:
         """複数のファイルを保存する"""
         results = []
         for i, file in enumerate(files):
-            file_info = await self.save_upload_file(file, sub_dir)
+            file_info = await self.save_upload_file(file)
             file_info["page_number"] = i + 1  # ページ番号を追加
             results.append(file_info)
         return results
-    
+
     def delete_file(self, file_path: str) -> bool:
         """ファイルを削除する"""
         try:
@@ -64,6 +142,136 @@ class FileService:
             print(f"ファイル削除エラー: {str(e)}")
             return False
 
+    def blob_path(self, content_hash: str, extension: str = "") -> str:
+        """ハッシュに対応するファイルのパス"""
+        extension = extension.lower()
+        if not _EXTENSION_PATTERN.match(extension):
+            extension = ""
+        return os.path.join(self.blob_dir, content_hash[:2], f"{content_hash}{extension}")
+
+    def _store_blob(self, temp_path: str, content_hash: str, extension: str) -> Tuple[str, bool]:
+        """書き込み済みの一時ファイルをハッシュ名のパスに移動する
+
+        Returns:
+            (ファイルのパス, 既存のファイルを使用したか)
+        """
+        existing = self._find_blob(content_hash)
+        if existing:
+            os.remove(temp_path)
+            # ガベージコレクションの猶予期間を延長する
+            os.utime(existing)
+            return existing, True
+
+        file_path = self.blob_path(content_hash, extension)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        os.replace(temp_path, file_path)
+        return file_path, False
+
+    def _find_blob(self, content_hash: str) -> Optional[str]:
+        """保存済みのファイルを探す（拡張子は最初に保存したファイルのもの）"""
+        directory = os.path.join(self.blob_dir, content_hash[:2])
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith(content_hash):
+                        return entry.path
+        except FileNotFoundError:
+            pass
+        return None
+
+    def collect_garbage(self, db: Session, grace_seconds: Optional[int] = None) -> Dict[str, int]:
+        """参照されなくなったファイルを削除する
+
+        以下のファイルのうち、最終更新から猶予期間が経過したものを削除する。
+        猶予期間は、保存してから画像の登録がコミットされるまでの間に削除されないためのもの。
+
+            - blob: 参照数が0のファイル（画像の削除・要約の削除による）
+            - orphan: file_blobsに登録のないファイル（保存後に画像の登録が失敗した場合）
+            - temp: 書き込み途中のまま残った一時ファイル
+
+        Args:
+            db: データベースセッション
+            grace_seconds: 猶予期間（秒、省略時はFILE_GC_GRACE_SECONDS）
+
+        Returns:
+            種類ごとの削除したファイル数と、削除したファイルの合計サイズ（bytes）
+        """
+        grace_seconds = settings.FILE_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+        cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+        cutoff_timestamp = time.time() - grace_seconds
+        removed = {"blob": 0, "orphan": 0, "temp": 0, "bytes": 0}
+
+        # 参照数が0のファイル（登録を削除できたもののみファイルを削除する）
+        unreferenced = [
+            row.content_hash
+            for row in db.query(FileBlob.content_hash)
+            .filter(FileBlob.ref_count <= 0, FileBlob.updated_at < cutoff)
+        ]
+        for i in range(0, len(unreferenced), GC_BATCH_SIZE):
+            deleted = db.execute(
+                delete(FileBlob)
+                .where(
+                    FileBlob.content_hash.in_(unreferenced[i:i + GC_BATCH_SIZE]),
+                    FileBlob.ref_count <= 0,
+                    FileBlob.updated_at < cutoff,
+                )
+                .returning(FileBlob.content_hash)
+            ).scalars().all()
+            db.commit()
+            for content_hash in deleted:
+                path = self._find_blob(content_hash)
+                if path:
+                    self._remove_if_stale(path, cutoff_timestamp, removed, "blob")
+
+        # 登録のないファイル
+        for prefix in self._list_dir(self.blob_dir):
+            directory = os.path.join(self.blob_dir, prefix)
+            paths = {
+                name.split(".", 1)[0]: os.path.join(directory, name)
+                for name in self._list_dir(directory)
+            }
+            hashes = list(paths)
+            for i in range(0, len(hashes), GC_BATCH_SIZE):
+                batch = hashes[i:i + GC_BATCH_SIZE]
+                registered = {
+                    row.content_hash
+                    for row in db.query(FileBlob.content_hash).filter(FileBlob.content_hash.in_(batch))
+                }
+                for content_hash in batch:
+                    if content_hash not in registered:
+                        self._remove_if_stale(paths[content_hash], cutoff_timestamp, removed, "orphan")
+
+        # 書き込み途中の一時ファイル
+        for name in self._list_dir(self.temp_dir):
+            self._remove_if_stale(os.path.join(self.temp_dir, name), cutoff_timestamp, removed, "temp")
+
+        for kind in ("blob", "orphan", "temp"):
+            if removed[kind]:
+                FILE_GC_REMOVED.labels(kind).inc(removed[kind])
+        logger.debug("ファイルのガベージコレクション完了: %s", removed)
+        return removed
+
+    @staticmethod
+    def _list_dir(directory: str) -> List[str]:
+        try:
+            return os.listdir(directory)
+        except FileNotFoundError:
+            return []
+
+    def _remove_if_stale(
+        self, path: str, cutoff_timestamp: float, removed: Dict[str, int], kind: str
+    ) -> None:
+        """最終更新が基準より古いファイルを削除し、件数とサイズを集計する（保存時に使用されたファイルは残す）"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        if stat.st_mtime >= cutoff_timestamp:
+            return
+        if self.delete_file(path):
+            removed[kind] += 1
+            removed["bytes"] += stat.st_size
+
 
 # シングルトンインスタンス
 file_service = FileService()
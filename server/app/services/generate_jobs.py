@@ -0,0 +1,141 @@
+"""要約生成ジョブモジュール
+
+長い書籍の要約生成はチャンク間の待機を含めて数分かかるため、HTTPリクエストを
+開いたまま待たせずに、バックグラウンドのジョブとしても実行できるようにする。
+
+ジョブの状態・進捗（チャンク数・トークン数）はパイプラインジョブと同じく
+SummaryJobManagerで管理する。完了時にコールバックURLが指定されていれば、
+ジョブのステータス（SummaryJobStatus）をJSONでPOSTする。
+"""
+
+import json
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+from app.config import settings
+from app.exceptions import AppException
+from app.metrics import JOB_CALLBACKS
+from app.schemas import SummaryJobStatus
+from app.services.job_manager import JobStatus
+from app.services.rate_limiter import jittered
+from app.services.summary_jobs import SummaryJobManager, summary_job_manager, track_progress
+from app.services.usage_service import UsageRecorder
+from app.tracing import span, submit_with_context
+
+logger = logging.getLogger(__name__)
+
+# コールバックの再送の初回の待ち時間（秒、試行ごとに2倍にする）
+CALLBACK_BACKOFF = 1.0
+
+# 要約を生成し、要約テキストを返す処理（トークン使用量は引数の記録先に記録する）
+GenerateFn = Callable[[UsageRecorder], str]
+
+# 要約生成ジョブ用のエグゼキューター
+_job_executor = ThreadPoolExecutor(
+    max_workers=settings.GENERATE_MAX_JOBS, thread_name_prefix="generate-job"
+)
+
+
+def start_generate_job(
+    summary_id: uuid.UUID,
+    pages_total: int,
+    generate: GenerateFn,
+    callback_url: Optional[str] = None,
+    job_mgr: Optional[SummaryJobManager] = None,
+) -> str:
+    """要約生成ジョブをバックグラウンドで開始する
+
+    Args:
+        summary_id: 要約ID
+        pages_total: 要約に含めるページ数（OCR済み）
+        generate: 要約を生成する処理（ジョブのスレッドで実行する）
+        callback_url: 完了時にステータスをPOSTするURL（設定値GENERATE_CALLBACK_URL。リクエストからは指定させない）
+        job_mgr: ジョブマネージャー（省略時はグローバルインスタンスを使用）
+
+    Returns:
+        ジョブID
+    """
+    job_mgr = job_mgr or summary_job_manager
+    job_id = job_mgr.create_job(str(summary_id), pages_total=pages_total)
+    # OCRは実行済みのため、ページは処理済みとして扱う
+    job_mgr.update(job_id, pages_done=pages_total)
+    submit_with_context(_job_executor, _run_generate_job, job_mgr, job_id, generate, callback_url)
+    return job_id
+
+
+def _run_generate_job(
+    job_mgr: SummaryJobManager,
+    job_id: str,
+    generate: GenerateFn,
+    callback_url: Optional[str],
+) -> None:
+    """要約生成ジョブを実行し、完了時にコールバックを送信する"""
+    recorder = UsageRecorder()
+    job_mgr.update(job_id, status=JobStatus.PROCESSING, usage=recorder)
+    try:
+        with span("summary.generate_job", **{"job.id": job_id}), track_progress(job_mgr, job_id):
+            summarized_text = generate(recorder)
+        job_mgr.complete_job(job_id, summarized_text=summarized_text)
+    except AppException as e:
+        logger.error("要約生成ジョブ失敗: job_id=%s, error=%s", job_id, e.message)
+        job_mgr.complete_job(job_id, error=e.message)
+    except Exception as e:
+        logger.exception("要約生成ジョブで予期しないエラー: job_id=%s", job_id)
+        job_mgr.complete_job(job_id, error=f"予期しないエラーが発生しました: {e}")
+
+    if callback_url:
+        job_status = job_mgr.get_job_status(job_id)
+        if job_status is not None:
+            send_callback(callback_url, SummaryJobStatus(**job_status).model_dump(mode="json"))
+
+
+def send_callback(url: str, payload: Dict[str, Any]) -> bool:
+    """ジョブのステータスをコールバックURLにPOSTする
+
+    接続エラー・タイムアウト・429・5xxの場合は、GENERATE_CALLBACK_RETRIESまで
+    間隔を空けて再送する。
+
+    Args:
+        url: コールバックURL
+        payload: 送信するJSON
+
+    Returns:
+        送信に成功したかどうか
+    """
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    attempts = max(1, settings.GENERATE_CALLBACK_RETRIES)
+    for attempt in range(1, attempts + 1):
+        retryable = True
+        try:
+            response = httpx.post(
+                url,
+                content=body,
+                headers={"Content-Type": "application/json"},
+                timeout=settings.GENERATE_CALLBACK_TIMEOUT,
+            )
+        except httpx.HTTPError as e:
+            error = str(e) or type(e).__name__
+        else:
+            if response.is_success:
+                JOB_CALLBACKS.labels("delivered").inc()
+                logger.info("コールバック送信完了: job_id=%s, url=%s", payload.get("job_id"), url)
+                return True
+            error = f"HTTP {response.status_code}"
+            retryable = response.status_code == 429 or response.status_code >= 500
+
+        logger.warning(
+            "コールバック送信失敗: job_id=%s, url=%s, 試行=%d/%d, error=%s",
+            payload.get("job_id"), url, attempt, attempts, error,
+        )
+        if not retryable:
+            break
+        if attempt < attempts:
+            time.sleep(jittered(CALLBACK_BACKOFF * 2 ** (attempt - 1)))
+
+    JOB_CALLBACKS.labels("failed").inc()
+    return False
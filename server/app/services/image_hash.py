@@ -0,0 +1,125 @@
+"""画像の知覚ハッシュモジュール
+
+同じページを撮り直した画像や、同じ画像の再アップロードを検出するため、
+縮小したグレースケール画像から64ビットの知覚ハッシュを計算する。
+
+    - dHash: 9x8に縮小し、左右に隣り合う画素の明暗を比較する
+    - pHash: 32x32に縮小して2次元DCTを行い、低周波成分8x8を中央値と比較する
+
+似た画像ほどハッシュのハミング距離（異なるビット数）が小さくなる。
+"""
+
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional
+
+from PIL import Image as PILImage
+from PIL import ImageOps
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+HASH_BITS = 64
+
+# 近似検索用にハッシュを分割するバンド（8ビット x 8）
+BAND_COUNT = 8
+BAND_BITS = HASH_BITS // BAND_COUNT
+
+# 縮小後の画素値の標準偏差がこれ未満の画像は白紙とみなす
+BLANK_STDDEV = 4.0
+
+_DCT_SIZE = 32
+_LOW_FREQ_SIZE = 8
+
+
+@dataclass
+class PageHashes:
+    """1ページ分の知覚ハッシュ（64ビットの符号なし整数）"""
+
+    dhash: int
+    phash: int
+
+
+@lru_cache(maxsize=None)
+def _dct_matrix(size: int) -> "np.ndarray":
+    """DCT-II（直交）の変換行列"""
+    n = np.arange(size)
+    matrix = np.cos(np.pi * (2 * n[None, :] + 1) * n[:, None] / (2 * size))
+    matrix[0] /= np.sqrt(2)
+    return matrix * np.sqrt(2 / size)
+
+
+def _bits_to_int(bits: "np.ndarray") -> int:
+    return int.from_bytes(np.packbits(bits.astype(np.uint8).ravel()).tobytes(), "big")
+
+
+def _dhash(gray: PILImage.Image) -> int:
+    pixels = np.asarray(gray.resize((9, 8), PILImage.Resampling.LANCZOS), dtype=np.int16)
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def _phash(pixels: "np.ndarray") -> int:
+    dct = _dct_matrix(_DCT_SIZE)
+    coefficients = dct @ pixels @ dct.T
+    low = coefficients[:_LOW_FREQ_SIZE, :_LOW_FREQ_SIZE]
+    return _bits_to_int(low > np.median(low))
+
+
+def compute_hashes(image_path: str) -> Optional[PageHashes]:
+    """画像ファイルの知覚ハッシュを計算する
+
+    JPEGはデコード時に縮小する（draft）ため、大きな写真でも高速に計算できる。
+
+    Args:
+        image_path: 画像ファイルのパス
+
+    Returns:
+        ハッシュ。NumPyがない場合・画像として読めない場合・白紙の場合はNone
+    """
+    if not HAS_NUMPY:
+        return None
+    try:
+        with PILImage.open(image_path) as image:
+            image.draft("L", (_DCT_SIZE * 4, _DCT_SIZE * 4))
+            gray = ImageOps.exif_transpose(image).convert("L")
+    except (OSError, ValueError) as e:
+        logger.warning("知覚ハッシュを計算できません: %s: %s", image_path, e)
+        return None
+
+    small = gray.resize((_DCT_SIZE, _DCT_SIZE), PILImage.Resampling.LANCZOS)
+    pixels = np.asarray(small, dtype=np.float64)
+    if pixels.std() < BLANK_STDDEV:
+        logger.debug("白紙のページのため知覚ハッシュを登録しません: %s", image_path)
+        return None
+    return PageHashes(dhash=_dhash(gray), phash=_phash(pixels))
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """2つのハッシュのハミング距離"""
+    return (a ^ b).bit_count()
+
+
+def hash_bands(value: int) -> List[int]:
+    """ハッシュを8ビットずつのバンドに分割する
+
+    ハミング距離がBAND_COUNT未満の2つのハッシュは、少なくとも1つのバンドが一致する
+    （鳩の巣原理）ため、バンドの完全一致で候補を絞り込める。
+    """
+    mask = (1 << BAND_BITS) - 1
+    return [(value >> (BAND_BITS * i)) & mask for i in range(BAND_COUNT)]
+
+
+def to_signed(value: int) -> int:
+    """符号なし64ビット値をデータベース（BIGINT）に保存できる符号付きの値に変換する"""
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+
+def to_unsigned(value: int) -> int:
+    """データベースの符号付きの値を符号なし64ビット値に戻す"""
+    return value + (1 << HASH_BITS) if value < 0 else value
@@ -0,0 +1,271 @@
+"""差分要約モジュール
+
+ページ単位のOCRテキストをページ境界でチャンクに分け、チャンクごとの要約結果を
+元テキストのハッシュとともに保存する。再生成時はハッシュが一致するチャンクの
+結果を再利用し、内容が変わったチャンクのみAIに送信する。
+
+チャンクの区切りはページ内容のハッシュで決める。先頭からの文字数で区切ると、
+途中のページを追加・削除しただけで以降のすべての区切りがずれるが、内容で
+区切れば影響は変更箇所を含むチャンク（と最大サイズで区切られた後続の数チャンク）に
+とどまる。
+
+要約したチャンクはその都度コミットする（app/services/chunk_checkpoint.py）ため、
+途中で失敗・中断した生成を再実行すると、要約済みのチャンクから再開する。
+"""
+
+import hashlib
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.exceptions import AIClientError, RateLimitError, SummaryGenerationError
+from app.metrics import SUMMARY_CHUNKS
+from app.models import Image, Summary, SummaryChunk
+from app.services.chunk_checkpoint import ChunkCheckpoint, chunk_hash, fingerprint
+from app.services.prompts import BookContext, PromptTemplates
+from app.services.summary_jobs import report_chunk_dispatched, report_chunk_done, report_chunks_total
+from app.services.usage_service import usage_chunk
+from app.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# ページテキストの区切り（_combine_ocr_textsと同じ）
+PAGE_SEPARATOR = "\n\n"
+
+
+@dataclass
+class ChunkPlan:
+    """要約単位となる連続ページのまとまり"""
+
+    index: int
+    page_numbers: List[int]
+    text: str
+    source_hash: str
+
+
+@dataclass
+class IncrementalResult:
+    """差分要約の処理結果"""
+
+    summarized_text: str
+    chunks_total: int
+    chunks_reused: int
+    chunks_summarized: int
+    errors: List[str] = field(default_factory=list)
+
+
+def _is_boundary(page_text: str, pages_per_chunk: int) -> bool:
+    """ページの内容からチャンクの区切りかどうかを判定する
+
+    ページ内容のハッシュで判定するため、平均してpages_per_chunkページに1回区切られ、
+    同じ内容のページはどの位置にあっても同じ判定になる。
+    """
+    if pages_per_chunk <= 1:
+        return True
+    digest = hashlib.sha1(page_text.encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") % pages_per_chunk == 0
+
+
+def plan_chunks(
+    pages: Sequence[Tuple[int, str]],
+    fingerprint: str,
+    max_size: int,
+    pages_per_chunk: int,
+) -> List[ChunkPlan]:
+    """ページをチャンクに分割する
+
+    Args:
+        pages: (ページ番号, OCRテキスト) のリスト（ページ順）
+        fingerprint: ハッシュに含める処理条件（モデル・指示など）
+        max_size: チャンクの最大サイズ（文字数、1ページがこれを超える場合はそのページのみ）
+        pages_per_chunk: チャンクあたりの平均ページ数
+
+    Returns:
+        チャンクのリスト
+    """
+    chunks: List[ChunkPlan] = []
+    page_numbers: List[int] = []
+    texts: List[str] = []
+    size = 0
+
+    def flush() -> None:
+        nonlocal page_numbers, texts, size
+        if not texts:
+            return
+        text = PAGE_SEPARATOR.join(texts)
+        chunks.append(ChunkPlan(len(chunks), page_numbers, text, chunk_hash(fingerprint, text)))
+        page_numbers, texts, size = [], [], 0
+
+    for page_number, text in pages:
+        if texts and size + len(PAGE_SEPARATOR) + len(text) > max_size:
+            flush()
+        page_numbers.append(page_number)
+        texts.append(text)
+        size += len(text) + (len(PAGE_SEPARATOR) if len(texts) > 1 else 0)
+        if _is_boundary(text, pages_per_chunk):
+            flush()
+    flush()
+    return chunks
+
+
+class IncrementalSummaryService:
+    """チャンク単位の要約結果を再利用して要約を生成するサービス"""
+
+    def __init__(
+        self,
+        summary_svc=None,
+        max_size: Optional[int] = None,
+        pages_per_chunk: Optional[int] = None,
+        chunk_delay: Optional[float] = None,
+    ):
+        """初期化
+
+        Args:
+            summary_svc: 要約サービス（省略時はデフォルトを使用）
+            max_size: チャンクの最大サイズ（文字数）
+            pages_per_chunk: チャンクあたりの平均ページ数
+            chunk_delay: AI呼び出し間の待機時間（秒）
+        """
+        if summary_svc is None:
+            from app.services.summary_service import summary_service
+
+            summary_svc = summary_service
+
+        self._summary_service = summary_svc
+        self._max_size = max_size or settings.INCREMENTAL_CHUNK_MAX_SIZE
+        self._pages_per_chunk = pages_per_chunk or settings.INCREMENTAL_CHUNK_PAGES
+        self._chunk_delay = (
+            settings.AI_CHUNK_DELAY if chunk_delay is None else chunk_delay
+        )
+
+    def summarize(
+        self,
+        db: Session,
+        summary: Summary,
+        images: List[Image],
+        custom_instructions: Optional[str] = None,
+    ) -> IncrementalResult:
+        """変更のあったチャンクのみ要約し、保存済みの結果と結合する
+
+        新しく要約したチャンクはチェックポイントとして1件ずつコミットする（失敗・中断後の
+        再実行で再利用するため）。使われなくなったチャンクの削除はセッションに反映するのみで、
+        コミットは呼び出し元が要約の更新とあわせて行う。
+
+        Args:
+            db: データベースセッション
+            summary: 対象の要約
+            images: 要約に含める画像（ページ順）
+            custom_instructions: カスタム指示（省略時はデフォルトの要約指示）
+
+        Returns:
+            処理結果
+
+        Raises:
+            ConfigurationError: 要約が必要なチャンクがあり、クライアントが初期化されていない場合
+            SummaryGenerationError: 全てのチャンク処理に失敗した場合
+        """
+        instructions = custom_instructions or PromptTemplates.DEFAULT_INSTRUCTION
+        book = BookContext.from_summary(summary)
+        pages = [(image.page_number, image.ocr_text) for image in images if image.ocr_text]
+        fingerprint = self._fingerprint(instructions)
+        plans = plan_chunks(pages, fingerprint, self._max_size, self._pages_per_chunk)
+        checkpoint = ChunkCheckpoint(db, summary.id, fingerprint)
+
+        cached: Dict[str, SummaryChunk] = {chunk.source_hash: chunk for chunk in summary.chunks}
+        # 今回の結果（同じ内容のチャンクが複数ある場合も1回だけ要約する）
+        resolved: Dict[str, str] = {}
+        results: List[str] = []
+        errors: List[str] = []
+        reused = summarized = 0
+        called = False
+        report_chunks_total(len(plans))
+
+        for plan in plans:
+            if plan.source_hash in resolved:
+                results.append(resolved[plan.source_hash])
+                reused += 1
+                report_chunk_done(plan.index, resolved[plan.source_hash])
+                continue
+
+            chunk = cached.get(plan.source_hash)
+            if chunk is not None:
+                chunk.chunk_index = plan.index
+                chunk.first_page = plan.page_numbers[0]
+                chunk.last_page = plan.page_numbers[-1]
+                resolved[plan.source_hash] = chunk.summarized_text
+                results.append(chunk.summarized_text)
+                reused += 1
+                report_chunk_done(plan.index, chunk.summarized_text)
+                continue
+
+            # レート制限対策のためAI呼び出しの間は待機する
+            if called and self._chunk_delay > 0:
+                with span("summary.chunk_delay", **{"delay_seconds": self._chunk_delay}):
+                    time.sleep(self._chunk_delay)
+            called = True
+
+            report_chunk_dispatched()
+            try:
+                with span(
+                    "summary.chunk", **{"chunk.index": plan.index, "chunk.length": len(plan.text)}
+                ), usage_chunk(plan.index):
+                    text = self._summary_service.process_chunk(plan.text, instructions, book)
+            except RateLimitError:
+                errors.append(f"チャンク {plan.index + 1}: レート制限エラー")
+                report_chunk_done(plan.index, None, errors[-1])
+                continue
+            except AIClientError as e:
+                errors.append(f"チャンク {plan.index + 1}: {e.message}")
+                report_chunk_done(plan.index, None, errors[-1])
+                continue
+
+            checkpoint.save(
+                plan.index,
+                plan.source_hash,
+                text,
+                first_page=plan.page_numbers[0],
+                last_page=plan.page_numbers[-1],
+            )
+            resolved[plan.source_hash] = text
+            results.append(text)
+            summarized += 1
+            report_chunk_done(plan.index, text)
+
+        # 元ページが変わり使われなくなったチャンクを削除
+        for source_hash, chunk in cached.items():
+            if source_hash not in resolved:
+                db.delete(chunk)
+
+        SUMMARY_CHUNKS.labels("reused").inc(reused)
+        SUMMARY_CHUNKS.labels("summarized").inc(summarized)
+
+        if plans and not results:
+            raise SummaryGenerationError(
+                f"全てのチャンク処理に失敗しました: {'; '.join(errors)}"
+            )
+        if errors:
+            logger.warning("一部のチャンク処理に失敗: %s", errors)
+
+        logger.info(
+            "差分要約完了: summary_id=%s, チャンク=%d, 再利用=%d, 要約=%d",
+            summary.id, len(plans), reused, summarized,
+        )
+        return IncrementalResult(
+            summarized_text=PAGE_SEPARATOR.join(results),
+            chunks_total=len(plans),
+            chunks_reused=reused,
+            chunks_summarized=summarized,
+            errors=errors,
+        )
+
+    def _fingerprint(self, instructions: str) -> str:
+        """チャンクの結果に影響する処理条件を文字列にする"""
+        return fingerprint(getattr(self._summary_service, "model", ""), instructions)
+
+
+# シングルトンインスタンス
+incremental_summary_service = IncrementalSummaryService()
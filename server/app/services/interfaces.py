@@ -66,6 +66,17 @@ class IOCRService(Protocol):
         """
         ...
 
+    def extract_text(self, image_path: str) -> str:
+        """処理時間を記録しながら画像からテキストを抽出する
+
+        Args:
+            image_path: 処理する画像のパス
+
+        Returns:
+            抽出されたテキスト
+        """
+        ...
+
     def process_images(self, images: List[Image]) -> str:
         """複数の画像を処理し、ジョブIDを返す
 
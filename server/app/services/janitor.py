@@ -0,0 +1,245 @@
+"""定期清掃（janitor）モジュール
+
+バックグラウンドのスレッドで定期的に以下を削除し、削除した件数をログとメトリクスに記録する。
+
+    - 保持期間を過ぎた一時的な要約（要約IDを指定しないアップロードで作成）と、その画像・ファイル
+    - 保持期間を過ぎた終了済みのジョブ（メモリ上のジョブ情報）
+    - 参照されなくなったアップロードファイル（FileService.collect_garbage）と、
+      元の画像がなくなったサムネイル（ThumbnailService.collect_garbage）
+
+要約の削除は件数を制限したトランザクションに分けて行い、長時間のロックを避ける。
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import exists
+from sqlalchemy.orm import Session, selectinload, sessionmaker
+
+from app.config import settings
+from app.database import SessionLocal
+from app.metrics import JANITOR_RECLAIMED, JANITOR_RECLAIMED_BYTES
+from app.models import Image, Summary
+from app.services.file_service import FileService, file_service
+from app.services.job_manager import job_manager
+from app.services.summary_jobs import SummaryJobManager, summary_job_manager
+from app.services.thumbnail_service import ThumbnailService, thumbnail_service
+from app.utils import SummaryConstants
+
+logger = logging.getLogger(__name__)
+
+# ジョブの削除関数（保持期間（時間）を受け取り、削除した件数を返す）
+JobCleanup = Callable[[int], int]
+
+
+@dataclass
+class JanitorReport:
+    """1回の清掃で削除したもの"""
+
+    temporary_summaries: int = 0
+    images: int = 0
+    files: int = 0  # 以前の形式で保存されていた画像のファイル
+    file_bytes: int = 0
+    jobs: Dict[str, int] = field(default_factory=dict)
+    file_gc: Dict[str, int] = field(default_factory=dict)
+    duration_seconds: float = 0.0
+
+    @property
+    def reclaimed_bytes(self) -> int:
+        """削除したファイルの合計サイズ"""
+        return self.file_bytes + self.file_gc.get("bytes", 0)
+
+    def to_dict(self) -> Dict[str, object]:
+        """辞書形式に変換"""
+        return {
+            "temporary_summaries": self.temporary_summaries,
+            "images": self.images,
+            "files": self.files,
+            "jobs": dict(self.jobs),
+            "file_gc": dict(self.file_gc),
+            "reclaimed_bytes": self.reclaimed_bytes,
+            "duration_seconds": round(self.duration_seconds, 3),
+        }
+
+
+class Janitor:
+    """一時的な要約・古いジョブ・不要なファイルを定期的に削除するクラス"""
+
+    def __init__(
+        self,
+        session_factory: sessionmaker = SessionLocal,
+        files: FileService = file_service,
+        thumbnails: ThumbnailService = thumbnail_service,
+        summary_jobs: SummaryJobManager = summary_job_manager,
+    ):
+        self._session_factory = session_factory
+        self._files = files
+        self._thumbnails = thumbnails
+        self._summary_jobs = summary_jobs
+        self._job_stores: Dict[str, JobCleanup] = {
+            "summary": summary_jobs.cleanup_old_jobs,
+            "ocr": job_manager.cleanup_old_jobs,
+        }
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_report: Optional[JanitorReport] = None
+
+    def register_job_store(self, name: str, cleanup: JobCleanup) -> None:
+        """清掃の対象にするジョブの保存先を登録する
+
+        Args:
+            name: 保存先の名前（レポート・メトリクスに使用）
+            cleanup: 保持期間（時間）を受け取り、削除した件数を返す関数
+        """
+        self._job_stores[name] = cleanup
+
+    def start(self) -> None:
+        """バックグラウンドでの定期清掃を開始する（起動直後に1回実行する）"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run_loop, name="janitor", daemon=True)
+        self._thread.start()
+        logger.info("定期清掃を開始: 間隔=%d秒", settings.JANITOR_INTERVAL_SECONDS)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """定期清掃を停止する（実行中の清掃はバッチの区切りで終了する）"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("定期清掃に失敗しました")
+            self._stop.wait(settings.JANITOR_INTERVAL_SECONDS)
+
+    def run_once(self) -> JanitorReport:
+        """清掃を1回実行する
+
+        Returns:
+            削除したものの件数
+        """
+        with self._run_lock:
+            start = time.perf_counter()
+            report = JanitorReport()
+
+            self._delete_temporary_summaries(report)
+
+            for name, cleanup in self._job_stores.items():
+                report.jobs[name] = cleanup(settings.JOB_RETENTION_HOURS)
+
+            with self._session_factory() as db:
+                report.file_gc = self._files.collect_garbage(db)
+                thumbnails = self._thumbnails.collect_garbage(db)
+            report.file_gc["thumbnail"] = thumbnails["thumbnail"]
+            report.file_gc["bytes"] += thumbnails["bytes"]
+
+            report.duration_seconds = time.perf_counter() - start
+            self._record(report)
+            self.last_report = report
+            return report
+
+    def _delete_temporary_summaries(self, report: JanitorReport) -> None:
+        """保持期間を過ぎた一時的な要約を、画像・ファイルとともにバッチ単位で削除する
+
+        要約の更新日時と、画像の追加日時のいずれも保持期間より前のものを対象とし、
+        実行中のジョブがある要約は除外する。コンテンツアドレス方式のファイルは
+        画像の削除で参照数が減り、ガベージコレクションで削除される。
+        """
+        cutoff = datetime.utcnow() - timedelta(hours=settings.TEMPORARY_SUMMARY_RETENTION_HOURS)
+        batch_size = settings.JANITOR_BATCH_SIZE
+        active_ids = [uuid.UUID(summary_id) for summary_id in self._summary_jobs.active_summary_ids()]
+        recent_image = exists().where(Image.summary_id == Summary.id, Image.created_at >= cutoff)
+
+        while not self._stop.is_set():
+            with self._session_factory() as db:
+                query = (
+                    db.query(Summary)
+                    .options(
+                        selectinload(Summary.images).selectinload(Image.hash_bands),
+                        selectinload(Summary.chunks),
+                    )
+                    .filter(
+                        Summary.title == SummaryConstants.TEMPORARY_TITLE,
+                        Summary.description == SummaryConstants.TEMPORARY_DESCRIPTION,
+                        Summary.updated_at < cutoff,
+                        ~recent_image,
+                    )
+                )
+                if active_ids:
+                    query = query.filter(Summary.id.notin_(active_ids))
+                summaries = query.order_by(Summary.created_at).limit(batch_size).all()
+                if not summaries:
+                    return
+
+                legacy_files = self._delete_summaries(db, summaries, report)
+
+            for path in legacy_files:
+                self._delete_legacy_file(path, report)
+            if len(summaries) < batch_size:
+                return
+
+    def _delete_summaries(self, db: Session, summaries: List[Summary], report: JanitorReport) -> List[str]:
+        """要約を削除してコミットし、直接削除が必要なファイルのパスを返す"""
+        legacy_files = []
+        for summary in summaries:
+            for image in summary.images:
+                if image.content_hash is None:
+                    legacy_files.append(image.file_path)
+            report.images += len(summary.images)
+            db.delete(summary)
+        db.commit()
+        report.temporary_summaries += len(summaries)
+        return legacy_files
+
+    def _delete_legacy_file(self, path: str, report: JanitorReport) -> None:
+        """以前の形式のファイルを削除し、空になった要約ごとのディレクトリも削除する"""
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        if not self._files.delete_file(path):
+            return
+        report.files += 1
+        report.file_bytes += size
+        directory = os.path.dirname(path)
+        if os.path.abspath(directory) != os.path.abspath(settings.UPLOAD_DIR):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _record(report: JanitorReport) -> None:
+        """削除した件数をメトリクスとログに記録する"""
+        reclaimed = {
+            "temporary_summary": report.temporary_summaries,
+            "image": report.images,
+            "job": sum(report.jobs.values()),
+            "file": report.files + sum(
+                count for kind, count in report.file_gc.items() if kind != "bytes"
+            ),
+        }
+        for kind, count in reclaimed.items():
+            if count:
+                JANITOR_RECLAIMED.labels(kind).inc(count)
+        if report.reclaimed_bytes:
+            JANITOR_RECLAIMED_BYTES.inc(report.reclaimed_bytes)
+
+        log = logger.info if any(reclaimed.values()) else logger.debug
+        log("定期清掃完了: %s", report.to_dict())
+
+
+# シングルトンインスタンス
+janitor = Janitor()
@@ -10,6 +10,8 @@ from datetime import datetime
 from enum import Enum
 from typing import Any, Dict, List, Optional
 
+from app.metrics import JOB_ITEMS_PROCESSED, JOB_QUEUE_DEPTH
+
 logger = logging.getLogger(__name__)
 
 
@@ -83,6 +85,7 @@ class JobManager:
             status=JobStatus.PROCESSING,
             total=total_images,
         )
+        JOB_QUEUE_DEPTH.labels("ocr").inc()
         logger.info(f"ジョブ作成: job_id={job_id}, total={total_images}")
         return job_id
 
@@ -100,10 +103,11 @@ class JobManager:
         job = self._jobs[job_id]
         job.results[result.image_id] = result
         job.completed += 1
+        JOB_ITEMS_PROCESSED.labels("ocr_page").inc()
 
         logger.debug(
-            f"結果追加: job_id={job_id}, image_id={result.image_id}, "
-            f"completed={job.completed}/{job.total}"
+            "結果追加: job_id=%s, image_id=%s, completed=%d/%d",
+            job_id, result.image_id, job.completed, job.total,
         )
 
     def complete_job(self, job_id: str, success: bool = True) -> None:
@@ -117,6 +121,8 @@ class JobManager:
             logger.warning(f"不明なジョブID: {job_id}")
             return
 
+        if self._jobs[job_id].status == JobStatus.PROCESSING:
+            JOB_QUEUE_DEPTH.labels("ocr").dec()
         self._jobs[job_id].status = (
             JobStatus.COMPLETED if success else JobStatus.FAILED
         )
@@ -168,6 +174,8 @@ class JobManager:
         ]
 
         for job_id in old_jobs:
+            if self._jobs[job_id].status == JobStatus.PROCESSING:
+                JOB_QUEUE_DEPTH.labels("ocr").dec()
             del self._jobs[job_id]
 
         if old_jobs:
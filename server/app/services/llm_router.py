@@ -0,0 +1,239 @@
+"""複数のAIモデルのルーティングモジュール
+
+設定された複数のモデル（AI_MODEL・AI_ROUTER_MODELS）から、呼び出しごとに
+観測したレイテンシ・エラー率・レート制限の残量で使用するモデルを選び、
+429・5xx・接続エラーの場合は次のモデルに切り替える。
+
+    - レイテンシ・エラー率は指数移動平均で記録する（未使用のモデルは優先し、1回使用して計測する）。
+      エラー率は時間とともに減衰させ、一時的な障害のあったモデルも再び選ばれるようにする
+    - レート制限の残量はレスポンスヘッダー（x-ratelimit-*）から取得し、残量が少ないモデルを後回しにする
+    - 429・5xxを返したモデルは一定時間（Retry-After、なければレート制限の回復までの時間、
+      AI_ROUTER_COOLDOWN_SECONDS）後回しにする。レート制限の回復を待てないモデル（app/services/rate_limiter.py）も同様
+    - 同じ条件のモデルは設定の順（AI_MODELが最優先）で選ぶ
+
+全てのモデルが失敗した場合は、最も早く使用可能になるモデルまで待って
+AI_MAX_RETRIES回まで繰り返す。
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence
+
+from app.config import settings
+from app.exceptions import APIConnectionError, ProviderUnavailableError, RateLimitError
+from app.metrics import LLM_FAILOVERS, LLM_RATE_LIMIT_REMAINING, LLM_RETRIES, LLM_ROUTE_LATENCY
+from app.services.prompts import PromptTemplates
+from app.services.rate_limiter import jittered
+from app.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# 他のモデルに切り替えるエラー
+FAILOVER_ERRORS = (RateLimitError, ProviderUnavailableError, APIConnectionError)
+
+# 指数移動平均の重み
+SMOOTHING = 0.2
+
+# エラー率1.0のモデルのスコアの倍率（1 + ERROR_PENALTY）
+ERROR_PENALTY = 4.0
+
+# レート制限の残量がこの割合を下回るとスコアを悪くする
+LOW_BUDGET_FRACTION = 0.1
+
+# エラー率が半分に減衰するまでの時間（秒）
+ERROR_HALF_LIFE_SECONDS = 300.0
+
+# レート制限の残量を有効とみなす時間（秒、多くのプロバイダーは1分単位で回復する）
+BUDGET_TTL_SECONDS = 60.0
+
+# 設定の順による差（後のモデルほどスコアをこの割合ずつ悪くする）
+PRIORITY_WEIGHT = 0.1
+
+
+@dataclass
+class Route:
+    """1つのモデルの呼び出し先と観測値"""
+
+    client: Any  # AIClient（callと、あればcompleteを使用する）
+    priority: int
+    latency: Optional[float] = None  # 成功した呼び出しの処理時間の移動平均（秒）
+    error_rate: float = 0.0  # 429・5xx・接続エラーの割合の移動平均
+    error_updated: float = 0.0  # エラー率の更新時刻（time.monotonic）
+    rate_limit_remaining: Optional[float] = None  # レート制限の残量の割合（0-1）
+    budget_updated: float = 0.0  # レート制限の残量の取得時刻（time.monotonic）
+    cooldown_until: float = 0.0  # 後回しにする期限（time.monotonic）
+
+    @property
+    def model(self) -> str:
+        return getattr(self.client, "model", f"route{self.priority}")
+
+    def cooling(self, now: float) -> bool:
+        """後回しにする期間中か"""
+        return now < self.cooldown_until
+
+    def current_error_rate(self, now: float) -> float:
+        """時間による減衰を反映したエラー率"""
+        return self.error_rate * 0.5 ** ((now - self.error_updated) / ERROR_HALF_LIFE_SECONDS)
+
+    def score(self, now: float) -> float:
+        """選択の優先度（小さいほど優先、未使用のモデルは0）"""
+        latency = self.latency if self.latency is not None else 0.0
+        score = latency * (1.0 + ERROR_PENALTY * self.current_error_rate(now))
+        score *= 1.0 + PRIORITY_WEIGHT * self.priority
+        remaining = self.rate_limit_remaining
+        if remaining is not None and now - self.budget_updated < BUDGET_TTL_SECONDS:
+            if remaining < LOW_BUDGET_FRACTION:
+                score /= max(remaining / LOW_BUDGET_FRACTION, 0.01)
+        return score
+
+
+class ModelRouter:
+    """複数のAIクライアントから呼び出しごとにモデルを選ぶクラス
+
+    AIClientと同じcallインターフェースを持ち、SummaryServiceのclientとして使用する。
+    複数のスレッドから同時に呼び出せる。
+    """
+
+    def __init__(self, clients: Sequence[Any]):
+        """初期化
+
+        Args:
+            clients: AIクライアント（AIClientと同じcallインターフェースを持つもの、優先順）
+        """
+        if not clients:
+            raise ValueError("AIクライアントが指定されていません")
+        self.routes = [Route(client=client, priority=i) for i, client in enumerate(clients)]
+        self._lock = threading.Lock()
+
+    @property
+    def model(self) -> str:
+        """最優先のモデル名"""
+        return self.routes[0].model
+
+    def call(
+        self,
+        prompt: str,
+        system_prompt: str = PromptTemplates.SYSTEM,
+        temperature: Optional[float] = None,
+    ) -> str:
+        """モデルを選んで呼び出す（失敗した場合は他のモデルに切り替える）
+
+        Args:
+            prompt: ユーザープロンプト
+            system_prompt: システムプロンプト
+            temperature: 生成の温度パラメータ
+
+        Returns:
+            AIの応答テキスト
+
+        Raises:
+            RateLimitError: 全てのモデルがレート制限に達し、リトライ上限に達した場合
+            AIClientError: 全てのモデルの呼び出しに失敗し、リトライ上限に達した場合
+        """
+        last_error: Optional[Exception] = None
+        attempts = max(settings.AI_MAX_RETRIES, 1)
+        for attempt in range(attempts):
+            if attempt > 0:
+                self._backoff(attempt, last_error)
+            for route in self._candidates():
+                try:
+                    return self._call_route(route, prompt, system_prompt, temperature)
+                except FAILOVER_ERRORS as e:
+                    last_error = e
+                    LLM_FAILOVERS.labels(route.model, _reason(e)).inc()
+                    logger.warning(
+                        f"AI API呼び出しに失敗したため他のモデルに切り替えます: "
+                        f"モデル={route.model}, {e.message} (試行 {attempt + 1}/{attempts})"
+                    )
+        logger.error("全てのモデルの呼び出しに失敗しました: リトライ上限に達しました")
+        raise last_error
+
+    def _candidates(self) -> List[Route]:
+        """今回の試行で呼び出すモデル（優先順）
+
+        後回しにする期間中のモデルは除く。全てのモデルが期間中の場合は、
+        最も早く期間が終わるモデルのみ呼び出す。
+        """
+        now = time.monotonic()
+        with self._lock:
+            available = [route for route in self.routes if not route.cooling(now)]
+            if not available:
+                return [min(self.routes, key=lambda route: route.cooldown_until)]
+            return sorted(available, key=lambda route: (route.score(now), route.priority))
+
+    def _call_route(
+        self, route: Route, prompt: str, system_prompt: str, temperature: Optional[float]
+    ) -> str:
+        """1つのモデルを呼び出し、観測値を更新する"""
+        complete = getattr(route.client, "complete", None)
+        start = time.perf_counter()
+        try:
+            with span("llm.route", **{"llm.model": route.model}):
+                if complete is not None:
+                    result = complete(prompt, system_prompt, temperature)
+                    text, remaining = result.text, result.rate_limit_remaining
+                else:
+                    text, remaining = route.client.call(prompt, system_prompt, temperature), None
+        except FAILOVER_ERRORS as e:
+            self._record_failure(route, e)
+            raise
+        self._record_success(route, time.perf_counter() - start, remaining)
+        return text
+
+    def _record_success(self, route: Route, elapsed: float, remaining: Optional[float]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if route.latency is None:
+                route.latency = elapsed
+            else:
+                route.latency += SMOOTHING * (elapsed - route.latency)
+            route.error_rate = route.current_error_rate(now) * (1.0 - SMOOTHING)
+            route.error_updated = now
+            if remaining is not None:
+                route.rate_limit_remaining = remaining
+                route.budget_updated = now
+            route.cooldown_until = 0.0
+        LLM_ROUTE_LATENCY.labels(route.model).set(route.latency)
+        if remaining is not None:
+            LLM_RATE_LIMIT_REMAINING.labels(route.model).set(remaining)
+
+    def _record_failure(self, route: Route, error: Exception) -> None:
+        retry_after = getattr(error, "retry_after", None)
+        cooldown = retry_after or settings.AI_ROUTER_COOLDOWN_SECONDS
+        now = time.monotonic()
+        with self._lock:
+            error_rate = route.current_error_rate(now)
+            route.error_rate = error_rate + SMOOTHING * (1.0 - error_rate)
+            route.error_updated = now
+            route.cooldown_until = max(route.cooldown_until, now + cooldown)
+
+    def _backoff(self, attempt: int, last_error: Optional[Exception]) -> None:
+        """全てのモデルが失敗した後、最も早く使用可能になるモデルまで待つ
+
+        待ち時間はAI_RETRY_DELAY * 2^(試行回数 - 1)を上限とし、同時に待っている呼び出しが
+        一斉に再開しないようにジッターを加える。
+        """
+        now = time.monotonic()
+        with self._lock:
+            earliest = min(route.cooldown_until for route in self.routes)
+        delay = jittered(
+            min(max(earliest - now, 0.0), settings.AI_RETRY_DELAY * (2 ** (attempt - 1)))
+        )
+        if last_error is not None:
+            LLM_RETRIES.labels(self.model, _reason(last_error)).inc()
+        if delay <= 0:
+            return
+        logger.warning(f"全てのモデルが使用できません。{delay:.1f}秒後にリトライします")
+        with span("llm.backoff", **{"llm.model": self.model, "llm.backoff_seconds": delay}):
+            time.sleep(delay)
+
+
+def _reason(error: Exception) -> str:
+    """メトリクスのラベルに使用するエラーの種類"""
+    if isinstance(error, RateLimitError):
+        return "rate_limit"
+    if isinstance(error, ProviderUnavailableError):
+        return "unavailable"
+    return "connection"
@@ -56,7 +56,7 @@ class OCROrchestrator:
 
         for image in images:
             try:
-                ocr_text = self._ocr_service.process_image(image.file_path)
+                ocr_text = self._ocr_service.extract_text(image.file_path)
                 result = OCRResult(
                     image_id=str(image.id),
                     ocr_text=ocr_text,
@@ -5,14 +5,19 @@ Google Vision APIまたはPaddleOCRを使用して画像からテキストを抽
 
 import logging
 import os
+import time
 import uuid
+from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 
 from PIL import Image as PILImage
 
 from app.config import settings
 from app.exceptions import OCRProcessingError
+from app.metrics import OCR_PAGE_DURATION
 from app.models import Image
+from app.services.janitor import janitor
+from app.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +30,9 @@ except ImportError:
 
 class BaseOCRService:
     """OCRサービスのベースクラス"""
+
+    # メトリクスのラベルに使用するエンジン名
+    engine_name = "base"
     
     def __init__(self):
         self._jobs: Dict[str, Dict[str, Any]] = {}  # ジョブID -> ジョブ情報
@@ -32,6 +40,30 @@ class BaseOCRService:
     def process_image(self, image_path: str) -> str:
         """画像からテキストを抽出する（サブクラスで実装）"""
         raise NotImplementedError
+
+    def extract_text(self, image_path: str) -> str:
+        """処理時間を記録しながら画像からテキストを抽出する
+
+        OCRを呼び出す側はprocess_imageではなくこのメソッドを使用する。
+
+        Args:
+            image_path: 処理する画像のパス
+
+        Returns:
+            抽出されたテキスト
+        """
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            with span("ocr.process_image", **{"ocr.engine": self.engine_name, "ocr.image_path": image_path}) as ocr_span:
+                text = self.process_image(image_path)
+                ocr_span.set_attribute("ocr.text_length", len(text))
+            outcome = "success"
+            return text
+        finally:
+            OCR_PAGE_DURATION.labels(self.engine_name, outcome).observe(
+                time.perf_counter() - start
+            )
     
     def process_images(self, images: List[Image]) -> str:
         """複数の画像を処理し、ジョブIDを返す"""
@@ -42,13 +74,14 @@ class BaseOCRService:
             "results": {},
             "status": "processing",
             "total": len(images),
-            "completed": 0
+            "completed": 0,
+            "created_at": datetime.now(),
         }
         
         for image in images:
             try:
-                ocr_text = self.process_image(image.file_path)
-                logger.debug(f"OCR結果: image_id={image.id}, text_length={len(ocr_text)}")
+                ocr_text = self.extract_text(image.file_path)
+                logger.debug("OCR結果: image_id=%s, text_length=%d", image.id, len(ocr_text))
                 self._jobs[job_id]["results"][str(image.id)] = {
                     "image_id": image.id,
                     "ocr_text": ocr_text,
@@ -92,8 +125,32 @@ class BaseOCRService:
             "results": list(job["results"].values())
         }
 
+    def cleanup_old_jobs(self, max_age_hours: int = 24) -> int:
+        """処理済みの古いジョブを削除する
+
+        Args:
+            max_age_hours: 削除対象の経過時間（時間）
+
+        Returns:
+            削除されたジョブ数
+        """
+        cutoff = datetime.now() - timedelta(hours=max_age_hours)
+        old_jobs = [
+            job_id
+            for job_id, job in list(self._jobs.items())
+            if job["status"] == "completed" and job["created_at"] < cutoff
+        ]
+        for job_id in old_jobs:
+            self._jobs.pop(job_id, None)
+
+        if old_jobs:
+            logger.info("古いOCRジョブを削除: %d件", len(old_jobs))
+        return len(old_jobs)
+
 class GoogleVisionOCRService(BaseOCRService):
     """Google Vision APIを使用したOCRサービス"""
+
+    engine_name = "google_vision"
     
     def __init__(self):
         super().__init__()
@@ -142,6 +199,8 @@ class GoogleVisionOCRService(BaseOCRService):
 
 class PaddleOCRService(BaseOCRService):
     """PaddleOCRを使用したOCRサービス"""
+
+    engine_name = "paddleocr"
     
     def __init__(self):
         super().__init__()
@@ -208,3 +267,6 @@ def get_ocr_service() -> BaseOCRService:
 
 # デフォルトのOCRサービスインスタンス
 ocr_service = get_ocr_service()
+
+# OCR処理APIのジョブ情報を定期清掃の対象にする
+janitor.register_job_store("ocr_process", ocr_service.cleanup_old_jobs)
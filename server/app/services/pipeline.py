@@ -0,0 +1,400 @@
+"""OCR→要約パイプラインモジュール
+
+ページのOCRとチャンク単位の要約をパイプライン化し、OCRの残り処理と
+AI APIの待ち時間を重ねて実行する。連続するページのOCR結果が
+チャンクサイズに達した時点で、そのチャンクをAIに送信する。
+"""
+
+import logging
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config import settings
+from app.database import SessionLocal
+from app.exceptions import (
+    AIClientError,
+    AppException,
+    ConfigurationError,
+    OCRProcessingError,
+    RateLimitError,
+    SummaryGenerationError,
+)
+from app.models import Image, Summary
+from app.services.job_manager import JobStatus
+from app.services.prompts import BookContext, PromptTemplates
+from app.services.summary_jobs import SummaryJobManager, summary_job_manager
+from app.services.usage_service import UsageRecorder, track_usage, usage_chunk, usage_service
+from app.tracing import span, submit_with_context
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PipelinePage:
+    """パイプラインで処理する1ページ"""
+
+    page_number: int
+    image_path: str
+    ocr_text: Optional[str] = None  # 既存のOCR結果（ある場合はOCRを省略）
+    image_id: Optional[str] = None
+
+
+@dataclass
+class PipelineResult:
+    """パイプラインの処理結果"""
+
+    original_text: str
+    summarized_text: str
+    page_texts: Dict[int, str] = field(default_factory=dict)
+    errors: List[str] = field(default_factory=list)
+
+
+# コールバック型
+PageCallback = Callable[[PipelinePage, str, Optional[str]], None]
+ChunkCallback = Callable[[int, Optional[str], Optional[str]], None]
+
+
+class SummaryPipeline:
+    """OCRと要約をパイプライン実行するクラス
+
+    データベースには依存せず、ページのリストを受け取って処理する。
+    OCRはワーカースレッドで先行して実行し、AI呼び出しは専用スレッドで
+    チャンクの準備ができた順に実行する。
+    """
+
+    def __init__(
+        self,
+        ocr_service=None,
+        summary_svc=None,
+        chunk_size: Optional[int] = None,
+        ocr_workers: Optional[int] = None,
+        chunk_delay: Optional[float] = None,
+    ):
+        """初期化
+
+        Args:
+            ocr_service: OCRサービス（省略時はデフォルトを使用）
+            summary_svc: 要約サービス（省略時はデフォルトを使用）
+            chunk_size: AIに送信するチャンクの目安サイズ（文字数）
+            ocr_workers: OCRの並列数
+            chunk_delay: チャンク送信間の待機時間（秒）
+        """
+        if ocr_service is None:
+            from app.services import get_ocr_service
+
+            ocr_service = get_ocr_service()
+        if summary_svc is None:
+            from app.services.summary_service import summary_service
+
+            summary_svc = summary_service
+
+        self._ocr_service = ocr_service
+        self._summary_service = summary_svc
+        self._chunk_size = chunk_size or settings.PIPELINE_CHUNK_SIZE
+        self._ocr_workers = ocr_workers or settings.PIPELINE_OCR_WORKERS
+        self._chunk_delay = (
+            settings.AI_CHUNK_DELAY if chunk_delay is None else chunk_delay
+        )
+
+    def run(
+        self,
+        pages: List[PipelinePage],
+        custom_instructions: Optional[str] = None,
+        on_page: Optional[PageCallback] = None,
+        on_chunk_dispatched: Optional[Callable[[int], None]] = None,
+        on_chunk_done: Optional[ChunkCallback] = None,
+        book: Optional[BookContext] = None,
+        on_chunks_planned: Optional[Callable[[int], None]] = None,
+    ) -> PipelineResult:
+        """ページを処理して要約を生成する
+
+        Args:
+            pages: 処理するページのリスト
+            custom_instructions: カスタム指示（省略時はデフォルトの要約指示）
+            on_page: ページのOCR完了時のコールバック（呼び出し元スレッドで実行）
+            on_chunk_dispatched: チャンク送信時のコールバック
+            on_chunk_done: チャンク処理完了時のコールバック（AIスレッドで実行）
+            book: プロンプトに含める書籍の情報
+            on_chunks_planned: 全ページのOCRが完了し、チャンク数が確定した時のコールバック
+
+        Returns:
+            パイプラインの処理結果
+
+        Raises:
+            ConfigurationError: 要約サービスが初期化されていない場合
+            SummaryGenerationError: 要約を生成できなかった場合
+        """
+        if not self._summary_service.client:
+            raise ConfigurationError(
+                "処理エンジンが初期化されていません。APIキーを設定してください。"
+            )
+
+        instructions = custom_instructions or PromptTemplates.DEFAULT_INSTRUCTION
+        pages = sorted(pages, key=lambda p: p.page_number)
+
+        page_texts: Dict[int, str] = {}
+        errors: List[str] = []
+        chunk_futures: List[Future] = []
+        buffer: List[str] = []
+        buffer_length = 0
+
+        with ThreadPoolExecutor(
+            max_workers=self._ocr_workers, thread_name_prefix="pipeline-ocr"
+        ) as ocr_pool, ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="pipeline-ai"
+        ) as ai_pool:
+
+            def dispatch(last_page: int) -> None:
+                index = len(chunk_futures)
+                chunk = "\n\n".join(buffer)
+                logger.info(
+                    "チャンク送信: chunk=%d, last_page=%d, length=%d",
+                    index + 1, last_page, len(chunk),
+                )
+                chunk_futures.append(
+                    submit_with_context(
+                        ai_pool, self._process_chunk, index, chunk, instructions, book, on_chunk_done
+                    )
+                )
+                if on_chunk_dispatched:
+                    on_chunk_dispatched(index)
+
+            # OCRが必要なページを先行して投入する
+            ocr_futures: Dict[int, Future] = {
+                p.page_number: submit_with_context(ocr_pool, self._ocr_page, p)
+                for p in pages
+                if p.ocr_text is None
+            }
+
+            # ページ順にOCR結果を受け取り、チャンクが満たされたら送信する
+            for page in pages:
+                if page.page_number in ocr_futures:
+                    text, error = ocr_futures[page.page_number].result()
+                else:
+                    text, error = page.ocr_text or "", None
+
+                page_texts[page.page_number] = text
+                if error:
+                    errors.append(f"ページ {page.page_number}: {error}")
+                if on_page:
+                    on_page(page, text, error)
+
+                if text:
+                    buffer.append(text)
+                    buffer_length += len(text) + 2
+                if buffer_length >= self._chunk_size:
+                    dispatch(page.page_number)
+                    buffer, buffer_length = [], 0
+
+            if buffer:
+                dispatch(pages[-1].page_number)
+            if on_chunks_planned:
+                on_chunks_planned(len(chunk_futures))
+
+            chunk_outputs = [f.result() for f in chunk_futures]
+
+        original_text = "\n\n".join(t for t in page_texts.values() if t)
+        if not original_text:
+            raise SummaryGenerationError(
+                "OCRテキストが抽出されていません: " + "; ".join(errors)
+            )
+
+        results = [text for text, _ in chunk_outputs if text is not None]
+        errors.extend(error for _, error in chunk_outputs if error)
+        if not results:
+            raise SummaryGenerationError(
+                f"全てのチャンク処理に失敗しました: {'; '.join(errors)}"
+            )
+        if errors:
+            logger.warning("パイプラインで一部の処理に失敗: %s", errors)
+
+        return PipelineResult(
+            original_text=original_text,
+            summarized_text="\n\n".join(results),
+            page_texts=page_texts,
+            errors=errors,
+        )
+
+    def _ocr_page(self, page: PipelinePage) -> Tuple[str, Optional[str]]:
+        """1ページのOCRを実行する
+
+        Returns:
+            (抽出テキスト, エラーメッセージ)
+        """
+        try:
+            return self._ocr_service.extract_text(page.image_path), None
+        except OCRProcessingError as e:
+            logger.error("OCR処理失敗: page=%d, error=%s", page.page_number, e.message)
+            return "", e.message
+        except (OSError, IOError) as e:
+            logger.error("ファイル読み取りエラー: page=%d, error=%s", page.page_number, e)
+            return "", f"ファイル読み取りエラー: {e}"
+
+    def _process_chunk(
+        self,
+        index: int,
+        chunk: str,
+        instructions: str,
+        book: Optional[BookContext],
+        on_chunk_done: Optional[ChunkCallback],
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """1チャンクをAIで処理する
+
+        Returns:
+            (処理結果, エラーメッセージ)
+        """
+        # レート制限対策のため待機（最初のチャンク以外）
+        if index > 0 and self._chunk_delay:
+            with span("summary.chunk_delay", delay_seconds=self._chunk_delay):
+                time.sleep(self._chunk_delay)
+
+        text: Optional[str] = None
+        error: Optional[str] = None
+        try:
+            with span(
+                "summary.chunk", **{"chunk.index": index, "chunk.length": len(chunk)}
+            ), usage_chunk(index):
+                text = self._summary_service.process_chunk(chunk, instructions, book)
+            logger.info("チャンク %d の処理完了", index + 1)
+        except RateLimitError:
+            error = f"チャンク {index + 1}: レート制限エラー"
+        except AIClientError as e:
+            error = f"チャンク {index + 1}: {e.message}"
+        if error:
+            logger.error(error)
+
+        if on_chunk_done:
+            on_chunk_done(index, text, error)
+        return text, error
+
+
+# パイプラインジョブ用のエグゼキューター
+_job_executor = ThreadPoolExecutor(
+    max_workers=settings.PIPELINE_MAX_JOBS, thread_name_prefix="pipeline-job"
+)
+
+
+def start_pipeline_job(
+    summary_id: uuid.UUID,
+    images: List[Image],
+    custom_instructions: Optional[str] = None,
+    job_mgr: Optional[SummaryJobManager] = None,
+    book: Optional[BookContext] = None,
+    on_finish: Optional[Callable[[str], None]] = None,
+) -> str:
+    """パイプラインジョブをバックグラウンドで開始する
+
+    Args:
+        summary_id: 要約ID
+        images: 処理する画像（ページ順）
+        custom_instructions: カスタム指示
+        job_mgr: ジョブマネージャー（省略時はグローバルインスタンスを使用）
+        book: プロンプトに含める書籍の情報
+        on_finish: ジョブの終了時（成功・失敗とも）にジョブIDを渡して呼び出す関数
+
+    Returns:
+        ジョブID
+    """
+    job_mgr = job_mgr or summary_job_manager
+    pages = [
+        PipelinePage(
+            page_number=image.page_number,
+            image_path=image.file_path,
+            ocr_text=image.ocr_text or None,
+            image_id=str(image.id),
+        )
+        for image in images
+    ]
+    job_id = job_mgr.create_job(str(summary_id), pages_total=len(pages))
+    submit_with_context(
+        _job_executor,
+        _run_pipeline_job,
+        job_mgr,
+        job_id,
+        summary_id,
+        pages,
+        custom_instructions,
+        book,
+        on_finish,
+    )
+    return job_id
+
+
+def _run_pipeline_job(
+    job_mgr: SummaryJobManager,
+    job_id: str,
+    summary_id: uuid.UUID,
+    pages: List[PipelinePage],
+    custom_instructions: Optional[str],
+    book: Optional[BookContext],
+    on_finish: Optional[Callable[[str], None]] = None,
+) -> None:
+    """パイプラインジョブを実行し、結果をデータベースに保存する
+
+    トークン使用量はジョブIDを生成IDとして保存する（失敗した場合も保存する）。
+    """
+    recorder = UsageRecorder()
+    job_mgr.update(job_id, status=JobStatus.PROCESSING, usage=recorder)
+    db = SessionLocal()
+    saved = False
+
+    def on_page(page: PipelinePage, text: str, error: Optional[str]) -> None:
+        # 新たにOCRしたページのみ保存する
+        if page.ocr_text is None and text and page.image_id:
+            image = db.get(Image, uuid.UUID(page.image_id))
+            if image is not None:
+                image.ocr_text = text
+                db.commit()
+        job_mgr.mark_page_done(job_id)
+
+    try:
+        with span(
+            "pipeline.run", **{"job.id": job_id, "pipeline.pages": len(pages)}
+        ), track_usage(recorder):
+            result = SummaryPipeline().run(
+                pages,
+                custom_instructions,
+                on_page=on_page,
+                on_chunk_dispatched=lambda _: job_mgr.mark_chunk_dispatched(job_id),
+                on_chunk_done=lambda i, text, error: job_mgr.add_chunk_result(
+                    job_id, i, text, error
+                ),
+                book=book,
+                on_chunks_planned=lambda total: job_mgr.update(job_id, chunks_total=total),
+            )
+
+        summary = db.get(Summary, summary_id)
+        if summary is None:
+            raise SummaryGenerationError(f"要約が見つかりません: {summary_id}")
+        # 保存しない設定の場合、元テキストは取得時にページから組み立てる
+        summary.original_text = result.original_text if settings.STORE_ORIGINAL_TEXT else ""
+        summary.summarized_text = result.summarized_text
+        summary.custom_instructions = custom_instructions
+        usage_service.save(db, summary_id, job_id, recorder)
+        db.commit()
+        saved = True
+
+        job_mgr.complete_job(job_id, summarized_text=result.summarized_text)
+    except AppException as e:
+        db.rollback()
+        logger.error("パイプラインジョブ失敗: job_id=%s, error=%s", job_id, e.message)
+        job_mgr.complete_job(job_id, error=e.message)
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error("データベース更新エラー: job_id=%s, error=%s", job_id, e)
+        job_mgr.complete_job(job_id, error=f"データベース更新中にエラーが発生しました: {e}")
+    except Exception as e:
+        db.rollback()
+        logger.exception("パイプラインジョブで予期しないエラー: job_id=%s", job_id)
+        job_mgr.complete_job(job_id, error=f"予期しないエラーが発生しました: {e}")
+    finally:
+        if not saved:
+            usage_service.save(db, summary_id, job_id, recorder, commit=True)
+        db.close()
+        if on_finish is not None:
+            on_finish(job_id)
@@ -1,21 +1,49 @@
 """プロンプトテンプレート定義
 
 AI処理用のプロンプトテンプレートを管理する。
+
+プロバイダーのプロンプトキャッシュ（OpenAI・Geminiは先頭が一致する部分を自動でキャッシュ、
+Anthropicはcache_controlを付けた位置までをキャッシュ）を利用するため、1冊の書籍の処理で
+共通の部分（システムプロンプト・指示・書籍の情報）をシステムメッセージにまとめて先頭に置き、
+チャンクごとに変わるテキストはユーザーメッセージに分ける。
 """
 
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from app.utils.constants import SummaryConstants
+
 
 class PromptTemplates:
     """プロンプトテンプレートを管理するクラス"""
 
-    SYSTEM = "あなたは優秀なアシスタントです。"
+    SYSTEM = (
+        "あなたは書籍の内容を正確に整理するアシスタントです。"
+        "書籍のページ画像からOCRで抽出したテキスト（またはその一部）が渡されるので、"
+        "指示に従って処理し、結果のみを出力してください。"
+        "OCRによる誤字・改行の乱れ・ページ番号やヘッダーの混入は、文脈から補って読み取ってください。"
+    )
 
     DEFAULT_INSTRUCTION = (
         "以下のテキストを要約してください。"
         "要点を簡潔にまとめ、重要な情報を保持してください。"
     )
 
-    CHUNK = """
+    # システムメッセージ（1冊の書籍の処理で共通の部分）
+    PREFIX = """{system}
+
+## 指示
 {instructions}
+"""
+
+    BOOK_CONTEXT = """
+## 書籍
+タイトル: {title}
+説明: {description}
+"""
+
+    # ユーザーメッセージ（チャンクごとに変わる部分）
+    CHUNK = """以下は書籍の一部です。
 
 テキスト:
 {text}
@@ -23,11 +51,58 @@ class PromptTemplates:
 結果:
 """
 
-    DIRECT = """
-{instructions}
+    DIRECT = """以下は書籍の本文です。
 
 テキスト:
 {text}
 
 結果:
 """
+
+
+@dataclass(frozen=True)
+class BookContext:
+    """プロンプトに含める書籍の情報"""
+
+    title: str
+    description: str = ""
+
+    @classmethod
+    def from_summary(cls, summary: Any) -> Optional["BookContext"]:
+        """要約から書籍の情報を作成する（一時的な要約の場合はNone）"""
+        if summary is None or summary.title == SummaryConstants.TEMPORARY_TITLE:
+            return None
+        return cls(title=summary.title or "", description=summary.description or "")
+
+
+@dataclass(frozen=True)
+class Prompt:
+    """AIに送信するプロンプト"""
+
+    system: str  # 共通の部分（キャッシュの対象）
+    user: str  # テキスト
+
+
+def build_prompt(
+    template: str,
+    text: str,
+    instructions: str,
+    book: Optional[BookContext] = None,
+) -> Prompt:
+    """共通の部分とテキストを分けてプロンプトを組み立てる
+
+    Args:
+        template: ユーザーメッセージのテンプレート（PromptTemplates.CHUNK / DIRECT）
+        text: 処理するテキスト
+        instructions: 処理指示
+        book: 書籍の情報（省略時は含めない）
+
+    Returns:
+        プロンプト
+    """
+    system = PromptTemplates.PREFIX.format(system=PromptTemplates.SYSTEM, instructions=instructions)
+    if book is not None:
+        system += PromptTemplates.BOOK_CONTEXT.format(
+            title=book.title, description=book.description or "なし"
+        )
+    return Prompt(system=system, user=template.format(text=text))
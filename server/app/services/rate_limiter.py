@@ -0,0 +1,414 @@
+"""AIプロバイダーのレート制限の調整モジュール
+
+レスポンスヘッダーからモデルごとのレート制限（上限・残量・回復までの時間）を学習し、
+制限に達する前にAPI呼び出しの間隔を空ける。
+
+    - 残量（x-ratelimit-remaining-requests / -tokens）が足りない場合は回復（x-ratelimit-reset-*）まで待つ
+    - 残量の割合がAI_RATE_LIMIT_PACING_THRESHOLDを下回った場合は、回復までの時間を
+      残りの呼び出し回数で割った間隔で呼び出す
+    - 429を受けた場合はRetry-After（なければ回復までの時間、AI_ROUTER_COOLDOWN_SECONDS）まで呼び出さない
+    - 待ち時間にはジッターを加え、同時に待っている呼び出しが一斉に再開しないようにする
+    - 待ち時間がAI_RATE_LIMIT_MAX_WAITを超える場合は待たずにRateLimitErrorとし、
+      ModelRouterが他のモデルに切り替える
+
+状態はモデルごとにプロセス内で共有し、同時に実行中の呼び出しは残量を予約して調整する。
+RATE_LIMIT_REDIS_URLを指定した場合はRedisに保存し、複数のワーカープロセスで共有する
+（Redisに接続できない場合はプロセス内の状態で続行する）。
+"""
+
+import logging
+import math
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional, Tuple, TypeVar
+
+from app.config import settings
+from app.exceptions import RateLimitError
+from app.metrics import LLM_RATE_LIMIT_WAIT
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+    HAS_REDIS = True
+except ImportError:
+    HAS_REDIS = False
+
+# レート制限の種類（リクエスト数・トークン数）
+KINDS = ("requests", "tokens")
+
+# トークン数の見積もりに使用する1トークンあたりの文字数（日本語は1文字1トークン前後のため小さめにする）
+CHARS_PER_TOKEN = 2
+
+# Redisに保存した状態の有効期間（秒、使用されなくなったモデルの状態を削除する）
+REDIS_STATE_TTL = 3600
+
+# Redisのロックの有効期間・取得待ちの上限（秒）
+REDIS_LOCK_TIMEOUT = 5
+
+# 共有ストアの障害後、再び使用を試みるまでの時間（秒）
+STORE_RETRY_SECONDS = 30
+
+# 回復までの時間の表記（OpenAI: "1m30.5s"、"20ms"）
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+T = TypeVar("T")
+
+
+@dataclass
+class RateLimitInfo:
+    """レスポンスヘッダーから取得したレート制限の情報"""
+
+    # 種類ごとの（上限, 残量, 回復までの秒数）
+    limits: Dict[str, Tuple[Optional[float], Optional[float], Optional[float]]]
+    retry_after: Optional[float] = None
+
+    @classmethod
+    def from_headers(cls, headers: Optional[Mapping[str, Any]]) -> "RateLimitInfo":
+        """ヘッダーから作成する
+
+        LiteLLMがOpenAI形式に変換したヘッダー（x-ratelimit-*）と、
+        プロバイダーのヘッダー（llm_provider-付き、Anthropicのanthropic-ratelimit-*）の両方に対応する。
+        """
+        lowered = {str(k).lower(): v for k, v in (headers or {}).items()}
+
+        def get(*names: str) -> Optional[str]:
+            for name in names:
+                for key in (name, f"llm_provider-{name}"):
+                    if lowered.get(key) not in (None, ""):
+                        return lowered[key]
+            return None
+
+        limits = {}
+        for kind in KINDS:
+            limit = _parse_number(get(f"x-ratelimit-limit-{kind}", f"anthropic-ratelimit-{kind}-limit"))
+            remaining = _parse_number(
+                get(f"x-ratelimit-remaining-{kind}", f"anthropic-ratelimit-{kind}-remaining")
+            )
+            reset = _parse_reset(get(f"x-ratelimit-reset-{kind}", f"anthropic-ratelimit-{kind}-reset"))
+            if limit is not None or remaining is not None:
+                limits[kind] = (limit, remaining, reset)
+
+        retry_after = _parse_number(get("retry-after"))
+        if retry_after is None:
+            retry_after_ms = _parse_number(get("retry-after-ms"))
+            retry_after = retry_after_ms / 1000 if retry_after_ms is not None else None
+        return cls(limits=limits, retry_after=retry_after)
+
+    def remaining_fraction(self) -> Optional[float]:
+        """残量の割合（リクエスト数・トークン数のうち小さい方、取得できない場合はNone）"""
+        fractions = [
+            min(max(remaining / limit, 0.0), 1.0)
+            for limit, remaining, _ in self.limits.values()
+            if limit and remaining is not None
+        ]
+        return min(fractions) if fractions else None
+
+    def reset_after(self) -> Optional[float]:
+        """制限が回復するまでの秒数（残量がない種類があればその回復まで、なければ最も早い回復まで）"""
+        exhausted = [reset for _, remaining, reset in self.limits.values() if remaining == 0 and reset]
+        if exhausted:
+            return max(exhausted)
+        resets = [reset for _, _, reset in self.limits.values() if reset]
+        return min(resets) if resets else None
+
+
+def _parse_number(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_reset(value: Optional[str]) -> Optional[float]:
+    """回復までの時間（"1m30s"などの表記・秒数・RFC 3339の日時）を秒数にする"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    number = _parse_number(value)
+    if number is not None:
+        return max(number, 0.0)
+    parts = _DURATION_RE.findall(value)
+    if parts and "".join(n + u for n, u in parts) == value:
+        return sum(float(n) * _DURATION_UNITS[u] for n, u in parts)
+    try:
+        reset_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if reset_at.tzinfo is None:
+        return None
+    return max(reset_at.timestamp() - time.time(), 0.0)
+
+
+def estimate_tokens(*texts: str) -> int:
+    """送信するテキストの入力トークン数を見積もる"""
+    return sum(len(text) for text in texts) // CHARS_PER_TOKEN
+
+
+def jittered(delay: float) -> float:
+    """待ち時間にジッター（最大AI_RATE_LIMIT_JITTERの割合）を加える"""
+    if delay <= 0:
+        return 0.0
+    return delay * (1.0 + random.uniform(0.0, settings.AI_RATE_LIMIT_JITTER))
+
+
+@dataclass
+class RateLimitState:
+    """1つのモデルのレート制限の状態
+
+    時刻はすべてtime.time()（複数のプロセスで共有するため）。
+    """
+
+    requests_limit: Optional[float] = None
+    requests_remaining: Optional[float] = None
+    requests_reset_at: float = 0.0
+    tokens_limit: Optional[float] = None
+    tokens_remaining: Optional[float] = None
+    tokens_reset_at: float = 0.0
+    blocked_until: float = 0.0  # 429を受けて呼び出さない期限
+    next_start: float = 0.0  # 間隔を空ける場合の次の呼び出しの開始時刻
+
+    def to_mapping(self) -> Dict[str, str]:
+        """Redisのハッシュに保存する形式にする"""
+        return {key: "" if value is None else repr(value) for key, value in asdict(self).items()}
+
+    @classmethod
+    def from_mapping(cls, mapping: Mapping[str, str]) -> "RateLimitState":
+        """Redisのハッシュから作成する"""
+        state = cls()
+        for f in fields(cls):
+            value = _parse_number(mapping.get(f.name))
+            if value is not None:
+                setattr(state, f.name, value)
+        return state
+
+    def update(self, info: RateLimitInfo, now: float) -> None:
+        """レスポンスヘッダーの値で更新する
+
+        残量は予約済みの分より多くならないようにする（ヘッダーの値は、同時に実行中の
+        呼び出しの予約を反映していないため）。回復の時刻を過ぎた後はreserveで上限まで戻す。
+        """
+        for kind, (limit, remaining, reset) in info.limits.items():
+            if limit is not None:
+                setattr(self, f"{kind}_limit", limit)
+            if remaining is not None:
+                current = getattr(self, f"{kind}_remaining")
+                setattr(self, f"{kind}_remaining", remaining if current is None else min(remaining, current))
+            if reset is not None:
+                setattr(self, f"{kind}_reset_at", now + reset)
+
+    def reserve(self, now: float, tokens: int) -> float:
+        """1回の呼び出しの残量を予約する
+
+        Args:
+            now: 現在時刻
+            tokens: 見積もった入力トークン数
+
+        Returns:
+            呼び出しまでに待つ秒数（0の場合は予約済みで、すぐに呼び出せる）
+        """
+        if self.blocked_until > now:
+            return self.blocked_until - now
+
+        waits = [self.next_start - now] if self.next_start > now else []
+        calls_left = []
+        for kind, need in (("requests", 1), ("tokens", tokens)):
+            limit = getattr(self, f"{kind}_limit")
+            reset_at = getattr(self, f"{kind}_reset_at")
+            if reset_at and now >= reset_at:
+                # 回復の時刻を過ぎたら上限まで戻す
+                setattr(self, f"{kind}_remaining", limit)
+                setattr(self, f"{kind}_reset_at", 0.0)
+                reset_at = 0.0
+            remaining = getattr(self, f"{kind}_remaining")
+            if remaining is None or not reset_at or need <= 0:
+                continue
+            if limit:
+                # 上限を超える見積もりは上限まで（回復を待っても足りないため）
+                need = min(need, limit)
+            if remaining < need:
+                waits.append(reset_at - now)
+            elif limit and remaining / limit < settings.AI_RATE_LIMIT_PACING_THRESHOLD:
+                calls_left.append(((reset_at - now), remaining / need))
+        if waits:
+            return max(waits)
+
+        # 残量が少ない場合は回復までの時間に呼び出しを分散する
+        interval = max((seconds / max(calls, 1.0) for seconds, calls in calls_left), default=0.0)
+        self.next_start = now + interval
+        if self.requests_remaining is not None:
+            self.requests_remaining -= 1
+        if self.tokens_remaining is not None:
+            self.tokens_remaining -= tokens
+        return 0.0
+
+
+class MemoryRateLimitStore:
+    """プロセス内でレート制限の状態を共有するストア"""
+
+    def __init__(self):
+        self._states: Dict[str, RateLimitState] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def transaction(self, key: str) -> Iterator[RateLimitState]:
+        """モデルの状態を排他的に参照・更新する"""
+        with self._lock:
+            yield self._states.setdefault(key, RateLimitState())
+
+
+class RedisRateLimitStore:
+    """Redisで複数のワーカープロセスとレート制限の状態を共有するストア"""
+
+    def __init__(self, url: str, prefix: str = "text_summarizer:rate_limit"):
+        """
+        Args:
+            url: RedisのURL
+            prefix: キーの接頭辞
+        """
+        self._client = redis.Redis.from_url(
+            url, decode_responses=True, socket_timeout=REDIS_LOCK_TIMEOUT
+        )
+        self._prefix = prefix
+
+    @contextmanager
+    def transaction(self, key: str) -> Iterator[RateLimitState]:
+        """モデルの状態をRedisのロックで排他的に参照・更新する"""
+        name = f"{self._prefix}:{key}"
+        with self._client.lock(
+            f"{name}:lock", timeout=REDIS_LOCK_TIMEOUT, blocking_timeout=REDIS_LOCK_TIMEOUT
+        ):
+            state = RateLimitState.from_mapping(self._client.hgetall(name))
+            yield state
+            pipeline = self._client.pipeline()
+            pipeline.hset(name, mapping=state.to_mapping())
+            pipeline.expire(name, REDIS_STATE_TTL)
+            pipeline.execute()
+
+
+# ストアの障害として扱う例外（この場合はプロセス内の状態で続行する）
+STORE_ERRORS = (redis.RedisError,) if HAS_REDIS else ()
+
+
+class AdaptiveRateLimiter:
+    """モデルごとのレート制限に合わせてAPI呼び出しを調整するクラス
+
+    複数のスレッドから同時に呼び出せる。
+    """
+
+    def __init__(self, store: Any = None):
+        """初期化
+
+        Args:
+            store: 複数のプロセスで状態を共有するストア（省略時はプロセス内のみ）
+        """
+        self._shared = store
+        self._local = MemoryRateLimitStore()
+        self._shared_failed_at: Optional[float] = None
+
+    def acquire(self, key: str, tokens: int = 0) -> None:
+        """API呼び出しの前に残量を予約する（必要な場合は待つ）
+
+        Args:
+            key: モデル名
+            tokens: 見積もった入力トークン数
+
+        Raises:
+            RateLimitError: 待ち時間がAI_RATE_LIMIT_MAX_WAITを超える場合
+        """
+        waited = 0.0
+        while True:
+            now = time.time()
+            wait = self._transaction(key, lambda state: state.reserve(now, tokens))
+            if wait <= 0:
+                if waited:
+                    LLM_RATE_LIMIT_WAIT.labels(key).observe(waited)
+                return
+            if waited + wait > settings.AI_RATE_LIMIT_MAX_WAIT:
+                logger.info(
+                    "レート制限の回復を待たずに他のモデルに切り替えます: モデル=%s, 待ち時間=%.1f秒",
+                    key, wait,
+                )
+                raise RateLimitError(max(math.ceil(wait), 1))
+            delay = jittered(wait)
+            logger.debug("レート制限のため待機します: モデル=%s, %.2f秒", key, delay)
+            time.sleep(delay)
+            waited += delay
+
+    def observe(self, key: str, headers: Optional[Mapping[str, Any]]) -> RateLimitInfo:
+        """レスポンスヘッダーからレート制限の状態を更新する
+
+        Args:
+            key: モデル名
+            headers: レスポンスヘッダー
+
+        Returns:
+            ヘッダーから取得したレート制限の情報
+        """
+        info = RateLimitInfo.from_headers(headers)
+        if info.limits:
+            now = time.time()
+            self._transaction(key, lambda state: state.update(info, now))
+        return info
+
+    def block(self, key: str, headers: Optional[Mapping[str, Any]]) -> int:
+        """429を受けたモデルの呼び出しを止める
+
+        Args:
+            key: モデル名
+            headers: 429のレスポンスヘッダー
+
+        Returns:
+            呼び出しを止める秒数（Retry-After、なければ回復までの時間、AI_ROUTER_COOLDOWN_SECONDS）
+        """
+        info = RateLimitInfo.from_headers(headers)
+        seconds = info.retry_after or info.reset_after() or settings.AI_ROUTER_COOLDOWN_SECONDS
+        now = time.time()
+
+        def apply(state: RateLimitState) -> None:
+            state.update(info, now)
+            state.blocked_until = max(state.blocked_until, now + seconds)
+
+        self._transaction(key, apply)
+        return max(math.ceil(seconds), 1)
+
+    def _transaction(self, key: str, fn: Callable[[RateLimitState], T]) -> T:
+        """ストアの状態に関数を適用する（ストアの障害時はプロセス内の状態を使用する）"""
+        failed_at = self._shared_failed_at
+        if self._shared is not None and (
+            failed_at is None or time.monotonic() - failed_at > STORE_RETRY_SECONDS
+        ):
+            try:
+                with self._shared.transaction(key) as state:
+                    result = fn(state)
+                self._shared_failed_at = None
+                return result
+            except STORE_ERRORS as e:
+                self._shared_failed_at = time.monotonic()
+                logger.warning("レート制限の共有ストアに接続できないため、プロセス内の状態を使用します: %s", e)
+        with self._local.transaction(key) as state:
+            return fn(state)
+
+
+def _create_store() -> Optional[Any]:
+    """設定に基づいて共有ストアを作成する（指定がない場合はNone）"""
+    if not settings.RATE_LIMIT_REDIS_URL:
+        return None
+    if not HAS_REDIS:
+        logger.warning(
+            "RATE_LIMIT_REDIS_URLが指定されていますが、redisがインストールされていません"
+            "（レート制限の状態はプロセスごとに管理します）"
+        )
+        return None
+    logger.info("レート制限の状態をRedisで共有します")
+    return RedisRateLimitStore(settings.RATE_LIMIT_REDIS_URL)
+
+
+# シングルトンインスタンス
+rate_limiter = AdaptiveRateLimiter(_create_store())
@@ -0,0 +1,884 @@
+"""全文検索モジュール
+
+要約のタイトル・説明・要約テキスト・OCRテキストを対象に全文検索を行う。
+
+テキスト列は圧縮して保存されている（CompressedText）ため、検索用のインデックスを
+別テーブルに持ち、書き込み（コミット）のたびにバックグラウンドで更新する。
+
+日本語は単語の区切りがないため、テキストをアプリケーション側で以下のトークンに分割し、
+空白区切りのトークン列としてインデックスに登録する。検索語も同じ規則で分割し、
+トークンの並び（フレーズ）として検索する。
+    - 英数字の連続: 1語として扱う（小文字化）
+    - それ以外の文字の連続: 2文字ずつ重ねて分割する（bi-gram）
+
+トークン分割をアプリケーション側で行うため、データベースごとの処理は登録・検索のみになる。
+    - PostgreSQL: tsvector（simple構成）+ GINインデックス、ts_rankで順位付け
+    - SQLite: FTS5仮想テーブル、bm25で順位付け
+"""
+
+import html
+import logging
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Pattern, Set, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session, defer, sessionmaker
+
+from app.config import settings
+from app.database import SessionLocal, engine
+from app.metrics import SEARCH_INDEX_UPDATES, SEARCH_QUERY_DURATION
+from app.models import Image, Summary
+from app.utils import SummaryConstants
+
+logger = logging.getLogger(__name__)
+
+# インデックスのテーブル名（PostgreSQLでは通常のテーブル、SQLiteではFTS5仮想テーブル）
+INDEX_TABLE = "summary_search"
+
+# インデックスに登録する項目（順序はSQLiteの列順・重み付けと対応する）
+FIELDS = ("title", "description", "summarized_text", "ocr_text")
+
+# OCRテキストのページ区切り
+PAGE_SEPARATOR = "\n\n"
+
+# 英数字の連続、またはそれ以外の単語構成文字の連続
+_SEGMENT_RE = re.compile(r"[0-9a-z]+|[^\W0-9a-z_]+")
+
+# 英数字以外の文字に挟まれた改行（OCRテキストの行末での折り返し）
+_LINE_BREAK_RE = re.compile(r"(?<=[^\x00-\x7f])[ \t]*\n\s*(?=[^\x00-\x7f])")
+
+# セッションに書き込みのあった要約IDを記録するキー
+_DIRTY_KEY = "_search_dirty_summary_ids"
+
+# スニペットの位置を元のテキストに対応付ける際に正規化するブロックの目安の文字数
+SNIPPET_BLOCK_SIZE = 1024
+
+
+def prepare_text(value: str) -> str:
+    """トークン分割・スニペット作成の前にテキストを正規化する
+
+    NFKC正規化（全角英数字を半角に）と小文字化を行い、日本語の行末の改行を取り除く。
+    """
+    normalized = unicodedata.normalize("NFKC", value).lower()
+    return _LINE_BREAK_RE.sub("", normalized)
+
+
+def tokenize(value: str) -> List[str]:
+    """テキストを検索用のトークンに分割する
+
+    Args:
+        value: 分割するテキスト
+
+    Returns:
+        トークンのリスト（出現順）
+    """
+    tokens: List[str] = []
+    for segment in _SEGMENT_RE.findall(prepare_text(value)):
+        if segment.isascii() or len(segment) == 1:
+            tokens.append(segment)
+        else:
+            tokens.extend(segment[i:i + 2] for i in range(len(segment) - 1))
+    return tokens
+
+
+def index_text(value: Optional[str], max_length: Optional[int] = None) -> str:
+    """インデックスに登録するトークン列（空白区切り）を作成する
+
+    Args:
+        value: 元のテキスト
+        max_length: 先頭から索引付けする最大文字数（省略時は設定値）
+
+    Returns:
+        空白区切りのトークン列
+    """
+    if not value:
+        return ""
+    max_length = settings.SEARCH_MAX_FIELD_LENGTH if max_length is None else max_length
+    return " ".join(tokenize(value[:max_length]))
+
+
+@dataclass
+class SearchQuery:
+    """検索語を解析した結果
+
+    空白で区切られた語はすべて含む（AND）ものとして扱い、1つの語は
+    トークンの並び（フレーズ）として検索する。日本語1文字の語は、その文字で
+    始まるトークンの前方一致で検索する。
+    """
+
+    terms: List[str]
+    phrases: List[List[str]]
+
+    @classmethod
+    def parse(cls, query: str) -> "SearchQuery":
+        terms: List[str] = []
+        phrases: List[List[str]] = []
+        for term in prepare_text(query).split():
+            tokens = tokenize(term)
+            if tokens:
+                terms.append(term)
+                phrases.append(tokens)
+        return cls(terms=terms, phrases=phrases)
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.phrases
+
+    @staticmethod
+    def _is_prefix(tokens: List[str]) -> bool:
+        return len(tokens) == 1 and len(tokens[0]) == 1 and not tokens[0].isascii()
+
+    def fts5_phrases(self) -> List[str]:
+        """語ごとのSQLite FTS5のフレーズ式"""
+        phrases = []
+        for tokens in self.phrases:
+            phrase = '"' + " ".join(tokens) + '"'
+            phrases.append(phrase + "*" if self._is_prefix(tokens) else phrase)
+        return phrases
+
+    def to_fts5(self) -> str:
+        """SQLite FTS5のMATCH式に変換する"""
+        return " AND ".join(self.fts5_phrases())
+
+    def to_tsquery(self) -> str:
+        """PostgreSQLのto_tsquery形式に変換する"""
+        parts = []
+        for tokens in self.phrases:
+            if self._is_prefix(tokens):
+                parts.append(f"'{tokens[0]}':*")
+            else:
+                parts.append("(" + " <-> ".join(f"'{token}'" for token in tokens) + ")")
+        return " & ".join(parts)
+
+    def highlight_pattern(self) -> Pattern:
+        """スニペットで検索語を強調するための正規表現を作成する
+
+        インデックスでは記号や空白を無視するため、語の途中の記号・空白も許容する。
+        """
+        patterns = []
+        for term in sorted(self.terms, key=len, reverse=True):
+            segments = _SEGMENT_RE.findall(term)
+            patterns.append(r"[\W_]*".join(re.escape(segment) for segment in segments))
+        return re.compile("|".join(patterns))
+
+
+@dataclass
+class SearchHit:
+    """検索結果の1件"""
+
+    summary: Summary
+    score: float
+    snippet: Optional[str] = None
+    matched_field: Optional[str] = None
+    page_number: Optional[int] = None
+
+
+@dataclass
+class SearchResult:
+    """検索結果
+
+    一致件数が順位付けの対象件数（SEARCH_MAX_CANDIDATES）を超える場合、totalは
+    対象件数になり、total_cappedがTrueになる。
+    """
+
+    hits: List[SearchHit] = field(default_factory=list)
+    total: int = 0
+    total_capped: bool = False
+
+
+class _SearchBackend:
+    """データベースごとのインデックス操作
+
+    頻出語では一致件数が要約数に近くなり、すべてを順位付けすると件数に比例して
+    遅くなるため、順位付けは新しく登録されたものから最大candidates件までを対象にする。
+    """
+
+    def create_schema(self, conn: Connection) -> None:
+        raise NotImplementedError
+
+    def upsert(self, conn: Connection, summary_id: str, documents: Dict[str, str]) -> None:
+        raise NotImplementedError
+
+    def delete(self, conn: Connection, summary_id: str) -> None:
+        raise NotImplementedError
+
+    def search(
+        self, conn: Connection, query: SearchQuery, limit: int, offset: int, candidates: int
+    ) -> List[Tuple[str, float]]:
+        raise NotImplementedError
+
+    def count(self, conn: Connection, query: SearchQuery, max_count: int) -> int:
+        raise NotImplementedError
+
+    def is_empty(self, conn: Connection) -> bool:
+        return conn.execute(text(f"SELECT 1 FROM {INDEX_TABLE} LIMIT 1")).first() is None
+
+
+class _SQLiteBackend(_SearchBackend):
+    """SQLite FTS5によるインデックス
+
+    トークンは空白区切りで登録済みのため、FTS5の標準トークナイザー（unicode61）で
+    そのまま1トークンずつに分割される。
+    FTS5の行は要約ごとに初回登録時に採番したrowid（summary_search_ids）で特定する。
+    rowidは登録順に増えるため、rowidの範囲指定で新しいものから順位付けの対象を絞り込める。
+
+    一致件数が順位付けの対象件数以下の場合はbm25で、超える場合は対象の範囲内で
+    検索語を含む項目の重みの合計で順位付けする。
+    """
+
+    IDS_TABLE = f"{INDEX_TABLE}_ids"
+
+    # 項目ごとの重み（FIELDSの順）
+    FIELD_WEIGHTS = {"title": 10.0, "description": 4.0, "summarized_text": 2.0, "ocr_text": 1.0}
+
+    # 順位付けの関数（bm25の列ごとの重み: summary_id, FIELDS）
+    RANK_FUNCTION = f"bm25(0.0, {', '.join(str(weight) for weight in FIELD_WEIGHTS.values())})"
+
+    def create_schema(self, conn: Connection) -> None:
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE} USING fts5("
+            f"summary_id UNINDEXED, {', '.join(FIELDS)}, "
+            "tokenize = 'unicode61 remove_diacritics 0')"
+        ))
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {self.IDS_TABLE} ("
+            "doc_id INTEGER PRIMARY KEY, summary_id TEXT NOT NULL UNIQUE)"
+        ))
+
+    def _doc_id(self, conn: Connection, summary_id: str) -> Optional[int]:
+        return conn.execute(
+            text(f"SELECT doc_id FROM {self.IDS_TABLE} WHERE summary_id = :id"),
+            {"id": summary_id},
+        ).scalar()
+
+    def upsert(self, conn: Connection, summary_id: str, documents: Dict[str, str]) -> None:
+        doc_id = self._doc_id(conn, summary_id)
+        if doc_id is None:
+            doc_id = conn.execute(
+                text(f"INSERT INTO {self.IDS_TABLE} (summary_id) VALUES (:id)"),
+                {"id": summary_id},
+            ).lastrowid
+        else:
+            conn.execute(text(f"DELETE FROM {INDEX_TABLE} WHERE rowid = :doc_id"), {"doc_id": doc_id})
+        conn.execute(
+            text(
+                f"INSERT INTO {INDEX_TABLE} (rowid, summary_id, {', '.join(FIELDS)}) "
+                f"VALUES (:doc_id, :summary_id, {', '.join(':' + name for name in FIELDS)})"
+            ),
+            {"doc_id": doc_id, "summary_id": summary_id, **documents},
+        )
+
+    def delete(self, conn: Connection, summary_id: str) -> None:
+        doc_id = self._doc_id(conn, summary_id)
+        if doc_id is None:
+            return
+        conn.execute(text(f"DELETE FROM {INDEX_TABLE} WHERE rowid = :doc_id"), {"doc_id": doc_id})
+        conn.execute(text(f"DELETE FROM {self.IDS_TABLE} WHERE doc_id = :doc_id"), {"doc_id": doc_id})
+
+    def search(
+        self, conn: Connection, query: SearchQuery, limit: int, offset: int, candidates: int
+    ) -> List[Tuple[str, float]]:
+        match = query.to_fts5()
+        # 新しいものからcandidates件目のrowid（一致件数がそれ以下の場合はNone）
+        min_rowid = conn.execute(
+            text(
+                f"SELECT rowid FROM {INDEX_TABLE} WHERE {INDEX_TABLE} MATCH :query "
+                "ORDER BY rowid DESC LIMIT 1 OFFSET :offset"
+            ),
+            {"query": match, "offset": candidates - 1},
+        ).scalar()
+        if min_rowid is None:
+            return self._search_bm25(conn, match, limit, offset)
+        return self._search_weighted(conn, query, min_rowid, limit, offset)
+
+    def _search_bm25(
+        self, conn: Connection, match: str, limit: int, offset: int
+    ) -> List[Tuple[str, float]]:
+        """一致したすべての要約をbm25で順位付けする
+
+        bm25は一致件数に比例して検索語の出現件数（IDF）の集計に時間がかかるため、
+        一致件数が順位付けの対象件数以下の場合のみ使用する。
+        """
+        rows = conn.execute(
+            text(
+                f"SELECT summary_id, rank FROM {INDEX_TABLE} "
+                f"WHERE {INDEX_TABLE} MATCH :query AND rank MATCH :rank "
+                "ORDER BY rank LIMIT :limit OFFSET :offset"
+            ),
+            {"query": match, "rank": self.RANK_FUNCTION, "limit": limit, "offset": offset},
+        )
+        # bm25は小さいほど関連度が高いため、符号を反転してスコアにする
+        return [(row.summary_id, -row.rank) for row in rows]
+
+    def _search_weighted(
+        self, conn: Connection, query: SearchQuery, min_rowid: int, limit: int, offset: int
+    ) -> List[Tuple[str, float]]:
+        """rowidがmin_rowid以上の要約を、検索語を含む項目の重みの合計で順位付けする
+
+        項目ごとに列を指定して検索し、すべての検索語を含む項目の重みを加算する。
+        同じスコアの場合は新しいものを上位にする。
+        """
+        matched = conn.execute(
+            text(
+                f"SELECT rowid FROM {INDEX_TABLE} "
+                f"WHERE {INDEX_TABLE} MATCH :query AND rowid >= :min_rowid"
+            ),
+            {"query": query.to_fts5(), "min_rowid": min_rowid},
+        )
+        scores: Dict[int, float] = {row.rowid: 0.0 for row in matched}
+        for name, weight in self.FIELD_WEIGHTS.items():
+            rows = conn.execute(
+                text(
+                    f"SELECT rowid FROM {INDEX_TABLE} "
+                    f"WHERE {INDEX_TABLE} MATCH :query AND rowid >= :min_rowid"
+                ),
+                {"query": f"{name} : ({query.to_fts5()})", "min_rowid": min_rowid},
+            )
+            for row in rows:
+                scores[row.rowid] += weight
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))[offset:offset + limit]
+        if not ranked:
+            return []
+        summary_ids = dict(
+            conn.execute(
+                text(
+                    f"SELECT doc_id, summary_id FROM {self.IDS_TABLE} "
+                    f"WHERE doc_id IN ({', '.join(str(doc_id) for doc_id, _ in ranked)})"
+                )
+            ).all()
+        )
+        return [(summary_ids[doc_id], score) for doc_id, score in ranked if doc_id in summary_ids]
+
+    def count(self, conn: Connection, query: SearchQuery, max_count: int) -> int:
+        return conn.execute(
+            text(
+                f"SELECT count(*) FROM (SELECT rowid FROM {INDEX_TABLE} "
+                f"WHERE {INDEX_TABLE} MATCH :query LIMIT :max_count)"
+            ),
+            {"query": query.to_fts5(), "max_count": max_count},
+        ).scalar_one()
+
+
+class _PostgresBackend(_SearchBackend):
+    """PostgreSQLのtsvectorによるインデックス
+
+    simple構成（辞書による語形変化の処理なし）で登録し、項目ごとに重み（A: タイトル、
+    B: 説明・要約、D: OCRテキスト）を付ける。tsvectorの上限（1MB）を超えないよう、
+    各項目はSEARCH_MAX_FIELD_LENGTH文字までを索引付けする。
+    seqは初回登録時に採番し、順位付けの対象を新しいものから絞り込むために使用する。
+    """
+
+    WEIGHTS = {"title": "A", "description": "B", "summarized_text": "B", "ocr_text": "D"}
+
+    def create_schema(self, conn: Connection) -> None:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {INDEX_TABLE} ("
+            "summary_id UUID PRIMARY KEY, "
+            "seq BIGSERIAL NOT NULL, "
+            "document TSVECTOR NOT NULL, "
+            "updated_at TIMESTAMP NOT NULL DEFAULT now())"
+        ))
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{INDEX_TABLE}_document "
+            f"ON {INDEX_TABLE} USING GIN (document)"
+        ))
+
+    def upsert(self, conn: Connection, summary_id: str, documents: Dict[str, str]) -> None:
+        document = " || ".join(
+            f"setweight(to_tsvector('simple', :{name}), '{weight}')"
+            for name, weight in self.WEIGHTS.items()
+        )
+        conn.execute(
+            text(
+                f"INSERT INTO {INDEX_TABLE} (summary_id, document) "
+                f"VALUES (CAST(:summary_id AS UUID), {document}) "
+                "ON CONFLICT (summary_id) DO UPDATE "
+                "SET document = EXCLUDED.document, updated_at = now()"
+            ),
+            {"summary_id": summary_id, **documents},
+        )
+
+    def delete(self, conn: Connection, summary_id: str) -> None:
+        conn.execute(
+            text(f"DELETE FROM {INDEX_TABLE} WHERE summary_id = CAST(:id AS UUID)"),
+            {"id": summary_id},
+        )
+
+    def search(
+        self, conn: Connection, query: SearchQuery, limit: int, offset: int, candidates: int
+    ) -> List[Tuple[str, float]]:
+        rows = conn.execute(
+            text(
+                "WITH candidates AS ("
+                f"SELECT summary_id, document FROM {INDEX_TABLE} "
+                "WHERE document @@ to_tsquery('simple', :query) "
+                "ORDER BY seq DESC LIMIT :candidates) "
+                "SELECT summary_id, ts_rank(document, to_tsquery('simple', :query)) AS rank "
+                "FROM candidates ORDER BY rank DESC, summary_id LIMIT :limit OFFSET :offset"
+            ),
+            {
+                "query": query.to_tsquery(),
+                "candidates": candidates,
+                "limit": limit,
+                "offset": offset,
+            },
+        )
+        return [(str(row.summary_id), float(row.rank)) for row in rows]
+
+    def count(self, conn: Connection, query: SearchQuery, max_count: int) -> int:
+        return conn.execute(
+            text(
+                f"SELECT count(*) FROM (SELECT 1 FROM {INDEX_TABLE} "
+                "WHERE document @@ to_tsquery('simple', :query) LIMIT :max_count) AS matched"
+            ),
+            {"query": query.to_tsquery(), "max_count": max_count},
+        ).scalar_one()
+
+
+def _backend_for(dialect_name: str) -> _SearchBackend:
+    if dialect_name == "postgresql":
+        return _PostgresBackend()
+    if dialect_name == "sqlite":
+        return _SQLiteBackend()
+    raise ValueError(f"全文検索に対応していないデータベースです: {dialect_name}")
+
+
+def _is_temporary(summary: Summary) -> bool:
+    """一覧から除外される一時的な要約かどうか（get_summariesのフィルタと同じ条件）"""
+    return (
+        summary.description is None
+        or summary.title.lower() == SummaryConstants.TEMPORARY_TITLE.lower()
+    )
+
+
+class SearchService:
+    """全文検索サービス
+
+    インデックスの更新はコミット後にバックグラウンドのスレッドで行う。
+    同じ要約への更新が続いた場合（パイプラインのページごとのコミットなど）は、
+    未処理のものをまとめて1回だけ索引付けする。
+    """
+
+    def __init__(self, bind: Engine, session_factory: sessionmaker):
+        self._engine = bind
+        self._session_factory = session_factory
+        self._backend = _backend_for(bind.dialect.name)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search-index")
+        self._lock = threading.Lock()
+        self._pending: Set[uuid.UUID] = set()
+        self._draining = False
+        self._future: Optional[Future] = None
+        self._hooks_installed = False
+
+    def setup(self) -> None:
+        """インデックスを作成し、書き込み時の更新を有効にする
+
+        インデックスが空で要約がある場合（導入直後など）は、全件の索引付けを
+        バックグラウンドで開始する。
+        """
+        empty = self.create_schema()
+        self.install_hooks(self._session_factory)
+
+        if empty:
+            with self._session_factory() as db:
+                has_summaries = db.query(Summary.id).first() is not None
+            if has_summaries:
+                logger.info("検索インデックスを作成します")
+                with self._lock:
+                    self._future = self._executor.submit(self.reindex_all)
+
+    def create_schema(self) -> bool:
+        """インデックスのテーブルがなければ作成する
+
+        Returns:
+            インデックスが空かどうか
+        """
+        with self._engine.begin() as conn:
+            self._backend.create_schema(conn)
+            return self._backend.is_empty(conn)
+
+    def install_hooks(self, session_factory: sessionmaker) -> None:
+        """セッションのフラッシュ・コミットを監視し、変更された要約を索引付けする
+
+        Args:
+            session_factory: イベントを登録するsessionmaker
+        """
+        if self._hooks_installed:
+            return
+        self._hooks_installed = True
+
+        @event.listens_for(session_factory, "after_flush")
+        def _after_flush(session, flush_context):
+            dirty: Set[uuid.UUID] = session.info.setdefault(_DIRTY_KEY, set())
+            for obj in (*session.new, *session.dirty, *session.deleted):
+                if isinstance(obj, Summary):
+                    dirty.add(obj.id)
+                elif isinstance(obj, Image) and obj.summary_id is not None:
+                    dirty.add(obj.summary_id)
+
+        @event.listens_for(session_factory, "after_commit")
+        def _after_commit(session):
+            dirty = session.info.pop(_DIRTY_KEY, None)
+            if dirty:
+                self.schedule(dirty)
+
+        @event.listens_for(session_factory, "after_rollback")
+        def _after_rollback(session):
+            session.info.pop(_DIRTY_KEY, None)
+
+    def schedule(self, summary_ids: Iterable[uuid.UUID]) -> None:
+        """要約の索引付けを予約する
+
+        Args:
+            summary_ids: 索引付けする要約ID
+        """
+        with self._lock:
+            self._pending.update(summary_ids)
+            if not self._draining:
+                self._draining = True
+                self._future = self._executor.submit(self._drain)
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """予約済みの索引付け（全件の索引付けを含む）が終わるまで待つ
+
+        Args:
+            timeout: 最大待ち時間（秒）
+        """
+        with self._lock:
+            future = self._future
+        if future is not None:
+            future.result(timeout=timeout)
+
+    def _drain(self) -> None:
+        """予約された要約を1件ずつ索引付けする（処理中に追加された分も含む）"""
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._draining = False
+                    return
+                summary_id = self._pending.pop()
+            try:
+                with self._session_factory() as db:
+                    self.index_summary(db, summary_id)
+                    db.commit()
+            except Exception as e:
+                SEARCH_INDEX_UPDATES.labels("error").inc()
+                logger.error("検索インデックスの更新エラー: summary_id=%s: %s", summary_id, e)
+
+    def index_summary(self, db: Session, summary_id: uuid.UUID) -> bool:
+        """要約をインデックスに登録する（コミットは呼び出し元で行う）
+
+        削除された要約・一時的な要約はインデックスから削除する。
+
+        Args:
+            db: データベースセッション
+            summary_id: 要約ID
+
+        Returns:
+            登録した場合はTrue、削除した場合はFalse
+        """
+        conn = db.connection()
+        summary = (
+            db.query(Summary)
+            .options(defer(Summary.original_text))
+            .filter(Summary.id == summary_id)
+            .first()
+        )
+        if summary is None or _is_temporary(summary):
+            self._backend.delete(conn, str(summary_id))
+            SEARCH_INDEX_UPDATES.labels("removed").inc()
+            return False
+
+        documents = {
+            "title": index_text(summary.title),
+            "description": index_text(summary.description),
+            "summarized_text": index_text(summary.summarized_text),
+            "ocr_text": index_text(self._load_ocr_text(db, summary_id)),
+        }
+        self._backend.upsert(conn, str(summary_id), documents)
+        SEARCH_INDEX_UPDATES.labels("indexed").inc()
+        return True
+
+    def _load_ocr_text(self, db: Session, summary_id: uuid.UUID) -> str:
+        """ページのOCRテキストを索引付けする長さまで結合する"""
+        texts: List[str] = []
+        length = 0
+        query = (
+            db.query(Image.ocr_text)
+            .filter(Image.summary_id == summary_id, Image.ocr_text.isnot(None))
+            .order_by(Image.page_number)
+        )
+        for (ocr_text,) in query.yield_per(100):
+            texts.append(ocr_text)
+            length += len(ocr_text) + len(PAGE_SEPARATOR)
+            if length >= settings.SEARCH_MAX_FIELD_LENGTH:
+                break
+        return PAGE_SEPARATOR.join(texts)
+
+    def search(
+        self,
+        db: Session,
+        query: str,
+        limit: int = 10,
+        offset: int = 0,
+        with_snippets: bool = True,
+    ) -> SearchResult:
+        """要約を全文検索する
+
+        一致件数がSEARCH_MAX_CANDIDATESを超える場合は、新しく登録されたものから
+        その件数までを関連度順に並べる。
+
+        Args:
+            db: データベースセッション
+            query: 検索語（空白区切りで複数指定するとすべてを含むものを検索）
+            limit: 取得する最大件数
+            offset: スキップする件数
+            with_snippets: 一致箇所のスニペットを作成するかどうか
+
+        Returns:
+            関連度順の検索結果
+        """
+        start = time.perf_counter()
+        parsed = SearchQuery.parse(query)
+        if parsed.is_empty:
+            return SearchResult()
+
+        candidates = settings.SEARCH_MAX_CANDIDATES
+        conn = db.connection()
+        ranked = self._backend.search(conn, parsed, limit, offset, candidates)
+        matched = self._backend.count(conn, parsed, candidates + 1)
+        total, capped = min(matched, candidates), matched > candidates
+        if not ranked:
+            SEARCH_QUERY_DURATION.observe(time.perf_counter() - start)
+            return SearchResult(total=total, total_capped=capped)
+
+        ids = [uuid.UUID(summary_id) for summary_id, _ in ranked]
+        options = [defer(Summary.original_text)]
+        if not with_snippets:
+            options.append(defer(Summary.summarized_text))
+        summaries = {
+            summary.id: summary
+            for summary in db.query(Summary).options(*options).filter(Summary.id.in_(ids))
+        }
+
+        pattern = parsed.highlight_pattern()
+        hits: List[SearchHit] = []
+        for summary_id, score in zip(ids, (score for _, score in ranked)):
+            summary = summaries.get(summary_id)
+            # 削除直後などでインデックスの更新が済んでいないものは除外する
+            if summary is None:
+                continue
+            hit = SearchHit(summary=summary, score=score)
+            if with_snippets:
+                self._fill_snippet(db, hit, pattern)
+            hits.append(hit)
+
+        SEARCH_QUERY_DURATION.observe(time.perf_counter() - start)
+        return SearchResult(hits=hits, total=total, total_capped=capped)
+
+    def _fill_snippet(self, db: Session, hit: SearchHit, pattern: Pattern) -> None:
+        """要約テキスト・説明・OCRテキストの順に一致箇所を探してスニペットを作成する
+
+        タイトルのみに一致した場合はスニペットを作成しない。
+        """
+        for name in ("summarized_text", "description"):
+            snippet = make_snippet(getattr(hit.summary, name), pattern)
+            if snippet is not None:
+                hit.snippet, hit.matched_field = snippet, name
+                return
+
+        query = (
+            db.query(Image.page_number, Image.ocr_text)
+            .filter(Image.summary_id == hit.summary.id, Image.ocr_text.isnot(None))
+            .order_by(Image.page_number)
+        )
+        for page_number, ocr_text in query.yield_per(50):
+            snippet = make_snippet(ocr_text, pattern)
+            if snippet is not None:
+                hit.snippet, hit.matched_field, hit.page_number = snippet, "ocr_text", page_number
+                return
+
+    def reindex_all(self) -> int:
+        """すべての要約を索引付けし直す
+
+        Returns:
+            登録した要約数
+        """
+        indexed = 0
+        with self._session_factory() as db:
+            # 作成順に登録する（順位付けの対象を新しいものから絞り込む際の順序になる）
+            summary_ids = [row.id for row in db.query(Summary.id).order_by(Summary.created_at)]
+            for i, summary_id in enumerate(summary_ids, 1):
+                indexed += self.index_summary(db, summary_id)
+                if i % 500 == 0:
+                    db.commit()
+            db.commit()
+        logger.info("検索インデックスを作成しました: %d件", indexed)
+        return indexed
+
+
+def _prepare_with_offsets(value: str) -> Tuple[str, List[Tuple[int, int]]]:
+    """prepare_textと同じ正規化を行い、正規化後の各文字に対応する元のテキストの範囲を返す
+
+    結合文字（濁点など）は直前の文字とまとめて正規化する。正規化で1文字が複数の文字に
+    なる場合（「㍿」など）は、それぞれの文字が同じ範囲に対応する。
+
+    Returns:
+        (正規化したテキスト, 正規化後の各文字に対応する元のテキストの範囲のリスト)
+    """
+    chars: List[str] = []
+    spans: List[Tuple[int, int]] = []
+    position = 0
+    while position < len(value):
+        unit_end = position + 1
+        while unit_end < len(value) and unicodedata.combining(
+            unicodedata.normalize("NFKC", value[unit_end])[:1] or " "
+        ):
+            unit_end += 1
+        for char in unicodedata.normalize("NFKC", value[position:unit_end]).lower():
+            chars.append(char)
+            spans.append((position, unit_end))
+        position = unit_end
+
+    normalized = "".join(chars)
+    removed: Set[int] = set()
+    for m in _LINE_BREAK_RE.finditer(normalized):
+        removed.update(range(m.start(), m.end()))
+    if removed:
+        kept = [i for i in range(len(normalized)) if i not in removed]
+        normalized = "".join(normalized[i] for i in kept)
+        spans = [spans[i] for i in kept]
+    return normalized, spans
+
+
+def _is_block_boundary(value: str, position: int) -> bool:
+    """positionの前後で区切って正規化しても、全体を正規化した結果と変わらないかどうか
+
+    前後の文字が空白（行末の改行の除去に関わる）・結合文字・ハングルの字母（直前の文字と
+    合成される）でなければ区切ってよいものとする。
+    """
+    before = unicodedata.normalize("NFKC", value[position - 1])
+    after = unicodedata.normalize("NFKC", value[position])
+    if not before or not after or any(c.isspace() for c in before + after):
+        return False
+    return not unicodedata.combining(after[0]) and not "\u1100" <= after[0] <= "\u11ff"
+
+
+def _prepare_blocks(value: str) -> Tuple[str, List[Tuple[int, int, int, int]]]:
+    """元のテキストをブロックに区切ってprepare_textで正規化する
+
+    Returns:
+        (正規化したテキスト, 各ブロックの(元のテキストの開始, 終了, 正規化後の開始, 終了)のリスト)
+    """
+    texts: List[str] = []
+    blocks: List[Tuple[int, int, int, int]] = []
+    low = offset = 0
+    while low < len(value):
+        high = min(len(value), low + SNIPPET_BLOCK_SIZE)
+        while high < len(value) and not _is_block_boundary(value, high):
+            high += 1
+        block = prepare_text(value[low:high])
+        texts.append(block)
+        blocks.append((low, high, offset, offset + len(block)))
+        low, offset = high, offset + len(block)
+    return "".join(texts), blocks
+
+
+def _map_window(
+    value: str, prepared: str, blocks: List[Tuple[int, int, int, int]], start: int, end: int
+) -> Optional[List[Tuple[int, int]]]:
+    """正規化したテキストのprepared[start:end]の各文字に対応する元のテキストの範囲を返す
+
+    範囲に重なるブロックのみ1文字ずつ対応付ける。
+
+    Returns:
+        元のテキストの範囲のリスト、1文字ずつの正規化がブロックの正規化と一致しない場合はNone
+    """
+    spans: List[Tuple[int, int]] = []
+    window_offset: Optional[int] = None
+    for low, high, first, last in blocks:
+        if last <= start or first >= end:
+            continue
+        block, block_spans = _prepare_with_offsets(value[low:high])
+        if block != prepared[first:last]:
+            return None
+        if window_offset is None:
+            window_offset = first
+        spans.extend((begin + low, finish + low) for begin, finish in block_spans)
+    if window_offset is None:
+        return None
+    return spans[start - window_offset:end - window_offset]
+
+
+def make_snippet(value: Optional[str], pattern: Pattern, length: Optional[int] = None) -> Optional[str]:
+    """最初の一致箇所の前後を切り出し、一致部分を<mark>で囲んだスニペットを作成する
+
+    一致の検索は正規化（prepare_text）したテキストで行い、スニペットは元のテキスト
+    （大文字・全角文字はそのまま、日本語の行末の改行は除く）から切り出してHTMLエスケープする。
+    テキストはブロックごとに正規化し、元のテキストとの1文字ずつの対応付けは
+    スニペットの範囲に重なるブロックのみ行う。
+
+    Args:
+        value: 対象のテキスト
+        pattern: 検索語の正規表現（SearchQuery.highlight_pattern）
+        length: スニペットの文字数（正規化後の文字数、省略時は設定値）
+
+    Returns:
+        スニペット、一致しない場合はNone
+    """
+    if not value:
+        return None
+    prepared, blocks = _prepare_blocks(value)
+    match = pattern.search(prepared)
+    if match is None:
+        return None
+
+    length = settings.SEARCH_SNIPPET_LENGTH if length is None else length
+    start = max(0, match.start() - length // 3)
+    end = min(len(prepared), start + length)
+    spans = _map_window(value, prepared, blocks, start, end)
+    if spans is None:
+        # ブロックの区切りで正規化が変わる場合（まれ）は全体を1文字ずつ対応付ける
+        prepared, all_spans = _prepare_with_offsets(value)
+        match = pattern.search(prepared)
+        if match is None:
+            return None
+        start = max(0, match.start() - length // 3)
+        end = min(len(prepared), start + length)
+        spans = all_spans[start:end]
+
+    marked = [False] * (end - start)
+    for m in pattern.finditer(prepared[start:end]):
+        for i in range(m.start(), m.end()):
+            marked[i] = True
+
+    # 正規化後の文字を元のテキストの範囲に戻し、強調の有無が同じ範囲ごとにまとめる
+    segments: List[Tuple[bool, List[str]]] = []
+    last_span: Optional[Tuple[int, int]] = None
+    for char_span, is_marked in zip(spans, marked):
+        if char_span == last_span:
+            continue
+        last_span = char_span
+        if not segments or segments[-1][0] != is_marked:
+            segments.append((is_marked, []))
+        segments[-1][1].append(value[char_span[0]:char_span[1]])
+
+    parts: List[str] = []
+    for is_marked, texts in segments:
+        escaped = html.escape("".join(texts))
+        parts.append(f"<mark>{escaped}</mark>" if is_marked else escaped)
+
+    snippet = "".join(parts).replace("\n", " ")
+    return ("…" if start > 0 else "") + snippet + ("…" if end < len(prepared) else "")
+
+
+# シングルトンインスタンス
+search_service = SearchService(engine, SessionLocal)
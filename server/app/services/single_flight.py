@@ -0,0 +1,141 @@
+"""同じ内容の処理の重複実行の抑止（single-flight）モジュール
+
+ダブルクリックやクライアントのリトライで、同じ内容の要約生成が同時に送信されることがある。
+同じキーの処理が実行中の場合、後から来た呼び出しは新たに実行せず、実行中の処理の結果を待って受け取る。
+
+    - プロセス内: SingleFlightで、実行中の処理の結果（または例外）をそのまま共有する
+    - 複数のワーカー間: advisory_lockでPostgreSQLのアドバイザリーロックを取得し、
+      同じキーの処理を直列化する（ロックを待った側は、待っている間に保存された結果を使用できる）
+
+SQLiteではアドバイザリーロックがないため、プロセス内の抑止のみ行う。
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, Optional, TypeVar
+
+from sqlalchemy import func, select
+
+from app.database import engine
+from app.exceptions import AppException
+from app.metrics import SINGLE_FLIGHT_COALESCED
+
+logger = logging.getLogger(__name__)
+
+# アドバイザリーロックの取得を再試行する間隔（秒）
+LOCK_POLL_INTERVAL = 0.5
+
+T = TypeVar("T")
+
+
+class SingleFlightTimeoutError(AppException):
+    """同じ内容の処理の完了待ちがタイムアウトした"""
+
+    def __init__(self, timeout: float):
+        super().__init__(message=f"同じ内容の処理の完了を{timeout:.0f}秒待ちましたが終了しませんでした")
+        self.timeout = timeout
+
+
+@dataclass
+class _Flight:
+    """実行中の処理"""
+
+    done: threading.Event = field(default_factory=threading.Event)
+    result: object = None
+    error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """同じキーの処理をプロセス内で同時に1回だけ実行するクラス"""
+
+    def __init__(self, name: str):
+        """
+        Args:
+            name: 処理の名前（メトリクスのラベル・ログに使用）
+        """
+        self.name = name
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def run(self, key: str, fn: Callable[[], T], timeout: Optional[float] = None) -> T:
+        """同じキーの処理が実行中でなければ実行し、実行中であればその結果を待って返す
+
+        Args:
+            key: 処理の内容を表すキー
+            fn: 処理
+            timeout: 実行中の処理の完了を待つ最大時間（秒、省略時は無制限）
+
+        Returns:
+            処理の結果（後から来た呼び出しには、先に実行した処理の結果と同じオブジェクト）
+
+        Raises:
+            SingleFlightTimeoutError: 実行中の処理が時間内に完了しなかった場合
+            Exception: 処理が送出した例外（後から来た呼び出しにも同じ例外を送出する）
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            SINGLE_FLIGHT_COALESCED.labels(self.name, "process").inc()
+            logger.info("同じ内容の処理が実行中のため完了を待ちます: name=%s, key=%s", self.name, key[:12])
+            if not flight.done.wait(timeout):
+                raise SingleFlightTimeoutError(timeout)
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+
+@contextmanager
+def advisory_lock(key: str, timeout: float) -> Iterator[bool]:
+    """同じキーの処理をワーカー間で直列化するロックを取得する
+
+    PostgreSQLのセッションレベルのアドバイザリーロックを専用の接続で保持する
+    （プロセスが終了した場合も接続の切断で解放される）。PostgreSQL以外では何もしない。
+
+    Args:
+        key: 処理の内容を表すキー
+        timeout: ロックの取得を待つ最大時間（秒）
+
+    Yields:
+        他のワーカーが保持していたロックの解放を待ったかどうか
+
+    Raises:
+        SingleFlightTimeoutError: 時間内にロックを取得できなかった場合
+    """
+    if engine.dialect.name != "postgresql":
+        yield False
+        return
+
+    # pg_advisory_lockのキーは64ビットの符号付き整数
+    lock_id = int.from_bytes(hashlib.sha256(key.encode("utf-8")).digest()[:8], "big", signed=True)
+    waited = False
+    deadline = time.monotonic() + timeout
+    with engine.connect() as conn:
+        while not conn.execute(select(func.pg_try_advisory_lock(lock_id))).scalar():
+            if time.monotonic() >= deadline:
+                raise SingleFlightTimeoutError(timeout)
+            waited = True
+            time.sleep(LOCK_POLL_INTERVAL)
+        try:
+            yield waited
+        finally:
+            conn.execute(select(func.pg_advisory_unlock(lock_id)))
+            conn.commit()
@@ -0,0 +1,295 @@
+"""要約ジョブ管理モジュール
+
+OCRから要約までを通して実行するバックグラウンドジョブ（パイプライン）と、
+バックグラウンドで実行する要約生成のジョブの状態を管理する。
+
+要約生成のチャンクの進捗は、contextvarsでジョブに関連付けて記録する::
+
+    with track_progress(job_mgr, job_id):
+        summary_service.summarize_text(...)
+
+ジョブの外（同期の要約生成）では、進捗の記録は何もしない。
+"""
+
+import contextvars
+import logging
+import threading
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from app.metrics import JOB_ITEMS_PROCESSED, JOB_QUEUE_DEPTH
+from app.services.job_manager import JobStatus
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SummaryJob:
+    """要約ジョブ情報"""
+
+    job_id: str
+    summary_id: str
+    status: JobStatus
+    pages_total: int
+    pages_done: int = 0
+    chunks_total: Optional[int] = None  # 要約するチャンク数（分かった時点で設定する）
+    chunks_dispatched: int = 0
+    chunks_done: int = 0
+    chunk_results: Dict[int, str] = field(default_factory=dict)
+    errors: List[str] = field(default_factory=list)
+    summarized_text: Optional[str] = None
+    error: Optional[str] = None
+    usage: Optional[Any] = None  # トークン使用量の記録（UsageRecorder、処理中も参照できる）
+    version: int = 0
+    created_at: datetime = field(default_factory=datetime.now)
+    updated_at: datetime = field(default_factory=datetime.now)
+
+    @property
+    def is_finished(self) -> bool:
+        """ジョブが終了状態かどうか"""
+        return self.status in (JobStatus.COMPLETED, JobStatus.FAILED)
+
+    @property
+    def partial_text(self) -> Optional[str]:
+        """処理中の途中結果（完了したチャンクの結果をチャンク順に結合したもの）"""
+        if not self.chunk_results:
+            return None
+        return "\n\n".join(self.chunk_results[index] for index in sorted(self.chunk_results))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """辞書形式に変換"""
+        return {
+            "job_id": self.job_id,
+            "summary_id": self.summary_id,
+            "status": self.status.value,
+            "pages_total": self.pages_total,
+            "pages_done": self.pages_done,
+            "chunks_total": self.chunks_total,
+            "chunks_dispatched": self.chunks_dispatched,
+            "chunks_done": self.chunks_done,
+            "errors": list(self.errors),
+            "partial_text": None if self.is_finished else self.partial_text,
+            "summarized_text": self.summarized_text,
+            "error": self.error,
+            "usage": self.usage.totals() if self.usage is not None else None,
+            "version": self.version,
+        }
+
+
+class SummaryJobManager:
+    """要約ジョブを管理するクラス
+
+    ジョブはワーカースレッドから更新され、APIスレッドから参照されるため、
+    すべての操作をロックで保護する。
+    """
+
+    def __init__(self):
+        self._jobs: Dict[str, SummaryJob] = {}
+        self._lock = threading.Lock()
+
+    def create_job(self, summary_id: str, pages_total: int) -> str:
+        """新しいジョブを作成する
+
+        Args:
+            summary_id: 要約ID
+            pages_total: 処理するページ数
+
+        Returns:
+            ジョブID
+        """
+        job_id = str(uuid.uuid4())
+        with self._lock:
+            self._jobs[job_id] = SummaryJob(
+                job_id=job_id,
+                summary_id=summary_id,
+                status=JobStatus.PENDING,
+                pages_total=pages_total,
+            )
+        JOB_QUEUE_DEPTH.labels("summary").inc()
+        logger.info("要約ジョブ作成: job_id=%s, pages=%d", job_id, pages_total)
+        return job_id
+
+    def update(self, job_id: str, **changes: Any) -> None:
+        """ジョブの属性を更新する
+
+        Args:
+            job_id: ジョブID
+            **changes: 更新する属性と値
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                logger.warning("不明なジョブID: %s", job_id)
+                return
+            for key, value in changes.items():
+                setattr(job, key, value)
+            self._touch(job)
+
+    def mark_page_done(self, job_id: str) -> None:
+        """ページのOCR完了を記録する"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.pages_done += 1
+                self._touch(job)
+        JOB_ITEMS_PROCESSED.labels("summary_page").inc()
+
+    def mark_chunk_dispatched(self, job_id: str) -> None:
+        """チャンクのAI送信を記録する"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.chunks_dispatched += 1
+                self._touch(job)
+
+    def add_chunk_result(
+        self, job_id: str, index: int, text: Optional[str], error: Optional[str] = None
+    ) -> None:
+        """チャンクの処理結果を記録する
+
+        Args:
+            job_id: ジョブID
+            index: チャンク番号（0始まり）
+            text: 処理結果（失敗時はNone）
+            error: エラーメッセージ
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.chunks_done += 1
+            JOB_ITEMS_PROCESSED.labels("summary_chunk").inc()
+            if text is not None:
+                job.chunk_results[index] = text
+            if error:
+                job.errors.append(error)
+            self._touch(job)
+
+    def complete_job(
+        self,
+        job_id: str,
+        summarized_text: Optional[str] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        """ジョブを終了状態にする
+
+        Args:
+            job_id: ジョブID
+            summarized_text: 最終的な処理結果
+            error: 失敗時のエラーメッセージ
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                logger.warning("不明なジョブID: %s", job_id)
+                return
+            if not job.is_finished:
+                JOB_QUEUE_DEPTH.labels("summary").dec()
+            job.status = JobStatus.FAILED if error else JobStatus.COMPLETED
+            job.summarized_text = summarized_text
+            job.error = error
+            self._touch(job)
+        logger.info("要約ジョブ完了: job_id=%s, status=%s", job_id, job.status.value)
+
+    def get_job(self, job_id: str) -> Optional[SummaryJob]:
+        """ジョブを取得する"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def get_job_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """ジョブのステータスを辞書形式で取得する
+
+        Args:
+            job_id: ジョブID
+
+        Returns:
+            ジョブステータス情報、見つからない場合はNone
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job is not None else None
+
+    def active_summary_ids(self) -> Set[str]:
+        """実行中のジョブの要約IDを取得する"""
+        with self._lock:
+            return {job.summary_id for job in self._jobs.values() if not job.is_finished}
+
+    def cleanup_old_jobs(self, max_age_hours: int = 24) -> int:
+        """終了済みの古いジョブを削除する
+
+        Args:
+            max_age_hours: 削除対象の経過時間（時間）
+
+        Returns:
+            削除されたジョブ数
+        """
+        cutoff = datetime.now() - timedelta(hours=max_age_hours)
+        with self._lock:
+            old_jobs = [
+                job_id
+                for job_id, job in self._jobs.items()
+                if job.is_finished and job.updated_at < cutoff
+            ]
+            for job_id in old_jobs:
+                del self._jobs[job_id]
+
+        if old_jobs:
+            logger.info("古い要約ジョブを削除: %d件", len(old_jobs))
+        return len(old_jobs)
+
+    @staticmethod
+    def _touch(job: SummaryJob) -> None:
+        """ジョブの更新を記録する（ロック取得済みで呼び出すこと）"""
+        job.version += 1
+        job.updated_at = datetime.now()
+
+
+# グローバルインスタンス
+summary_job_manager = SummaryJobManager()
+
+
+_current_job: contextvars.ContextVar[Optional[Tuple[SummaryJobManager, str]]] = (
+    contextvars.ContextVar("summary_job", default=None)
+)
+
+
+@contextmanager
+def track_progress(job_mgr: SummaryJobManager, job_id: str) -> Iterator[None]:
+    """ブロック内の要約生成のチャンクの進捗をジョブに記録する
+
+    Args:
+        job_mgr: ジョブマネージャー
+        job_id: ジョブID
+    """
+    token = _current_job.set((job_mgr, job_id))
+    try:
+        yield
+    finally:
+        _current_job.reset(token)
+
+
+def report_chunks_total(total: int) -> None:
+    """要約するチャンク数を記録する"""
+    current = _current_job.get()
+    if current is not None:
+        job_mgr, job_id = current
+        job_mgr.update(job_id, chunks_total=total)
+
+
+def report_chunk_dispatched() -> None:
+    """チャンクのAI送信を記録する"""
+    current = _current_job.get()
+    if current is not None:
+        job_mgr, job_id = current
+        job_mgr.mark_chunk_dispatched(job_id)
+
+
+def report_chunk_done(index: int, text: Optional[str], error: Optional[str] = None) -> None:
+    """チャンクの処理結果を記録する（保存済みの結果を再利用した場合も含む）"""
+    current = _current_job.get()
+    if current is not None:
+        job_mgr, job_id = current
+        job_mgr.add_chunk_result(job_id, index, text, error)
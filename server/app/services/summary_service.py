@@ -4,23 +4,36 @@ LiteLLMを使用して複数のAIプロバイダーでテキスト要約を行
 """
 
 import logging
-import os
 import time
+from dataclasses import dataclass, field
 from typing import List, Optional
 
 import litellm
 from litellm import completion
+from litellm.exceptions import APIConnectionError as LiteLLMAPIConnectionError
+from litellm.exceptions import BadGatewayError as LiteLLMBadGatewayError
+from litellm.exceptions import InternalServerError as LiteLLMInternalServerError
 from litellm.exceptions import RateLimitError as LiteLLMRateLimitError
+from litellm.exceptions import ServiceUnavailableError as LiteLLMServiceUnavailableError
 
 from app.config import settings
 from app.exceptions import (
     AIClientError,
+    APIConnectionError,
     ConfigurationError,
+    ProviderUnavailableError,
     RateLimitError,
     SummaryGenerationError,
 )
-from app.services.prompts import PromptTemplates
+from app.metrics import LLM_REQUEST_DURATION, LLM_TOKENS, SUMMARY_CHUNKS
+from app.services.chunk_checkpoint import ChunkCheckpoint
+from app.services.llm_router import ModelRouter
+from app.services.prompts import BookContext, PromptTemplates, build_prompt
+from app.services.rate_limiter import estimate_tokens, rate_limiter
 from app.services.text_utils import TextSplitter
+from app.services.summary_jobs import report_chunk_dispatched, report_chunk_done, report_chunks_total
+from app.services.usage_service import TokenUsage, record_usage, usage_chunk
+from app.tracing import span
 
 # LiteLLMの設定
 litellm.drop_params = True
@@ -29,35 +42,43 @@ litellm.drop_params = True
 logger = logging.getLogger(__name__)
 
 
+# プロンプトキャッシュの区切り（cache_control）を指定するプロバイダー
+# （OpenAI・Geminiは先頭が一致する部分を自動でキャッシュするため指定不要）
+CACHE_CONTROL_PROVIDERS = ("anthropic",)
+
+
+@dataclass
+class AICompletion:
+    """AI API呼び出しの結果"""
+
+    text: str
+    usage: TokenUsage = field(default_factory=TokenUsage)
+    # レート制限の残量（上限に対する割合、レスポンスヘッダーから取得できない場合はNone）
+    rate_limit_remaining: Optional[float] = None
+
+
 class AIClient:
-    """AI APIクライアントを管理するクラス"""
+    """1つのAIモデルの呼び出しを行うクラス
+
+    APIキーとAPIのURLは呼び出しごとにLiteLLMへ渡す（環境変数は変更しないため、
+    複数のモデル・プロバイダーを同じプロセスで使用できる）。
+    リトライ・他のモデルへの切り替えはModelRouter（app/services/llm_router.py）で行う。
+    """
 
-    def __init__(self, model: str, api_key: str):
+    def __init__(self, model: str, api_key: Optional[str], api_base: Optional[str] = None):
         """初期化
 
         Args:
             model: 使用するAIモデル名
-            api_key: APIキー
+            api_key: APIキー（APIのURLを指定したローカルサーバー等では省略可）
+            api_base: APIのURL（省略時はプロバイダーの既定のURL）
         """
         # LiteLLM用のモデル名に変換
         self.model = settings.get_litellm_model_name(model)
+        self.provider = settings.get_provider_for_model(self.model)
         self.api_key = api_key
-        self._setup_environment()
-
-    def _setup_environment(self) -> None:
-        """LiteLLM用の環境変数を設定する"""
-        provider = settings.get_provider_for_model(self.model)
-
-        env_key_mapping = {
-            "openai": "OPENAI_API_KEY",
-            "anthropic": "ANTHROPIC_API_KEY",
-            "gemini": "GEMINI_API_KEY",
-            "cohere": "COHERE_API_KEY",
-        }
-
-        env_key = env_key_mapping.get(provider, "OPENAI_API_KEY")
-        os.environ[env_key] = self.api_key
-        logger.info(f"AIクライアント初期化: モデル={self.model}, プロバイダー={provider}")
+        self.api_base = api_base
+        logger.info(f"AIクライアント初期化: モデル={self.model}, プロバイダー={self.provider}")
 
     def call(
         self,
@@ -77,36 +98,132 @@ class AIClient:
 
         Raises:
             RateLimitError: レート制限に達した場合
-            AIClientError: API呼び出しに失敗した場合
+            ProviderUnavailableError: プロバイダーが5xxを返した場合
+            APIConnectionError: 接続エラー・タイムアウトの場合
+        """
+        return self.complete(prompt, system_prompt, temperature).text
+
+    def complete(
+        self,
+        prompt: str,
+        system_prompt: str = PromptTemplates.SYSTEM,
+        temperature: Optional[float] = None,
+    ) -> AICompletion:
+        """AIモデルを1回呼び出し、応答・トークン使用量・レート制限の残量を返す
+
+        プロンプトキャッシュを有効にしている場合、cache_controlに対応するプロバイダーでは
+        システムプロンプトの末尾をキャッシュの区切りにする。
+        呼び出しの前にモデルのレート制限の残量を予約し、レスポンスヘッダーで状態を更新する
+        （app/services/rate_limiter.py）。
+
+        Args:
+            prompt: ユーザープロンプト
+            system_prompt: システムプロンプト
+            temperature: 生成の温度パラメータ
+
+        Returns:
+            呼び出しの結果
+
+        Raises:
+            RateLimitError: レート制限に達した場合（回復を待てない場合を含む）
+            ProviderUnavailableError: プロバイダーが5xxを返した場合
+            APIConnectionError: 接続エラー・タイムアウトの場合
         """
         temp = temperature if temperature is not None else settings.AI_TEMPERATURE
+        options = {}
+        if self.api_key:
+            options["api_key"] = self.api_key
+        if self.api_base:
+            options["api_base"] = self.api_base
 
-        for attempt in range(settings.AI_MAX_RETRIES):
-            try:
+        # レート制限の残量を予約する（回復を待てない場合はRateLimitErrorで他のモデルに切り替える）
+        if settings.AI_RATE_LIMIT_ENABLED:
+            rate_limiter.acquire(self.model, estimate_tokens(system_prompt, prompt))
+
+        start = time.perf_counter()
+        try:
+            with span("llm.call", **{"llm.model": self.model}) as call_span:
                 response = completion(
                     model=self.model,
                     messages=[
-                        {"role": "system", "content": system_prompt},
+                        self._system_message(system_prompt),
                         {"role": "user", "content": prompt},
                     ],
                     temperature=temp,
+                    timeout=settings.AI_REQUEST_TIMEOUT,
+                    # SDK内部のリトライは行わない（ModelRouterが他のモデルに切り替える）
+                    max_retries=0,
+                    **options,
                 )
-                return response.choices[0].message.content
-
-            except LiteLLMRateLimitError as e:
-                if attempt < settings.AI_MAX_RETRIES - 1:
-                    delay = settings.AI_RETRY_DELAY * (2**attempt)
-                    logger.warning(
-                        f"レート制限エラー。{delay}秒後にリトライします "
-                        f"(試行 {attempt + 1}/{settings.AI_MAX_RETRIES})"
-                    )
-                    time.sleep(delay)
-                else:
-                    logger.error(f"レート制限エラー: リトライ上限に達しました")
-                    raise RateLimitError() from e
-            except (ConnectionError, TimeoutError) as e:
-                logger.error(f"接続エラー: {e}")
-                raise AIClientError(f"AI APIへの接続に失敗しました: {e}") from e
+                # 属性はスパンの終了前に設定する（終了後の設定はエクスポートされない）
+                usage = TokenUsage.from_response(response)
+                call_span.set_attribute("llm.prompt_tokens", usage.prompt_tokens)
+                call_span.set_attribute("llm.completion_tokens", usage.completion_tokens)
+                call_span.set_attribute("llm.cached_tokens", usage.cached_tokens)
+        except LiteLLMRateLimitError as e:
+            self._observe_latency(start, "rate_limited")
+            headers = getattr(e, "litellm_response_headers", None)
+            raise RateLimitError(rate_limiter.block(self.model, headers)) from e
+        except (LiteLLMAPIConnectionError, ConnectionError, TimeoutError) as e:
+            # LiteLLMのTimeoutはAPIConnectionErrorのサブクラス
+            self._observe_latency(start, "error")
+            logger.error(f"接続エラー: モデル={self.model}, {e}")
+            raise APIConnectionError(self.provider) from e
+        except (LiteLLMInternalServerError, LiteLLMServiceUnavailableError, LiteLLMBadGatewayError) as e:
+            self._observe_latency(start, "error")
+            raise ProviderUnavailableError(self.provider, getattr(e, "status_code", None)) from e
+        except Exception:
+            self._observe_latency(start, "error")
+            raise
+        self._observe_latency(start, "success")
+        self._record_usage(usage)
+        rate_limit = rate_limiter.observe(self.model, _response_headers(response))
+        return AICompletion(
+            text=response.choices[0].message.content,
+            usage=usage,
+            rate_limit_remaining=rate_limit.remaining_fraction(),
+        )
+
+    def _system_message(self, system_prompt: str) -> dict:
+        """システムメッセージ（対応するプロバイダーではキャッシュの区切りを付ける）"""
+        if settings.AI_PROMPT_CACHE and self.provider in CACHE_CONTROL_PROVIDERS:
+            return {
+                "role": "system",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": system_prompt,
+                        "cache_control": {"type": "ephemeral"},
+                    }
+                ],
+            }
+        return {"role": "system", "content": system_prompt}
+
+    def _observe_latency(self, start: float, outcome: str) -> None:
+        """API呼び出しの処理時間をメトリクスに記録する"""
+        LLM_REQUEST_DURATION.labels(self.model, outcome).observe(
+            time.perf_counter() - start
+        )
+
+    def _record_usage(self, usage: TokenUsage) -> None:
+        """トークン使用量をメトリクス・ログと要約の生成の記録（usage_service）に記録する"""
+        cost = record_usage(self.model, usage)
+        LLM_TOKENS.labels(self.model, "prompt").inc(usage.prompt_tokens)
+        LLM_TOKENS.labels(self.model, "completion").inc(usage.completion_tokens)
+        LLM_TOKENS.labels(self.model, "cached").inc(usage.cached_tokens)
+        LLM_TOKENS.labels(self.model, "cache_write").inc(usage.cache_write_tokens)
+        logger.info(
+            "AI API呼び出し完了: モデル=%s, 入力=%d（キャッシュ読込=%d, 書込=%d）, 出力=%d, 費用=%s",
+            self.model, usage.prompt_tokens, usage.cached_tokens,
+            usage.cache_write_tokens, usage.completion_tokens,
+            f"${cost:.6f}" if cost is not None else "不明",
+        )
+
+
+def _response_headers(response) -> dict:
+    """LiteLLMのレスポンスのヘッダー（x-ratelimit-*等）"""
+    hidden_params = getattr(response, "_hidden_params", None) or {}
+    return hidden_params.get("additional_headers") or {}
 
 
 class SummaryService:
@@ -119,17 +236,21 @@ class SummaryService:
         """初期化
 
         Args:
-            client: AIクライアント（省略時は設定から自動生成）
+            client: AIクライアント（省略時は設定のモデルからModelRouterを生成）
         """
         self.model = settings.AI_MODEL
-        self.api_key = settings.get_api_key_for_model(self.model)
 
         if client:
             self.client = client
             logger.info(f"SummaryService初期化完了: 外部クライアント使用")
-        elif self.api_key:
-            self.client = AIClient(self.model, self.api_key)
-            logger.info(f"SummaryService初期化完了: モデル={self.model}")
+            return
+
+        clients = _create_clients([self.model, *settings.AI_ROUTER_MODELS])
+        if clients:
+            self.client = ModelRouter(clients)
+            logger.info(
+                f"SummaryService初期化完了: モデル={[c.model for c in clients]}"
+            )
         else:
             self.client = None
             logger.warning(
@@ -142,6 +263,8 @@ class SummaryService:
         text: str,
         max_length: int = 1000000,
         custom_instructions: Optional[str] = None,
+        book: Optional[BookContext] = None,
+        checkpoint: Optional[ChunkCheckpoint] = None,
     ) -> str:
         """テキストを処理する
 
@@ -149,6 +272,9 @@ class SummaryService:
             text: 処理するテキスト
             max_length: チャンク分割の閾値
             custom_instructions: カスタム指示（省略時はデフォルトの要約指示）
+            book: プロンプトに含める書籍の情報
+            checkpoint: チャンクの結果の保存先（指定した場合、長いテキストは保存済みの
+                チャンクを再利用し、要約したチャンクを1件ずつ保存する）
 
         Returns:
             処理結果のテキスト
@@ -177,38 +303,84 @@ class SummaryService:
 
         try:
             if len(text) > max_length:
-                return self._process_long_text(text, max_length, instructions)
+                return self._process_long_text(text, max_length, instructions, book, checkpoint)
             else:
-                return self._process_short_text(text, instructions)
+                return self._process_short_text(text, instructions, book)
         except (RateLimitError, AIClientError) as e:
             logger.error(f"AI API処理エラー: {e}")
             raise SummaryGenerationError(str(e)) from e
 
-    def _process_short_text(self, text: str, instructions: str) -> str:
+    def _process_short_text(
+        self, text: str, instructions: str, book: Optional[BookContext] = None
+    ) -> str:
         """短いテキストを直接処理する
 
         Args:
             text: 処理するテキスト
             instructions: 処理指示
+            book: プロンプトに含める書籍の情報
 
         Returns:
             処理結果
         """
         logger.info("短いテキストを直接処理します")
-        prompt = PromptTemplates.DIRECT.format(instructions=instructions, text=text)
-        result = self.client.call(prompt)
+        report_chunks_total(1)
+        report_chunk_dispatched()
+        prompt = build_prompt(PromptTemplates.DIRECT, text, instructions, book)
+        result = self.client.call(prompt.user, system_prompt=prompt.system)
+        report_chunk_done(0, result)
         logger.info("処理完了")
         return result
 
+    def process_chunk(
+        self, chunk: str, instructions: str, book: Optional[BookContext] = None
+    ) -> str:
+        """1つのチャンクを処理する
+
+        パイプライン処理など、チャンク単位で呼び出す場合に使用する。
+        指示・書籍の情報はシステムメッセージに含め、同じ書籍のチャンク間で
+        プロンプトの先頭が一致するようにする（プロバイダーのプロンプトキャッシュの対象）。
+
+        Args:
+            chunk: 処理するテキストチャンク
+            instructions: 処理指示
+            book: プロンプトに含める書籍の情報
+
+        Returns:
+            処理結果
+
+        Raises:
+            ConfigurationError: クライアントが初期化されていない場合
+            RateLimitError: レート制限に達した場合
+            AIClientError: API呼び出しに失敗した場合
+        """
+        if not self.client:
+            raise ConfigurationError(
+                "処理エンジンが初期化されていません。APIキーを設定してください。"
+            )
+        prompt = build_prompt(PromptTemplates.CHUNK, chunk, instructions, book)
+        return self.client.call(prompt.user, system_prompt=prompt.system)
+
     def _process_long_text(
-        self, text: str, max_length: int, instructions: str
+        self,
+        text: str,
+        max_length: int,
+        instructions: str,
+        book: Optional[BookContext] = None,
+        checkpoint: Optional[ChunkCheckpoint] = None,
     ) -> str:
         """長いテキストを分割して処理する
 
+        チェックポイントを指定した場合は、保存済みのチャンク（前回の失敗・中断までに
+        要約したもの）を再利用し、要約したチャンクをその都度保存する。
+        すべてのチャンクの要約に成功した場合はチェックポイントを削除する。
+
         Args:
             text: 処理するテキスト
             max_length: チャンクの最大長
             instructions: 処理指示
+            book: プロンプトに含める書籍の情報
+            checkpoint: チャンクの結果の保存先
 
         Returns:
             処理結果（各チャンクの結果を結合）
@@ -221,29 +393,53 @@ class SummaryService:
         chunks = TextSplitter.split_by_paragraphs(text, max_length)
         results: List[str] = []
         errors: List[str] = []
+        saved = checkpoint.load() if checkpoint is not None else {}
+        resumed = 0
+        called = False
+        report_chunks_total(len(chunks))
 
         for i, chunk in enumerate(chunks):
+            source_hash = checkpoint.chunk_hash(chunk) if checkpoint is not None else None
+            if source_hash in saved:
+                results.append(saved[source_hash])
+                resumed += 1
+                report_chunk_done(i, saved[source_hash])
+                continue
+
+            # レート制限対策のためAI呼び出しの間は待機する
+            if called:
+                with span("summary.chunk_delay", **{"delay_seconds": settings.AI_CHUNK_DELAY}):
+                    time.sleep(settings.AI_CHUNK_DELAY)
+            called = True
+
             try:
                 logger.info(f"チャンク {i + 1}/{len(chunks)} を処理中...")
-                prompt = PromptTemplates.CHUNK.format(
-                    instructions=instructions, text=chunk
-                )
-                chunk_result = self.client.call(prompt)
+                report_chunk_dispatched()
+                with span("summary.chunk", **{"chunk.index": i, "chunk.length": len(chunk)}), usage_chunk(i):
+                    chunk_result = self.process_chunk(chunk, instructions, book)
+                if checkpoint is not None:
+                    checkpoint.save(i, source_hash, chunk_result)
+                    saved[source_hash] = chunk_result
                 results.append(chunk_result)
+                report_chunk_done(i, chunk_result)
                 logger.info(f"チャンク {i + 1} の処理完了")
 
-                # レート制限対策のため待機（最後のチャンク以外）
-                if i < len(chunks) - 1:
-                    time.sleep(settings.AI_CHUNK_DELAY)
-
             except RateLimitError:
                 error_msg = f"チャンク {i + 1}: レート制限エラー"
                 logger.error(error_msg)
                 errors.append(error_msg)
+                report_chunk_done(i, None, error_msg)
             except AIClientError as e:
                 error_msg = f"チャンク {i + 1}: {e.message}"
                 logger.error(error_msg)
                 errors.append(error_msg)
+                report_chunk_done(i, None, error_msg)
+
+        if checkpoint is not None:
+            SUMMARY_CHUNKS.labels("resumed").inc(resumed)
+            SUMMARY_CHUNKS.labels("summarized").inc(len(results) - resumed)
+            if resumed:
+                logger.info(f"チェックポイントから再開: 再利用したチャンク={resumed}/{len(chunks)}")
 
         if not results:
             raise SummaryGenerationError(
@@ -251,10 +447,26 @@ class SummaryService:
             )
 
         if errors:
+            # 成功したチャンクのチェックポイントは残し、再実行時に失敗したチャンクのみ要約する
             logger.warning(f"一部のチャンク処理に失敗: {errors}")
+        elif checkpoint is not None:
+            checkpoint.clear()
 
         return "\n\n".join(results)
 
 
+def _create_clients(models: List[str]) -> List[AIClient]:
+    """APIキーまたはAPIのURLが設定されているモデルのクライアントを作成する（重複は除く）"""
+    clients = []
+    for model in dict.fromkeys(models):
+        api_key = settings.get_api_key_for_model(model)
+        api_base = settings.AI_API_BASES.get(model)
+        if api_key or api_base:
+            clients.append(AIClient(model, api_key, api_base))
+        else:
+            logger.warning(f"APIキーが設定されていないため使用しません: モデル={model}")
+    return clients
+
+
 # シングルトンインスタンス
 summary_service = SummaryService()
@@ -0,0 +1,114 @@
+"""要約の元テキスト取得モジュール
+
+元テキストはページ（Image.ocr_text）から組み立てることができるため、
+Summary.original_textに保存しない設定（STORE_ORIGINAL_TEXT=false）では
+必要になった時点でページ範囲を指定して組み立てる。
+テキスト列は圧縮して保存されている（CompressedText）ため、必要な場合のみ読み込む。
+"""
+
+import uuid
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models import Image, Summary
+
+# ページテキストの区切り（要約生成時の結合と同じ）
+PAGE_SEPARATOR = "\n\n"
+
+
+@dataclass
+class PageRangeText:
+    """ページ範囲の元テキスト"""
+
+    text: str
+    start_page: Optional[int]
+    end_page: Optional[int]
+    page_count: int
+    total_pages: int
+    truncated: bool = False
+
+
+def assemble_original_text(
+    db: Session,
+    summary_id: uuid.UUID,
+    start_page: Optional[int] = None,
+    end_page: Optional[int] = None,
+    max_length: Optional[int] = None,
+) -> PageRangeText:
+    """ページのOCRテキストから元テキストを組み立てる
+
+    OCRテキストのないページは含めない。
+
+    Args:
+        db: データベースセッション
+        summary_id: 要約ID
+        start_page: 先頭のページ番号（省略時は最初から）
+        end_page: 末尾のページ番号（省略時は最後まで）
+        max_length: 最大文字数（超える場合は切り詰める）
+
+    Returns:
+        組み立てた元テキスト
+    """
+    query = db.query(Image.page_number, Image.ocr_text).filter(
+        Image.summary_id == summary_id,
+        Image.ocr_text.isnot(None),
+        Image.ocr_text != "",
+    )
+    total_pages = query.count()
+    if start_page is not None:
+        query = query.filter(Image.page_number >= start_page)
+    if end_page is not None:
+        query = query.filter(Image.page_number <= end_page)
+
+    texts: List[str] = []
+    page_numbers: List[int] = []
+    length = 0
+    truncated = False
+    for page_number, ocr_text in query.order_by(Image.page_number).yield_per(100):
+        if texts:
+            length += len(PAGE_SEPARATOR)
+        texts.append(ocr_text)
+        page_numbers.append(page_number)
+        length += len(ocr_text)
+        if max_length is not None and length > max_length:
+            truncated = True
+            break
+
+    text = PAGE_SEPARATOR.join(texts)
+    if max_length is not None:
+        text = text[:max_length]
+    return PageRangeText(
+        text=text,
+        start_page=page_numbers[0] if page_numbers else start_page,
+        end_page=page_numbers[-1] if page_numbers else end_page,
+        page_count=len(page_numbers),
+        total_pages=total_pages,
+        truncated=truncated,
+    )
+
+
+def load_text_column(
+    db: Session,
+    column,
+    summary_id: uuid.UUID,
+    max_length: Optional[int] = None,
+) -> Tuple[str, bool]:
+    """要約のテキスト列を読み込む
+
+    列は圧縮されているため、データベース側では切り詰めず、展開後に切り詰める。
+
+    Args:
+        db: データベースセッション
+        column: Summaryのテキスト列（Summary.original_textなど）
+        summary_id: 要約ID
+        max_length: 最大文字数
+
+    Returns:
+        (テキスト, 切り詰めたかどうか)
+    """
+    text = db.query(column).filter(Summary.id == summary_id).scalar() or ""
+    if max_length is None or len(text) <= max_length:
+        return text, False
+    return text[:max_length], True
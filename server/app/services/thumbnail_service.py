@@ -0,0 +1,209 @@
+"""サムネイル（縮小画像）モジュール
+
+ページ画像を指定の幅に縮小したWebP/JPEGを初回の要求時に作成し、
+UPLOAD_DIR/thumbnails/{キーの先頭2文字}/{キー}_{幅}.{拡張子} にキャッシュする。
+
+キーはコンテンツアドレス方式のファイルでは内容のSHA-256（同じ内容の画像でサムネイルを共有する）、
+以前の形式のファイルでは "i" + 画像ID とする。元のファイルは変更されないため、
+サムネイルも作成後は変更されない。
+"""
+
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+from PIL import Image as PILImage
+from PIL import ImageOps
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.exceptions import FileOperationError
+from app.metrics import THUMBNAIL_REQUESTS
+from app.models import FileBlob, Image
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_DIR_NAME = "thumbnails"
+
+# 作成方法を変えた場合に上げる（ETagに含め、古いキャッシュを使わないようにする）
+THUMBNAIL_VERSION = 1
+
+# 縦長の画像でも高さは幅のこの倍数までに収める
+MAX_ASPECT_RATIO = 3
+
+# 形式ごとの拡張子・Content-Type・保存オプション
+FORMATS = {
+    "webp": ("webp", "image/webp", {"method": 4}),
+    "jpeg": ("jpg", "image/jpeg", {"optimize": True, "progressive": True}),
+}
+
+# ガベージコレクションで1回のクエリに含めるキー数
+GC_BATCH_SIZE = 500
+
+
+@dataclass
+class Thumbnail:
+    """キャッシュ済みのサムネイル"""
+
+    path: str
+    media_type: str
+    etag: str
+
+
+class ThumbnailService:
+    """サムネイルの作成・キャッシュを行うサービス"""
+
+    def __init__(self):
+        self.thumbnail_dir = os.path.join(settings.UPLOAD_DIR, THUMBNAIL_DIR_NAME)
+
+    def snap_width(self, width: int) -> int:
+        """要求された幅を設定済みの幅（THUMBNAIL_WIDTHS）に切り上げる（キャッシュの種類を制限するため）"""
+        widths = sorted(settings.THUMBNAIL_WIDTHS)
+        for candidate in widths:
+            if width <= candidate:
+                return candidate
+        return widths[-1]
+
+    def get_thumbnail(self, image: Image, width: int, image_format: str) -> Thumbnail:
+        """サムネイルを取得する（キャッシュがない場合は作成する）
+
+        Args:
+            image: 画像
+            width: 幅（snap_widthで切り上げる）
+            image_format: webp / jpeg
+
+        Returns:
+            サムネイル
+
+        Raises:
+            FileOperationError: 元の画像を読み込めない場合
+        """
+        width = self.snap_width(width)
+        extension, media_type, _ = FORMATS[image_format]
+        key = self._cache_key(image)
+        path = os.path.join(self.thumbnail_dir, key[:2], f"{key}_{width}.{extension}")
+        etag = f'"{key}-{width}-v{THUMBNAIL_VERSION}.{extension}"'
+
+        if os.path.exists(path):
+            THUMBNAIL_REQUESTS.labels("hit").inc()
+        else:
+            self._create(image.file_path, path, width, image_format)
+            THUMBNAIL_REQUESTS.labels("created").inc()
+        return Thumbnail(path=path, media_type=media_type, etag=etag)
+
+    @staticmethod
+    def _cache_key(image: Image) -> str:
+        return image.content_hash or f"i{image.id.hex}"
+
+    def _create(self, source_path: str, path: str, width: int, image_format: str) -> None:
+        """サムネイルを作成する（一時ファイルに書き込んでから置き換える）"""
+        _, _, save_options = FORMATS[image_format]
+        try:
+            with PILImage.open(source_path) as source:
+                # JPEGはデコード時に縮小する
+                source.draft("RGB", (width, width * MAX_ASPECT_RATIO))
+                thumbnail = ImageOps.exif_transpose(source)
+                thumbnail.thumbnail((width, width * MAX_ASPECT_RATIO), PILImage.Resampling.LANCZOS)
+                if thumbnail.mode not in ("RGB", "L"):
+                    thumbnail = thumbnail.convert("RGB")
+
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                temp_path = f"{path}.{uuid.uuid4().hex}.part"
+                try:
+                    thumbnail.save(
+                        temp_path,
+                        format=image_format.upper(),
+                        quality=settings.THUMBNAIL_QUALITY,
+                        **save_options,
+                    )
+                    os.replace(temp_path, path)
+                except BaseException:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                    raise
+        except (OSError, ValueError) as e:
+            logger.warning("サムネイルを作成できません: %s: %s", source_path, e)
+            raise FileOperationError("サムネイルの作成", source_path, str(e)) from e
+
+    def collect_garbage(self, db: Session, grace_seconds: Optional[int] = None) -> Dict[str, int]:
+        """元の画像がなくなったサムネイルを削除する
+
+        コンテンツアドレス方式のキーはfile_blobsに登録がないもの、以前の形式のキーは
+        画像が削除されたものを、最終更新から猶予期間が経過していれば削除する。
+
+        Args:
+            db: データベースセッション
+            grace_seconds: 猶予期間（秒、省略時はFILE_GC_GRACE_SECONDS）
+
+        Returns:
+            削除したサムネイル数と合計サイズ（bytes）
+        """
+        grace_seconds = settings.FILE_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+        cutoff_timestamp = time.time() - grace_seconds
+        removed = {"thumbnail": 0, "bytes": 0}
+
+        for prefix in _list_dir(self.thumbnail_dir):
+            directory = os.path.join(self.thumbnail_dir, prefix)
+            paths_by_key: Dict[str, List[str]] = {}
+            for name in _list_dir(directory):
+                key = name.split("_", 1)[0]
+                paths_by_key.setdefault(key, []).append(os.path.join(directory, name))
+
+            keys = list(paths_by_key)
+            for i in range(0, len(keys), GC_BATCH_SIZE):
+                batch = keys[i:i + GC_BATCH_SIZE]
+                live = self._live_keys(db, batch)
+                for key in batch:
+                    for path in paths_by_key[key]:
+                        # 作成途中のまま残った一時ファイルは元の画像の有無に関わらず削除する
+                        if key in live and not path.endswith(".part"):
+                            continue
+                        try:
+                            stat = os.stat(path)
+                            if stat.st_mtime >= cutoff_timestamp:
+                                continue
+                            os.remove(path)
+                        except OSError:
+                            continue
+                        removed["thumbnail"] += 1
+                        removed["bytes"] += stat.st_size
+        return removed
+
+    @staticmethod
+    def _live_keys(db: Session, keys: List[str]) -> Set[str]:
+        """元の画像が残っているキー"""
+        hashes = [key for key in keys if not key.startswith("i")]
+        image_ids = {}
+        for key in keys:
+            if key.startswith("i"):
+                try:
+                    image_ids[uuid.UUID(hex=key[1:])] = key
+                except ValueError:
+                    continue
+
+        live: Set[str] = set()
+        if hashes:
+            live.update(
+                row.content_hash
+                for row in db.query(FileBlob.content_hash).filter(FileBlob.content_hash.in_(hashes))
+            )
+        if image_ids:
+            live.update(
+                image_ids[row.id]
+                for row in db.query(Image.id).filter(Image.id.in_(list(image_ids)))
+            )
+        return live
+
+
+def _list_dir(directory: str) -> List[str]:
+    try:
+        return os.listdir(directory)
+    except FileNotFoundError:
+        return []
+
+
+# シングルトンインスタンス
+thumbnail_service = ThumbnailService()
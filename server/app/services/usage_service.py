@@ -0,0 +1,381 @@
+"""トークン使用量・費用の集計モジュール
+
+AI API呼び出しごとのトークン数（入力・出力・キャッシュ読込・キャッシュ書込）と
+費用の見積もりを記録し、要約ごとにデータベース（summary_usage）に保存する。
+チャンクサイズの調整や、想定外にトークンを消費している要約・ジョブの特定に使用する。
+
+呼び出しの記録はcontextvarsで要約の生成1回に関連付ける::
+
+    with track_usage() as recorder:
+        summary_service.summarize_text(...)
+    usage_service.save(db, summary.id, run_id, recorder)
+
+チャンク単位の処理はusage_chunk(index)の中で呼び出し、記録にチャンク番号を付ける。
+ワーカースレッドで処理する場合はsubmit_with_context（app/tracing.py）で投入すれば
+記録先が引き継がれる。
+"""
+
+import contextvars
+import logging
+import threading
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+import litellm
+from sqlalchemy import case, func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.metrics import LLM_COST
+from app.models import Summary, SummaryUsage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TokenUsage:
+    """1回のAPI呼び出しのトークン使用量"""
+
+    prompt_tokens: int = 0  # 入力トークン数（キャッシュから読み込んだ分を含む）
+    completion_tokens: int = 0
+    cached_tokens: int = 0  # プロンプトキャッシュから読み込んだ入力トークン数
+    cache_write_tokens: int = 0  # プロンプトキャッシュに書き込んだ入力トークン数（Anthropic）
+
+    @classmethod
+    def from_response(cls, response) -> "TokenUsage":
+        """LiteLLMのレスポンスから作成する"""
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return cls()
+        details = getattr(usage, "prompt_tokens_details", None)
+        return cls(
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+            cached_tokens=getattr(details, "cached_tokens", 0) or 0,
+            cache_write_tokens=getattr(usage, "cache_creation_input_tokens", 0) or 0,
+        )
+
+
+@dataclass
+class UsageRecord:
+    """1回のAPI呼び出しの記録"""
+
+    model: str
+    usage: TokenUsage
+    cost: Optional[float]  # 費用の見積もり（USD、価格が不明なモデルはNone）
+    chunk_index: Optional[int] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+
+class UsageRecorder:
+    """要約の生成1回分のAPI呼び出しを記録するクラス
+
+    チャンクを処理するワーカースレッドから追加されるため、ロックで保護する。
+    """
+
+    def __init__(self):
+        self._records: List[UsageRecord] = []
+        self._lock = threading.Lock()
+
+    def add(self, record: UsageRecord) -> None:
+        with self._lock:
+            self._records.append(record)
+
+    @property
+    def records(self) -> List[UsageRecord]:
+        with self._lock:
+            return list(self._records)
+
+    def totals(self) -> Dict[str, Any]:
+        """合計（UsageTotalsと同じ項目）"""
+        return _totals(self.records)
+
+
+_current_recorder: contextvars.ContextVar[Optional[UsageRecorder]] = contextvars.ContextVar(
+    "usage_recorder", default=None
+)
+_current_chunk: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar(
+    "usage_chunk", default=None
+)
+
+# 価格が不明なことを記録済みのモデル（ログを1回にする）
+_unpriced_models: Set[str] = set()
+
+
+@contextmanager
+def track_usage(recorder: Optional[UsageRecorder] = None) -> Iterator[UsageRecorder]:
+    """ブロック内のAPI呼び出しを記録する
+
+    Args:
+        recorder: 記録先（省略時は新しく作成する）
+
+    Yields:
+        記録先
+    """
+    recorder = recorder or UsageRecorder()
+    token = _current_recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current_recorder.reset(token)
+
+
+@contextmanager
+def usage_chunk(index: int) -> Iterator[None]:
+    """ブロック内のAPI呼び出しの記録にチャンク番号を付ける"""
+    token = _current_chunk.set(index)
+    try:
+        yield
+    finally:
+        _current_chunk.reset(token)
+
+
+def record_usage(model: str, usage: TokenUsage) -> Optional[float]:
+    """API呼び出しのトークン使用量を記録する
+
+    track_usageの外で呼び出された場合は費用のメトリクスのみ記録する。
+
+    Args:
+        model: 呼び出したモデル名
+        usage: トークン使用量
+
+    Returns:
+        費用の見積もり（USD、価格が不明なモデルはNone）
+    """
+    cost = estimate_cost(model, usage)
+    if cost is not None:
+        LLM_COST.labels(model).inc(cost)
+    recorder = _current_recorder.get()
+    if recorder is not None:
+        recorder.add(UsageRecord(model, usage, cost, _current_chunk.get()))
+    return cost
+
+
+def estimate_cost(model: str, usage: TokenUsage) -> Optional[float]:
+    """トークン使用量から費用（USD）を見積もる
+
+    AI_MODEL_PRICESに単価が設定されたモデルはその単価、それ以外はLiteLLMの価格表を使用する。
+
+    Args:
+        model: モデル名（LiteLLM形式）
+        usage: トークン使用量
+
+    Returns:
+        費用の見積もり（価格が不明なモデルはNone）
+    """
+    prices = settings.AI_MODEL_PRICES.get(model)
+    if prices is not None:
+        input_price = prices.get("input", 0.0)
+        cached = min(usage.cached_tokens, usage.prompt_tokens)
+        return (
+            (usage.prompt_tokens - cached) * input_price
+            + cached * prices.get("cached_input", input_price)
+            + usage.completion_tokens * prices.get("output", 0.0)
+        ) / 1_000_000
+
+    try:
+        prompt_cost, completion_cost = litellm.cost_per_token(
+            model=model,
+            prompt_tokens=usage.prompt_tokens,
+            completion_tokens=usage.completion_tokens,
+            cache_read_input_tokens=usage.cached_tokens,
+            cache_creation_input_tokens=usage.cache_write_tokens,
+        )
+    except Exception as e:
+        if model not in _unpriced_models:
+            _unpriced_models.add(model)
+            logger.warning(
+                "モデルの価格が不明なため費用を記録しません（AI_MODEL_PRICESで指定できます）: "
+                "モデル=%s, %s", model, e,
+            )
+        return None
+    return prompt_cost + completion_cost
+
+
+def _totals(records: List[UsageRecord]) -> Dict[str, Any]:
+    return {
+        "calls": len(records),
+        "prompt_tokens": sum(r.usage.prompt_tokens for r in records),
+        "completion_tokens": sum(r.usage.completion_tokens for r in records),
+        "cached_tokens": sum(r.usage.cached_tokens for r in records),
+        "cache_write_tokens": sum(r.usage.cache_write_tokens for r in records),
+        "cost": sum(r.cost for r in records if r.cost is not None),
+        "unpriced_calls": sum(1 for r in records if r.cost is None),
+    }
+
+
+# 集計に使用する列
+_AGGREGATES = (
+    func.count(SummaryUsage.id).label("calls"),
+    func.coalesce(func.sum(SummaryUsage.prompt_tokens), 0).label("prompt_tokens"),
+    func.coalesce(func.sum(SummaryUsage.completion_tokens), 0).label("completion_tokens"),
+    func.coalesce(func.sum(SummaryUsage.cached_tokens), 0).label("cached_tokens"),
+    func.coalesce(func.sum(SummaryUsage.cache_write_tokens), 0).label("cache_write_tokens"),
+    func.coalesce(func.sum(SummaryUsage.cost), 0.0).label("cost"),
+    func.coalesce(func.sum(case((SummaryUsage.cost.is_(None), 1), else_=0)), 0).label("unpriced_calls"),
+)
+
+_TOTAL_KEYS = tuple(column.name for column in _AGGREGATES)
+
+
+def _row_totals(row: Any) -> Dict[str, Any]:
+    return {key: getattr(row, key) for key in _TOTAL_KEYS}
+
+
+class UsageService:
+    """トークン使用量の保存・集計を行うサービス"""
+
+    def save(
+        self,
+        db: Session,
+        summary_id: uuid.UUID,
+        run_id: str,
+        recorder: UsageRecorder,
+        commit: bool = False,
+    ) -> None:
+        """記録したAPI呼び出しをセッションに追加する
+
+        要約の更新とあわせてコミットする場合はcommit=False（コミットは呼び出し元が行う）。
+        生成に失敗した場合もトークンは消費しているため、commit=Trueで単独で保存する。
+
+        Args:
+            db: データベースセッション
+            summary_id: 要約ID
+            run_id: 生成ID（パイプラインジョブの場合はジョブID）
+            recorder: 記録
+            commit: コミットまで行うか（失敗した場合はログに記録してロールバックする）
+        """
+        records = recorder.records
+        if not records:
+            return
+        db.add_all(
+            SummaryUsage(
+                summary_id=summary_id,
+                run_id=run_id,
+                chunk_index=record.chunk_index,
+                model=record.model,
+                prompt_tokens=record.usage.prompt_tokens,
+                completion_tokens=record.usage.completion_tokens,
+                cached_tokens=record.usage.cached_tokens,
+                cache_write_tokens=record.usage.cache_write_tokens,
+                cost=record.cost,
+                created_at=record.created_at,
+            )
+            for record in records
+        )
+        if not commit:
+            return
+        try:
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error("トークン使用量の保存に失敗しました: summary_id=%s, error=%s", summary_id, e)
+
+    def summary_report(self, db: Session, summary_id: uuid.UUID, runs_limit: int = 10) -> Dict[str, Any]:
+        """要約のトークン使用量を合計・モデル・生成・チャンクごとに集計する
+
+        Args:
+            db: データベースセッション
+            summary_id: 要約ID
+            runs_limit: 返す生成の数（新しい順）
+
+        Returns:
+            SummaryUsageReportと同じ項目の辞書
+        """
+        base = db.query(*_AGGREGATES).filter(SummaryUsage.summary_id == summary_id)
+        total = _row_totals(base.one())
+        models = [
+            {"model": row.model, **_row_totals(row)}
+            for row in base.add_columns(SummaryUsage.model)
+            .group_by(SummaryUsage.model)
+            .order_by(SummaryUsage.model)
+        ]
+
+        started_at = func.min(SummaryUsage.created_at).label("started_at")
+        run_rows = (
+            base.add_columns(SummaryUsage.run_id, started_at)
+            .group_by(SummaryUsage.run_id)
+            .order_by(started_at.desc())
+            .limit(runs_limit)
+            .all()
+        )
+        chunks: Dict[str, List[Dict[str, Any]]] = {row.run_id: [] for row in run_rows}
+        if chunks:
+            for row in (
+                base.add_columns(SummaryUsage.run_id, SummaryUsage.chunk_index)
+                .filter(SummaryUsage.run_id.in_(list(chunks)))
+                .group_by(SummaryUsage.run_id, SummaryUsage.chunk_index)
+                .order_by(SummaryUsage.chunk_index)
+            ):
+                chunks[row.run_id].append({"chunk_index": row.chunk_index, **_row_totals(row)})
+        runs = [
+            {
+                "run_id": row.run_id,
+                "started_at": row.started_at,
+                "chunks": chunks[row.run_id],
+                **_row_totals(row),
+            }
+            for row in run_rows
+        ]
+        return {"summary_id": summary_id, "total": total, "models": models, "runs": runs}
+
+    def report(
+        self,
+        db: Session,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 20,
+    ) -> Dict[str, Any]:
+        """期間内のトークン使用量を合計・モデル・要約ごとに集計する
+
+        Args:
+            db: データベースセッション
+            since: 期間の開始（UTC、省略時は制限なし）
+            until: 期間の終了（UTC、省略時は制限なし）
+            limit: 返す要約の数（トークン数の多い順）
+
+        Returns:
+            UsageReportと同じ項目の辞書
+        """
+        base = db.query(*_AGGREGATES)
+        if since is not None:
+            base = base.filter(SummaryUsage.created_at >= since)
+        if until is not None:
+            base = base.filter(SummaryUsage.created_at < until)
+
+        total = _row_totals(base.one())
+        models = [
+            {"model": row.model, **_row_totals(row)}
+            for row in base.add_columns(SummaryUsage.model)
+            .group_by(SummaryUsage.model)
+            .order_by(SummaryUsage.model)
+        ]
+        tokens = func.sum(SummaryUsage.prompt_tokens + SummaryUsage.completion_tokens)
+        summaries = [
+            {"summary_id": row.id, "title": row.title, **_row_totals(row)}
+            for row in base.add_columns(Summary.id, Summary.title)
+            .join(Summary, Summary.id == SummaryUsage.summary_id)
+            .group_by(Summary.id, Summary.title)
+            .order_by(tokens.desc())
+            .limit(limit)
+        ]
+        return {
+            "since": since,
+            "until": until,
+            "total": total,
+            "models": models,
+            "summaries": summaries,
+        }
+
+
+def new_run_id() -> str:
+    """生成IDを作成する"""
+    return str(uuid.uuid4())
+
+
+# シングルトンインスタンス
+usage_service = UsageService()
@@ -0,0 +1,98 @@
+"""アップロードファイルの配信モジュール
+
+/uploads で配信するファイルと、サムネイルAPIのレスポンスにキャッシュ用のヘッダーを付ける。
+
+    - ETag: コンテンツアドレス方式のファイルは内容のSHA-256（強いETag）
+    - Cache-Control: ファイル名は内容（またはUUID）で決まり変更されないため、immutableとする
+    - If-None-Match / If-Modified-Since に一致する場合は304を返す
+    - Range / If-Range による部分取得（StarletteのFileResponse）
+"""
+
+import os
+import re
+from email.utils import parsedate
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.services.file_service import BLOB_DIR_NAME, TEMP_DIR_NAME
+
+# 変更されないファイルのキャッシュ期間（1年）
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_BLOB_NAME_PATTERN = re.compile(r"^([0-9a-f]{64})(\.[a-z0-9]+)?$")
+
+
+def is_not_modified(response_headers: Headers, request_headers: Headers) -> bool:
+    """条件付きリクエストに対して304を返せるかどうか（StaticFiles.is_not_modifiedと同じ判定）"""
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match:
+        etags = [tag.strip(" W/") for tag in if_none_match.split(",")]
+        return "*" in etags or response_headers["etag"] in etags
+
+    if_modified_since = parsedate(request_headers.get("if-modified-since", ""))
+    last_modified = parsedate(response_headers.get("last-modified", ""))
+    return bool(if_modified_since and last_modified and if_modified_since >= last_modified)
+
+
+def cached_file_response(
+    request: Request,
+    path: str,
+    etag: str,
+    media_type: Optional[str] = None,
+    cache_control: str = IMMUTABLE_CACHE_CONTROL,
+    vary: Optional[str] = None,
+) -> Response:
+    """キャッシュ用のヘッダーを付けてファイルを返す（条件付きリクエストでは304を返す）
+
+    Args:
+        request: リクエスト
+        path: ファイルのパス
+        etag: ETag（引用符を含む）
+        media_type: Content-Type（省略時は拡張子から判定）
+        cache_control: Cache-Control
+        vary: Vary（Acceptで形式を選ぶ場合など）
+
+    Returns:
+        ファイル（Range指定時は部分）のレスポンス、または304
+    """
+    headers = {"etag": etag, "cache-control": cache_control}
+    if vary:
+        headers["vary"] = vary
+    response = FileResponse(path, headers=headers, media_type=media_type, stat_result=os.stat(path))
+    if is_not_modified(response.headers, request.headers):
+        return NotModifiedResponse(response.headers)
+    return response
+
+
+class UploadStaticFiles(StaticFiles):
+    """UPLOAD_DIRの配信（書き込み途中の一時ファイルは配信しない）"""
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if path.split(os.sep, 1)[0] == TEMP_DIR_NAME:
+            raise HTTPException(status_code=404)
+        return await super().get_response(path, scope)
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        headers = {"cache-control": IMMUTABLE_CACHE_CONTROL}
+        name = os.path.basename(full_path)
+        match = _BLOB_NAME_PATTERN.match(name)
+        if match and os.path.basename(os.path.dirname(os.path.dirname(full_path))) == BLOB_DIR_NAME:
+            # 内容のハッシュをETagにする（重複排除で更新日時が変わっても同じ値になる）
+            headers["etag"] = f'"{match.group(1)}"'
+
+        response = FileResponse(full_path, status_code=status_code, headers=headers, stat_result=stat_result)
+        if is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,196 @@
+"""トレーシングモジュール
+
+OpenTelemetry互換のスパンでアップロード・OCR・要約・DBコミットを計測する。
+OpenTelemetryがインストールされていない場合やエクスポーターが無効な場合は
+すべてのスパン操作が何もしない実装になる。
+
+エクスポーター（TRACING_EXPORTER）:
+    none: トレースを出力しない
+    otlp: OTLP/HTTPでコレクターに送信する
+    json: JSON Lines形式でファイルに出力する（オフラインでの確認・テスト用）
+"""
+
+import contextvars
+import json
+import logging
+import os
+import threading
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+from sqlalchemy import event
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import (
+        BatchSpanProcessor,
+        SpanExporter,
+        SpanExportResult,
+    )
+    from opentelemetry.trace import Status, StatusCode
+    HAS_OPENTELEMETRY = True
+except ImportError:
+    HAS_OPENTELEMETRY = False
+
+
+class _NoopSpan:
+    """トレーシング無効時に使用する何もしないスパン"""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def update_name(self, name: str) -> None:
+        pass
+
+    def record_exception(self, exception: BaseException) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+_provider = None
+_tracer = None
+
+
+if HAS_OPENTELEMETRY:
+
+    class JSONFileSpanExporter(SpanExporter):
+        """スパンをJSON Lines形式でファイルに出力するエクスポーター"""
+
+        def __init__(self, path: str):
+            self._path = path
+            self._lock = threading.Lock()
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        def export(self, spans) -> "SpanExportResult":
+            lines = [json.dumps(json.loads(s.to_json()), ensure_ascii=False) for s in spans]
+            try:
+                with self._lock, open(self._path, "a", encoding="utf-8") as f:
+                    for line in lines:
+                        f.write(line + "\n")
+            except OSError as e:
+                logger.error("トレースの書き込みに失敗しました: %s", e)
+                return SpanExportResult.FAILURE
+            return SpanExportResult.SUCCESS
+
+        def shutdown(self) -> None:
+            pass
+
+
+def setup_tracing() -> None:
+    """設定に基づいてトレーシングを初期化する"""
+    global _provider, _tracer
+
+    exporter_name = settings.TRACING_EXPORTER.lower()
+    if exporter_name == "none":
+        return
+    if not HAS_OPENTELEMETRY:
+        logger.warning(
+            "TRACING_EXPORTER=%s が指定されていますが、OpenTelemetryがインストールされていません",
+            exporter_name,
+        )
+        return
+
+    if exporter_name == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        exporter = OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT)
+    elif exporter_name == "json":
+        exporter = JSONFileSpanExporter(settings.TRACING_JSON_PATH)
+    else:
+        logger.warning("不明なTRACING_EXPORTER: %s（トレーシングは無効）", exporter_name)
+        return
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.APP_NAME})
+    )
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    # グローバルのプロバイダーは1回しか設定できないため、スパンはこのプロバイダーから作成する
+    trace.set_tracer_provider(provider)
+    _provider = provider
+    _tracer = provider.get_tracer("app")
+    logger.info("トレーシング初期化: exporter=%s", exporter_name)
+
+
+def shutdown_tracing() -> None:
+    """未送信のスパンを出力してトレーシングを終了する（以降のスパン操作は何もしない）"""
+    global _provider, _tracer
+
+    if _provider is not None:
+        _provider.shutdown()
+    _provider = None
+    _tracer = None
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """現在のコンテキストの子スパンを開始する
+
+    スパン内で例外が発生した場合は例外を記録し、ステータスをエラーにする。
+
+    Args:
+        name: スパン名
+        **attributes: スパンに付与する属性（Noneの値は無視）
+
+    Yields:
+        スパン（トレーシング無効時は何もしないスパン）
+    """
+    if _tracer is None:
+        yield _NOOP_SPAN
+        return
+    attrs = {k: v for k, v in attributes.items() if v is not None}
+    with _tracer.start_as_current_span(name, attributes=attrs) as current:
+        yield current
+
+
+def submit_with_context(executor: Executor, fn: Callable, *args: Any, **kwargs: Any) -> Future:
+    """現在のコンテキスト（トレースを含む）を引き継いでエグゼキューターに投入する
+
+    ThreadPoolExecutorはcontextvarsを引き継がないため、バックグラウンド処理の
+    スパンを呼び出し元のスパンにつなげるにはこの関数を使用する。
+
+    Args:
+        executor: 投入先のエグゼキューター
+        fn: 実行する関数
+        *args: 関数の位置引数
+        **kwargs: 関数のキーワード引数
+
+    Returns:
+        投入したタスクのFuture
+    """
+    context = contextvars.copy_context()
+    return executor.submit(context.run, fn, *args, **kwargs)
+
+
+def instrument_session_commits(session_class) -> None:
+    """セッションのコミットをスパンとして記録する
+
+    Args:
+        session_class: イベントを登録するSessionクラスまたはsessionmaker
+    """
+
+    @event.listens_for(session_class, "before_commit")
+    def _before_commit(session):
+        if _tracer is not None:
+            session.info["_commit_span"] = _tracer.start_span("db.commit")
+
+    @event.listens_for(session_class, "after_commit")
+    def _after_commit(session):
+        commit_span = session.info.pop("_commit_span", None)
+        if commit_span is not None:
+            commit_span.end()
+
+    @event.listens_for(session_class, "after_rollback")
+    def _after_rollback(session):
+        commit_span = session.info.pop("_commit_span", None)
+        if commit_span is not None:
+            commit_span.set_status(Status(StatusCode.ERROR, "rollback"))
+            commit_span.end()
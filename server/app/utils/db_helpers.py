@@ -3,7 +3,7 @@
 共通のデータベース操作を提供する。
 """
 
-from typing import Type, TypeVar, Optional
+from typing import Sequence, Type, TypeVar, Optional
 from uuid import UUID
 
 from fastapi import HTTPException, status
@@ -20,6 +20,7 @@ def get_or_404(
     model: Type[T],
     resource_id: UUID,
     resource_name: str = "リソース",
+    options: Sequence = (),
 ) -> T:
     """リソースを取得し、存在しない場合は404エラーを発生させる
 
@@ -28,6 +29,7 @@ def get_or_404(
         model: SQLAlchemyモデルクラス
         resource_id: リソースのID
         resource_name: エラーメッセージに表示するリソース名
+        options: クエリのローダーオプション（deferなど）
 
     Returns:
         取得したリソース
@@ -35,7 +37,7 @@ def get_or_404(
     Raises:
         HTTPException: リソースが存在しない場合（404）
     """
-    resource = db.query(model).filter(model.id == resource_id).first()
+    resource = db.query(model).options(*options).filter(model.id == resource_id).first()
     if not resource:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
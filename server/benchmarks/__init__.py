@@ -0,0 +1,4 @@
+"""ベンチマークスクリプト
+
+serverディレクトリから ``python -m benchmarks.<モジュール名>`` で実行する。
+"""
@@ -0,0 +1,169 @@
+"""ロギング設定のリクエストスループット比較
+
+従来の設定（ルートDEBUG + 同期FileHandler/StreamHandler + f-stringのリクエストログ）と
+キュー経由の非同期ロギングで、同じエンドポイントのスループットを比較する。
+どちらの設定でも標準出力は/dev/nullに向け、ログファイルは一時ディレクトリに出力する。
+
+計測用のエンドポイントは、OCRのページ単位の結果ログと同じ形式のDEBUGログを
+--debug-lines 件出力する。同じコードでも、従来設定ではルートがDEBUG固定のため
+すべて書き出され、新設定ではLOG_LEVELで判定されて文字列の組み立て前に破棄される。
+実行順による偏りを避けるため、両設定を交互に --rounds 回計測して最良値を比較する。
+
+実行方法:
+    cd server
+    python -m benchmarks.bench_logging --requests 3000 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+# ベンチマーク対象の "/" はDBを使わないが、起動時のテーブル作成のためにDBが必要
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.config import settings
+from app.logging_config import TEXT_FORMAT, setup_logging, stop_logging
+
+
+def configure_legacy(log_dir: str) -> None:
+    """従来のロギング設定（app/__init__.pyの旧実装と同等）を再現する"""
+    stop_logging()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    logging.basicConfig(
+        level=logging.DEBUG,
+        format=TEXT_FORMAT,
+        handlers=[
+            logging.StreamHandler(sys.stdout),
+            logging.FileHandler(os.path.join(log_dir, "app.log")),
+        ],
+        force=True,
+    )
+
+
+def configure_queued(log_dir: str) -> None:
+    """キュー経由の非同期ロギングを設定する"""
+    setup_logging(settings.model_copy(update={"LOG_DIR": log_dir, "DEBUG": False}))
+
+
+def legacy_request_logging_app(app):
+    """旧実装と同じくリクエストごとにf-stringで2回INFOログを出すミドルウェアを被せる
+
+    アプリ本体のリクエストログ（loggerは"main"）は重複しないよう無効化する。
+    """
+    logging.getLogger("main").setLevel(logging.WARNING)
+    logger = logging.getLogger("main.legacy")
+
+    async def wrapped(scope, receive, send):
+        if scope["type"] != "http":
+            return await app(scope, receive, send)
+        start = time.time()
+        logger.info(f"リクエスト開始: {scope['method']} {scope['path']}")
+        status = {}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        await app(scope, receive, send_wrapper)
+        logger.info(
+            f"リクエスト完了: {scope['method']} {scope['path']} - "
+            f"ステータス: {status.get('code')} - 処理時間: {time.time() - start:.4f}秒"
+        )
+
+    return wrapped
+
+
+async def drive(app, path: str, requests: int, concurrency: int) -> float:
+    """指定数のリクエストを並列に送信し、スループット（req/s）を返す"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # ウォームアップ
+        for _ in range(20):
+            await client.get(path)
+
+        remaining = requests
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                await client.get(path)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return requests / (time.perf_counter() - start)
+
+
+def add_bench_route(app, debug_lines: int) -> str:
+    """ページ単位のDEBUGログを出力する計測用エンドポイントを追加する"""
+    ocr_logger = logging.getLogger("app.services.ocr_service")
+
+    @app.get("/_bench/logging")
+    def bench_logging():
+        for page in range(debug_lines):
+            ocr_logger.debug("OCR結果: image_id=%s, text_length=%d", page, 1200)
+        return {"pages": debug_lines}
+
+    return "/_bench/logging"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ロギング設定のスループット比較")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--debug-lines", type=int, default=10, help="1リクエストあたりのDEBUGログ数")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    # 標準出力のコストは両設定で同じ条件にするため/dev/nullへ向ける
+    real_stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    legacy_results, queued_results = [], []
+    try:
+        import main as app_main
+
+        path = add_bench_route(app_main.app, args.debug_lines)
+        for _ in range(args.rounds):
+            # 新実装: ミドルウェアは%形式の遅延フォーマット + キュー出力
+            with tempfile.TemporaryDirectory() as log_dir:
+                logging.getLogger("main").setLevel(logging.NOTSET)
+                configure_queued(log_dir)
+                queued_results.append(
+                    asyncio.run(drive(app_main.app, path, args.requests, args.concurrency))
+                )
+                stop_logging()
+
+            # 旧実装: 同期ファイル出力 + f-stringのリクエストログ
+            with tempfile.TemporaryDirectory() as log_dir:
+                configure_legacy(log_dir)
+                legacy_app = legacy_request_logging_app(app_main.app)
+                legacy_results.append(
+                    asyncio.run(drive(legacy_app, path, args.requests, args.concurrency))
+                )
+                for handler in list(logging.getLogger().handlers):
+                    handler.close()
+    finally:
+        sys.stdout.close()
+        sys.stdout = real_stdout
+
+    legacy, queued = max(legacy_results), max(queued_results)
+    print(f"DEBUGログ {args.debug_lines}件/リクエスト, 並列数 {args.concurrency}")
+    print(f"{'設定':<28} {'req/s':>10}")
+    print(f"{'legacy (sync DEBUG file)':<28} {legacy:>10.1f}")
+    print(f"{'queued (async, LOG_LEVEL)':<28} {queued:>10.1f}")
+    print(f"\n改善率: {queued / legacy:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
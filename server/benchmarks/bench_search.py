@@ -0,0 +1,128 @@
+"""全文検索のレイテンシ計測
+
+合成した要約（タイトル・説明・要約テキスト・OCRテキスト）をSQLiteに登録し、
+SearchService.searchの処理時間（要約の読み込みとスニペット作成を含む）を検索語ごとに計測する。
+
+OCRテキストはインデックスにのみ登録し、imagesテーブルには保存しない。
+そのため、OCRテキストにのみ一致した結果のスニペット（ページの読み込み）は計測に含まれない。
+
+実行方法:
+    cd server
+    python -m benchmarks.bench_search --documents 100000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from typing import Dict, List
+
+# 検索語（頻出語・長い語・複数語・語句・1文字・英字・一致なし）
+QUERIES = [
+    "経営", "戦略", "イノベーション", "マーケティング", "品質 改善", "顧客 価値",
+    "経営 イノベーション 習慣", "組織の", "品質管理責任", "愛", "データ", "zzz", "存在しない語句",
+]
+
+
+def build_documents(count: int, ocr_length: int, seed: int) -> List[Dict[str, str]]:
+    """合成した要約のデータを作成する"""
+    from benchmarks.bench_text_compression import _NOUNS, generate_page
+
+    rng = random.Random(seed)
+    documents = []
+    for _ in range(count):
+        documents.append({
+            "title": "".join(rng.sample(_NOUNS, 2)) + "の本",
+            "description": generate_page(rng, 60, line_width=1000),
+            "summarized_text": generate_page(rng, 400, line_width=1000),
+            "ocr_text": generate_page(rng, ocr_length),
+        })
+    return documents
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="全文検索のレイテンシ計測")
+    parser.add_argument("--documents", type=int, default=100000, help="要約数")
+    parser.add_argument("--ocr-length", type=int, default=1000, help="要約あたりのOCRテキストの文字数")
+    parser.add_argument("--repeat", type=int, default=20, help="検索語ごとの計測回数")
+    parser.add_argument("--limit", type=int, default=10, help="1回に取得する件数")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(work_dir, 'search.db')}"
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+        # appはDATABASE_URLを設定してから読み込む
+        from app.database import Base, SessionLocal, engine
+        from app.models import Summary
+        from app.services.search_service import SearchService, _SQLiteBackend, index_text
+
+        Base.metadata.create_all(bind=engine)
+        # 書き込み時の更新は使わず、索引付けの時間を別に計測する
+        service = SearchService(engine, SessionLocal)
+        service.create_schema()
+
+        documents = build_documents(args.documents, args.ocr_length, args.seed)
+        print(f"要約 {args.documents}件（OCRテキスト {args.ocr_length}文字/件）を登録しています...")
+
+        start = time.perf_counter()
+        with SessionLocal() as db:
+            for i in range(0, len(documents), 1000):
+                for doc in documents[i:i + 1000]:
+                    db.add(Summary(
+                        id=uuid.uuid4(),
+                        title=doc["title"],
+                        description=doc["description"],
+                        original_text="",
+                        summarized_text=doc["summarized_text"],
+                    ))
+                db.commit()
+        insert_seconds = time.perf_counter() - start
+
+        backend = _SQLiteBackend()
+        start = time.perf_counter()
+        with SessionLocal() as db:
+            summary_ids = [str(row.id) for row in db.query(Summary.id)]
+            conn = db.connection()
+            for summary_id, doc in zip(summary_ids, documents):
+                backend.upsert(conn, summary_id, {name: index_text(value) for name, value in doc.items()})
+            db.commit()
+        index_seconds = time.perf_counter() - start
+        db_size = os.path.getsize(os.path.join(work_dir, "search.db"))
+
+        print(
+            f"要約の保存 {insert_seconds:.1f}秒, 索引付け {index_seconds:.1f}秒 "
+            f"({args.documents / index_seconds:.0f}件/秒), DBサイズ {db_size / 1e6:.0f}MB\n"
+        )
+        print(f"{'検索語':<16} {'件数':>7} {'p50(スニペットなし)':>18} {'p50':>8} {'p95':>8}")
+
+        worst_p95 = 0.0
+        with SessionLocal() as db:
+            for query in QUERIES:
+                timings: Dict[bool, List[float]] = {False: [], True: []}
+                total = ""
+                for with_snippets in (False, True):
+                    for _ in range(args.repeat):
+                        db.expunge_all()
+                        start = time.perf_counter()
+                        result = service.search(db, query, limit=args.limit, with_snippets=with_snippets)
+                        timings[with_snippets].append(time.perf_counter() - start)
+                        total = f"{result.total}{'+' if result.total_capped else ''}"
+                p95 = statistics.quantiles(timings[True], n=20)[-1] * 1000
+                worst_p95 = max(worst_p95, p95)
+                print(
+                    f"{query:<16} {total:>7} {statistics.median(timings[False]) * 1000:>16.1f}ms "
+                    f"{statistics.median(timings[True]) * 1000:>6.1f}ms {p95:>6.1f}ms"
+                )
+        print(f"\n最大p95: {worst_p95:.1f}ms")
+        engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""大きな要約レスポンスのJSON直列化の比較
+
+数MBの日本語テキストを含むSummaryDetailを返すエンドポイントを、標準のJSONResponse
+（json.dumps）とFastJSONResponse（app/responses.py、orjson）で比較する。
+FastAPIのレスポンスモデルの検証・変換を含むリクエスト全体の処理時間（TestClient、
+ネットワークなし）と、直列化のみの時間を計測し、両者の出力が同じJSONであること・
+日本語が\\uエスケープされずUTF-8で出力されることを確認する。
+
+テキストはbench_text_compressionと同じ合成コーパス（OCR結果に近い日本語）を使用する。
+
+実行方法:
+    cd server
+    python -m benchmarks.bench_serialization --sizes 1,5,20
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from app.responses import HAS_ORJSON, FastJSONResponse
+from app.schemas import SummaryDetail
+from benchmarks.bench_text_compression import generate_page
+
+
+def build_detail(rng: random.Random, megabytes: float) -> Dict[str, Any]:
+    """元テキストがおよそ指定のサイズ（UTF-8）の要約詳細を作成する（要約テキストは元テキストの1/5）"""
+    pages: List[str] = []
+    size = 0
+    while size < megabytes * 1e6:
+        page = generate_page(rng, int(1200 * rng.uniform(0.7, 1.3)))
+        pages.append(page)
+        size += len(page.encode("utf-8"))
+    original_text = "\n\n".join(pages)
+    now = datetime.now()
+    return {
+        "id": uuid.uuid4(),
+        "title": "ベンチマーク用の書籍",
+        "description": "直列化の比較",
+        "custom_instructions": None,
+        "created_at": now,
+        "updated_at": now,
+        "original_text": original_text,
+        "summarized_text": "\n\n".join(pages[::5]),
+        "original_text_truncated": False,
+        "summarized_text_truncated": False,
+    }
+
+
+def create_app(detail: Dict[str, Any]) -> FastAPI:
+    """同じ要約詳細を標準・高速のレスポンスクラスで返すアプリケーション"""
+    app = FastAPI()
+
+    @app.get("/stdlib", response_model=SummaryDetail, response_class=JSONResponse)
+    def stdlib_detail() -> dict:
+        return detail
+
+    @app.get("/fast", response_model=SummaryDetail, response_class=FastJSONResponse)
+    def fast_detail() -> dict:
+        return detail
+
+    return app
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> float:
+    """処理時間の中央値（ミリ秒）"""
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="大きな要約レスポンスのJSON直列化の比較")
+    parser.add_argument("--sizes", default="1,5,20", help="元テキストのサイズ（MB、カンマ区切り）")
+    parser.add_argument("--repeat", type=int, default=20, help="計測回数")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"orjson: {'あり' if HAS_ORJSON else 'なし（標準のjsonで直列化）'}")
+    print(
+        f"{'元テキスト':>10} {'レスポンス':>10} {'リクエスト(標準)':>16} {'リクエスト(高速)':>16} "
+        f"{'直列化(標準)':>12} {'直列化(高速)':>12}"
+    )
+    for megabytes in [float(size) for size in args.sizes.split(",")]:
+        detail = build_detail(rng, megabytes)
+        client = TestClient(create_app(detail))
+
+        stdlib_body = client.get("/stdlib").content
+        fast_body = client.get("/fast").content
+        assert json.loads(stdlib_body) == json.loads(fast_body), "出力が一致しません"
+        assert b"\\u" not in fast_body, "日本語がエスケープされています"
+
+        content = SummaryDetail(**detail).model_dump(mode="json")
+        results = {
+            "request_stdlib": measure(lambda: client.get("/stdlib"), args.repeat),
+            "request_fast": measure(lambda: client.get("/fast"), args.repeat),
+            "render_stdlib": measure(lambda: JSONResponse(content), args.repeat),
+            "render_fast": measure(lambda: FastJSONResponse(content), args.repeat),
+        }
+        print(
+            f"{megabytes:>8.1f}MB {len(fast_body) / 1e6:>8.1f}MB "
+            f"{results['request_stdlib']:>14.1f}ms {results['request_fast']:>14.1f}ms "
+            f"{results['render_stdlib']:>10.1f}ms {results['render_fast']:>10.1f}ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
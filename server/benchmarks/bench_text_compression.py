@@ -0,0 +1,172 @@
+"""テキスト列の圧縮によるDBサイズと読み書き時間の比較
+
+OCR結果に近い日本語のページテキストを生成し、通常のText列と
+CompressedText列（zlib、インストールされていればzstd）のSQLiteデータベースに
+書き込んで、ファイルサイズ・一括書き込み時間・全件読み込み時間・
+1行読み込みのレイテンシを比較する。
+
+コーパスは語彙リストからZipf分布で単語を選んで文を作る合成データで、
+OCR結果のように一定の文字数で改行を入れる。実際の書籍より語彙が少ないため、
+圧縮率は実データより高めに出る可能性がある。
+
+実行方法:
+    cd server
+    python -m benchmarks.bench_text_compression --pages 3000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from sqlalchemy import Column, Integer, MetaData, Table, Text, create_engine, select
+
+from app.config import settings
+from app.models.types import HAS_ZSTD, CompressedText
+
+# 合成コーパス用の語彙（名詞・動詞・助詞・接続表現）
+_NOUNS = (
+    "経営 戦略 組織 市場 顧客 価値 競争 企業 事業 製品 技術 資本 利益 成長 社会 経済 歴史 文化 "
+    "人間 心理 行動 習慣 時間 問題 解決 方法 理論 実践 研究 分析 結果 原因 影響 関係 構造 変化 "
+    "情報 知識 教育 学習 言語 思考 判断 意思 決定 目標 計画 評価 改善 品質 効率 生産 管理 責任 "
+    "リーダー チーム プロジェクト データ システム プロセス モデル イノベーション マーケティング"
+).split()
+_VERBS = (
+    "考える 示す 述べる 説明する 理解する 変える 生み出す 求める 与える 持つ 見る 重視する "
+    "分析する 提案する 実現する 確認する 取り組む 高める 失う 選ぶ 作る 進める 支える 続ける"
+).split()
+_PARTICLES = ("は", "が", "を", "に", "で", "と", "の", "も", "から", "まで", "より")
+_CONNECTIVES = (
+    "しかし、", "そのため、", "つまり、", "一方で、", "さらに、", "例えば、", "このように、",
+    "したがって、", "ところが、", "まず、", "次に、", "最後に、",
+)
+_ENDINGS = ("。", "。", "。", "のである。", "と言える。", "ことが重要だ。", "のだろうか。")
+
+
+def _zipf_choice(rng: random.Random, words: List[str]) -> str:
+    """Zipf分布（出現頻度が順位に反比例）で単語を選ぶ"""
+    weights = [1 / (i + 1) for i in range(len(words))]
+    return rng.choices(words, weights)[0]
+
+
+def generate_page(rng: random.Random, length: int, line_width: int = 38) -> str:
+    """OCR結果に近い1ページ分のテキストを生成する"""
+    sentences: List[str] = []
+    total = 0
+    while total < length:
+        parts = []
+        if rng.random() < 0.3:
+            parts.append(rng.choice(_CONNECTIVES))
+        for _ in range(rng.randint(2, 5)):
+            parts.append(_zipf_choice(rng, _NOUNS) + rng.choice(_PARTICLES))
+        parts.append(_zipf_choice(rng, _VERBS) + rng.choice(_ENDINGS))
+        sentence = "".join(parts)
+        sentences.append(sentence)
+        total += len(sentence)
+    text = "".join(sentences)[:length]
+    # 1行ごとの改行（書籍の組版に合わせたOCR結果の形）
+    return "\n".join(text[i:i + line_width] for i in range(0, len(text), line_width))
+
+
+def run_codec(codec: str, pages: List[str], point_reads: int, work_dir: str) -> Dict[str, float]:
+    """1つの保存方式で書き込み・読み込みを計測する
+
+    Args:
+        codec: "text"（通常のText列）またはTEXT_COMPRESSIONの値
+        pages: 保存するページテキスト
+        point_reads: 1行読み込みの計測回数
+        work_dir: データベースを作成するディレクトリ
+
+    Returns:
+        計測結果
+    """
+    path = os.path.join(work_dir, f"{codec}.db")
+    engine = create_engine(f"sqlite:///{path}")
+    metadata = MetaData()
+    column_type = Text() if codec == "text" else CompressedText()
+    table = Table(
+        "pages", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("ocr_text", column_type),
+    )
+    metadata.create_all(engine)
+    if codec != "text":
+        settings.TEXT_COMPRESSION = codec
+
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(table.insert(), [{"id": i, "ocr_text": text} for i, text in enumerate(pages)])
+    write_seconds = time.perf_counter() - start
+
+    with engine.connect() as conn:
+        conn.exec_driver_sql("VACUUM")
+    size = os.path.getsize(path)
+
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        chars = sum(len(row.ocr_text) for row in conn.execute(select(table.c.ocr_text)))
+    read_all_seconds = time.perf_counter() - start
+    assert chars == sum(len(p) for p in pages)
+
+    rng = random.Random(0)
+    latencies = []
+    with engine.connect() as conn:
+        for _ in range(point_reads):
+            page_id = rng.randrange(len(pages))
+            start = time.perf_counter()
+            conn.execute(select(table.c.ocr_text).where(table.c.id == page_id)).scalar_one()
+            latencies.append(time.perf_counter() - start)
+    engine.dispose()
+
+    return {
+        "size_bytes": size,
+        "write_seconds": write_seconds,
+        "read_all_seconds": read_all_seconds,
+        "point_read_p50_us": statistics.median(latencies) * 1e6,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="テキスト列の圧縮によるDBサイズと読み書き時間の比較")
+    parser.add_argument("--pages", type=int, default=3000, help="ページ数")
+    parser.add_argument("--page-length", type=int, default=1200, help="1ページの文字数")
+    parser.add_argument("--point-reads", type=int, default=2000, help="1行読み込みの計測回数")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pages = [
+        generate_page(rng, int(args.page_length * rng.uniform(0.7, 1.3))) for _ in range(args.pages)
+    ]
+    raw_bytes = sum(len(p.encode("utf-8")) for p in pages)
+
+    codecs = ["text", "zlib"] + (["zstd"] if HAS_ZSTD else [])
+    original = settings.TEXT_COMPRESSION
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            for codec in codecs:
+                results[codec] = run_codec(codec, pages, args.point_reads, work_dir)
+    finally:
+        settings.TEXT_COMPRESSION = original
+
+    print(f"ページ数 {args.pages}, 本文 {raw_bytes / 1e6:.1f}MB (UTF-8)")
+    print(f"{'方式':<6} {'DBサイズ':>10} {'削減率':>7} {'書き込み':>9} {'全件読込':>9} {'1行読込p50':>11}")
+    base = results["text"]
+    for codec, r in results.items():
+        print(
+            f"{codec:<6} {r['size_bytes'] / 1e6:>8.2f}MB {1 - r['size_bytes'] / base['size_bytes']:>7.1%} "
+            f"{r['write_seconds'] * 1000:>7.0f}ms {r['read_all_seconds'] * 1000:>7.0f}ms "
+            f"{r['point_read_p50_us']:>9.1f}µs"
+        )
+    if not HAS_ZSTD:
+        print("\n(zstandardがインストールされていないため、zstdは計測していません)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,29 @@
+"""ベンチマーク用スタブの遅延・エラー率プロファイル
+
+アプリケーションをインポートせずに参照できるよう、スタブ本体とは分けて定義する。
+"""
+
+from dataclasses import dataclass
+from typing import Dict
+
+
+@dataclass(frozen=True)
+class LatencyProfile:
+    """スタブの遅延・エラー率の設定"""
+
+    ocr_latency: float
+    ocr_error_rate: float
+    llm_latency: float
+    llm_error_rate: float
+    seed: int = 42
+
+
+# 名前付きプロファイル（遅延は秒）
+PROFILES: Dict[str, LatencyProfile] = {
+    # 外部処理の遅延なし: フレームワークとDBのオーバーヘッドのみを計測する
+    "zero": LatencyProfile(ocr_latency=0.0, ocr_error_rate=0.0, llm_latency=0.0, llm_error_rate=0.0),
+    # 標準: 速いOCRとAPI、わずかなエラー
+    "default": LatencyProfile(ocr_latency=0.02, ocr_error_rate=0.01, llm_latency=0.05, llm_error_rate=0.02),
+    # 遅いAI API: レート制限が頻発する状況
+    "slow_llm": LatencyProfile(ocr_latency=0.02, ocr_error_rate=0.01, llm_latency=0.3, llm_error_rate=0.1),
+}
@@ -0,0 +1,94 @@
+"""ベンチマーク用のOCR・AIスタブ
+
+外部APIやOCRモデルを使わずにAPI全体の負荷試験を行うため、固定の遅延と
+エラー率を持つスタブを提供する。エラーの発生は乱数シードで決まるため、
+同じプロファイルで実行すれば毎回同じ順序でエラーが発生する。
+"""
+
+import random
+import threading
+import time
+from typing import Optional
+
+from app.exceptions import AIClientError, OCRProcessingError, RateLimitError
+from app.services.ocr_service import BaseOCRService
+from app.services.prompts import PromptTemplates
+from benchmarks.profiles import LatencyProfile
+
+
+class _FaultInjector:
+    """シード固定の乱数でエラーを発生させるかを判定する（スレッドセーフ）"""
+
+    def __init__(self, error_rate: float, seed: int):
+        self._error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def should_fail(self) -> bool:
+        if self._error_rate <= 0.0:
+            return False
+        with self._lock:
+            return self._random.random() < self._error_rate
+
+
+class StubOCRService(BaseOCRService):
+    """固定の遅延でダミーテキストを返すOCRサービス"""
+
+    engine_name = "stub"
+
+    def __init__(self, latency: float, error_rate: float, seed: int = 42):
+        super().__init__()
+        self._latency = latency
+        self._faults = _FaultInjector(error_rate, seed)
+
+    def process_image(self, image_path: str) -> str:
+        if self._latency > 0:
+            time.sleep(self._latency)
+        if self._faults.should_fail():
+            raise OCRProcessingError(f"スタブOCRエラー: {image_path}")
+        return f"ベンチマーク用のOCRテキスト: {image_path}\n" * 20
+
+
+class StubAIClient:
+    """固定の遅延で応答を返すAIクライアント
+
+    AIClientと同じcallインターフェースを持ち、エラー時はレート制限エラーを送出する。
+    """
+
+    model = "stub"
+
+    def __init__(self, latency: float, error_rate: float, seed: int = 42):
+        self._latency = latency
+        self._faults = _FaultInjector(error_rate, seed)
+
+    def call(
+        self,
+        prompt: str,
+        system_prompt: str = PromptTemplates.SYSTEM,
+        temperature: Optional[float] = None,
+    ) -> str:
+        if self._latency > 0:
+            time.sleep(self._latency)
+        if self._faults.should_fail():
+            raise RateLimitError()
+        if not prompt:
+            raise AIClientError("空のプロンプト")
+        return f"要約（{len(prompt)}文字）"
+
+
+def install_stubs(profile: LatencyProfile) -> None:
+    """アプリケーションのOCR・AIバックエンドをスタブに置き換える
+
+    OCRエンドポイントはリクエストごとにocr_service.ocr_serviceを参照し、
+    要約エンドポイントはsummary_serviceのclientを使用するため、
+    それぞれを差し替える。
+    """
+    from app.services import ocr_service as ocr_module
+    from app.services import summary_service
+
+    ocr_module.ocr_service = StubOCRService(
+        profile.ocr_latency, profile.ocr_error_rate, profile.seed
+    )
+    summary_service.client = StubAIClient(
+        profile.llm_latency, profile.llm_error_rate, profile.seed
+    )
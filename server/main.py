@@ -1,15 +1,22 @@
 import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse
 import os
 import logging
 import time
 import sys
 
 from app.api import api_router
+from app.compression import CompressionMiddleware
 from app.config import settings
 from app.database import engine, Base
+from app.metrics import CONTENT_TYPE_LATEST, HTTP_REQUEST_DURATION, registry
+from app.static_files import UploadStaticFiles
+from app.services.janitor import janitor
+from app.services.search_service import search_service
+from app.tracing import setup_tracing, shutdown_tracing, span
 
 # 直接標準エラー出力にメッセージを出力（デバッグ用）
 print("main.py が実行されました", file=sys.stderr)
@@ -21,8 +28,29 @@ logger = logging.getLogger(__name__)
 # データベースの初期化
 Base.metadata.create_all(bind=engine)
 
+# 全文検索インデックスの作成（空の場合は既存の要約をバックグラウンドで索引付けする）
+if settings.SEARCH_ENABLED:
+    search_service.setup()
+
+# トレーシングの初期化
+setup_tracing()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """アプリケーションの起動・終了処理"""
+    # 一時的な要約・古いジョブ・不要なファイルの定期清掃
+    if settings.JANITOR_ENABLED:
+        janitor.start()
+    yield
+    janitor.stop()
+    # 未送信のトレースを出力
+    shutdown_tracing()
+
+
 # FastAPIアプリケーションの作成
 app = FastAPI(
+    lifespan=lifespan,
     title=settings.APP_NAME,
     description="書籍画像要約サービス - 複数の書籍ページ画像をアップロードすると要約してくれるウェブアプリケーション",
     version="0.1.0",
@@ -40,31 +68,48 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# レスポンスの圧縮（Accept-Encodingに応じてzstd / br / gzip）
+app.add_middleware(CompressionMiddleware)
+
 # リクエストロギングミドルウェアの追加
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    start_time = time.time()
+    start_time = time.perf_counter()
+    
+    # リクエスト情報をログに記録（無効なレベルでは文字列を組み立てない）
+    logger.debug("リクエスト開始: %s %s", request.method, request.url.path)
     
-    # リクエスト情報をログに記録
-    logger.info(f"リクエスト開始: {request.method} {request.url.path}")
+    # リクエストの処理（配下の処理はこのスパンの子スパンになる）
+    with span(f"{request.method} {request.url.path}", **{"http.method": request.method}) as request_span:
+        response = await call_next(request)
     
-    # リクエストの処理
-    response = await call_next(request)
+        # 処理時間の計算
+        process_time = time.perf_counter() - start_time
     
-    # 処理時間の計算
-    process_time = time.time() - start_time
+        # ルートのパステンプレート単位で処理時間を記録（未定義パスは集約してラベル数を抑える）
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", None) or "unmatched"
+        HTTP_REQUEST_DURATION.labels(
+            request.method, route_path, str(response.status_code)
+        ).observe(process_time)
+        request_span.update_name(f"{request.method} {route_path}")
+        request_span.set_attribute("http.route", route_path)
+        request_span.set_attribute("http.status_code", response.status_code)
     
     # レスポンス情報をログに記録
-    logger.info(f"リクエスト完了: {request.method} {request.url.path} - ステータス: {response.status_code} - 処理時間: {process_time:.4f}秒")
+    logger.info(
+        "リクエスト完了: %s %s - ステータス: %d - 処理時間: %.4f秒",
+        request.method, request.url.path, response.status_code, process_time,
+    )
     
     return response
 
 # APIルーターの登録
 app.include_router(api_router, prefix="/api")
 
-# アップロードディレクトリを静的ファイルとして提供
+# アップロードディレクトリを静的ファイルとして提供（ETag・Cache-Control・Range対応）
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
+app.mount("/uploads", UploadStaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
 
 # アプリケーション起動時のログ
 logger.info(f"{settings.APP_NAME} アプリケーションが起動しました")
@@ -79,6 +124,12 @@ def read_root():
     }
 
 
+# メトリクスエンドポイント（Prometheusテキスト形式）
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE_LATEST)
+
+
 # 開発サーバー起動（直接実行時のみ）
 if __name__ == "__main__":
     uvicorn.run(
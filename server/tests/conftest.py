@@ -0,0 +1,21 @@
+"""テストの共通設定
+
+アプリケーションのモジュールはインポート時に設定を読み込み、データベースのエンジンを
+作成するため、インポートより前に外部のサービス（PostgreSQL・AI API・Redis等）を
+使わない設定にする。データベースは一時ディレクトリのSQLiteを使用する。
+"""
+
+import os
+import tempfile
+
+_TEST_DIR = tempfile.mkdtemp(prefix="text_summarizer_test_")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TEST_DIR, 'test.db')}"
+os.environ["UPLOAD_DIR"] = os.path.join(_TEST_DIR, "uploads")
+os.environ["LOG_DIR"] = os.path.join(_TEST_DIR, "logs")
+os.environ["LOG_LEVEL"] = "WARNING"
+os.environ["TRACING_EXPORTER"] = "none"
+os.environ["SEARCH_ENABLED"] = "false"
+os.environ["JANITOR_ENABLED"] = "false"
+os.environ.pop("RATE_LIMIT_REDIS_URL", None)
+os.environ.pop("GENERATE_CALLBACK_URL", None)
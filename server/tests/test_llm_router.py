@@ -0,0 +1,221 @@
+"""ModelRouter（app/services/llm_router.py）のテスト
+
+AI APIは呼び出さず、ローカルのスタブクライアントとLiteLLMのcompletionの差し替えで確認する。
+"""
+
+import importlib
+import time
+from types import SimpleNamespace
+from typing import List, Optional
+
+import pytest
+
+from app.config import settings
+from app.exceptions import APIConnectionError, ProviderUnavailableError, RateLimitError
+from app.services import llm_router
+from app.services.llm_router import ERROR_HALF_LIFE_SECONDS, SMOOTHING, ModelRouter
+
+# app.servicesのsummary_serviceはシングルトンインスタンスのため、モジュールはimportlibで取得する
+summary_module = importlib.import_module("app.services.summary_service")
+
+
+class StubClient:
+    """応答またはエラーを順に返すAIクライアントのスタブ
+
+    応答を使い切った後は最後の応答を繰り返す。
+    """
+
+    def __init__(self, model: str, *responses):
+        self.model = model
+        self._responses = list(responses) or [f"{model}の応答"]
+        self.calls = 0
+
+    def call(self, prompt: str, system_prompt: str = "", temperature: Optional[float] = None) -> str:
+        response = self._responses[min(self.calls, len(self._responses) - 1)]
+        self.calls += 1
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture(autouse=True)
+def router_settings(monkeypatch):
+    """リトライの待ち時間を固定し、実際には待たないようにする"""
+    sleeps: List[float] = []
+    monkeypatch.setattr(settings, "AI_MAX_RETRIES", 3)
+    monkeypatch.setattr(settings, "AI_RETRY_DELAY", 1)
+    monkeypatch.setattr(settings, "AI_ROUTER_COOLDOWN_SECONDS", 30)
+    monkeypatch.setattr(settings, "AI_RATE_LIMIT_JITTER", 0.0)
+    monkeypatch.setattr(llm_router.time, "sleep", sleeps.append)
+    return sleeps
+
+
+@pytest.mark.parametrize(
+    "error",
+    [RateLimitError(), ProviderUnavailableError("openai", 503), APIConnectionError("openai")],
+    ids=["429", "5xx", "connection"],
+)
+def test_fails_over_to_next_model(error):
+    primary = StubClient("primary", error)
+    secondary = StubClient("secondary")
+    router = ModelRouter([primary, secondary])
+
+    assert router.call("本文") == "secondaryの応答"
+    assert (primary.calls, secondary.calls) == (1, 1)
+    assert router.routes[0].error_rate == pytest.approx(SMOOTHING)
+    assert router.routes[0].cooling(time.monotonic())
+
+
+def test_does_not_fail_over_on_other_errors():
+    primary = StubClient("primary", ValueError("不正なリクエスト"))
+    secondary = StubClient("secondary")
+    router = ModelRouter([primary, secondary])
+
+    with pytest.raises(ValueError):
+        router.call("本文")
+    assert secondary.calls == 0
+
+
+def test_cooling_model_is_skipped_until_cooldown_ends():
+    primary = StubClient("primary", RateLimitError(), "primaryの応答")
+    secondary = StubClient("secondary")
+    router = ModelRouter([primary, secondary])
+
+    router.call("本文")
+    router.call("本文")
+    assert (primary.calls, secondary.calls) == (1, 2)
+
+    # 後回しにする期間が終わると、設定の順で再び選ばれる
+    router.routes[0].cooldown_until = 0.0
+    router.routes[0].error_rate = 0.0
+    assert router.call("本文") == "primaryの応答"
+
+
+def test_cooldown_uses_retry_after_or_setting():
+    router = ModelRouter([StubClient("a", RateLimitError(retry_after=5)), StubClient("b", RateLimitError())])
+    now = time.monotonic()
+    with pytest.raises(RateLimitError):
+        router.call("本文")
+
+    assert router.routes[0].cooldown_until - now == pytest.approx(5, abs=1)
+    assert router.routes[1].cooldown_until - now == pytest.approx(30, abs=1)
+
+
+def test_backoff_is_capped_by_retry_delay(router_settings):
+    primary = StubClient("primary", ProviderUnavailableError("openai", 502))
+    secondary = StubClient("secondary", RateLimitError())
+    router = ModelRouter([primary, secondary])
+
+    with pytest.raises(RateLimitError):
+        router.call("本文")
+
+    # 待ち時間は後回しの期限（30秒後）ではなくAI_RETRY_DELAY * 2^(試行回数 - 1)まで
+    assert router_settings == [1, 2]
+    # 全てのモデルが後回しの期間中のリトライでは、最も早く期間が終わるモデルのみ呼び出す
+    assert primary.calls + secondary.calls == 2 + (settings.AI_MAX_RETRIES - 1)
+
+
+def test_backoff_waits_only_until_earliest_model_is_available(router_settings, monkeypatch):
+    monkeypatch.setattr(settings, "AI_RETRY_DELAY", 100)
+    flaky = StubClient("flaky", RateLimitError(retry_after=2), "flakyの応答")
+    router = ModelRouter([flaky])
+
+    assert router.call("本文") == "flakyの応答"
+    assert len(router_settings) == 1
+    assert 1.5 < router_settings[0] <= 2
+
+
+def test_unused_model_is_tried_first():
+    measured = StubClient("measured")
+    unused = StubClient("unused")
+    router = ModelRouter([measured, unused])
+    router.routes[0].latency = 0.1
+
+    router.call("本文")
+    assert unused.calls == 1
+
+
+def test_selects_model_with_lower_latency():
+    slow = StubClient("slow")
+    fast = StubClient("fast")
+    router = ModelRouter([slow, fast])
+    router.routes[0].latency = 2.0
+    router.routes[1].latency = 0.5
+
+    router.call("本文")
+    assert (slow.calls, fast.calls) == (0, 1)
+
+
+def test_selects_model_with_lower_error_rate():
+    flaky = StubClient("flaky")
+    stable = StubClient("stable")
+    router = ModelRouter([flaky, stable])
+    now = time.monotonic()
+    router.routes[0].latency, router.routes[0].error_rate, router.routes[0].error_updated = 0.5, 0.8, now
+    router.routes[1].latency = 1.0
+
+    router.call("本文")
+    assert (flaky.calls, stable.calls) == (0, 1)
+
+    # エラー率は時間とともに減衰し、再び優先の高いモデルが選ばれる
+    router.routes[0].error_updated = now - 10 * ERROR_HALF_LIFE_SECONDS
+    router.call("本文")
+    assert flaky.calls == 1
+
+
+def test_latency_and_error_rate_are_exponential_moving_averages():
+    router = ModelRouter([StubClient("a")])
+    route = router.routes[0]
+    route.latency = 1.0
+    route.error_rate = 0.5
+    route.error_updated = time.monotonic()
+
+    router._record_success(route, 2.0, 0.4)
+    assert route.latency == pytest.approx(1.0 + SMOOTHING * (2.0 - 1.0))
+    assert route.error_rate == pytest.approx(0.5 * (1 - SMOOTHING), rel=1e-3)
+    assert route.rate_limit_remaining == 0.4
+
+    router._record_failure(route, RateLimitError())
+    error_rate = 0.5 * (1 - SMOOTHING)
+    assert route.error_rate == pytest.approx(error_rate + SMOOTHING * (1 - error_rate), rel=1e-3)
+
+
+def test_low_rate_limit_budget_is_deprioritized():
+    exhausted = StubClient("exhausted")
+    spare = StubClient("spare")
+    router = ModelRouter([exhausted, spare])
+    now = time.monotonic()
+    router.routes[0].latency, router.routes[0].rate_limit_remaining, router.routes[0].budget_updated = 0.5, 0.01, now
+    router.routes[1].latency = 1.0
+
+    router.call("本文")
+    assert (exhausted.calls, spare.calls) == (0, 1)
+
+
+def test_each_model_is_called_with_its_own_api_key_and_base(monkeypatch):
+    monkeypatch.setattr(settings, "AI_RATE_LIMIT_ENABLED", False)
+    requests = []
+
+    def fake_completion(**kwargs):
+        requests.append(kwargs)
+        if kwargs["model"] == "openai/gpt-4o":
+            raise summary_module.LiteLLMInternalServerError(
+                message="unavailable", llm_provider="openai", model="gpt-4o"
+            )
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="ローカルの応答"))],
+            usage=None,
+        )
+
+    monkeypatch.setattr(summary_module, "completion", fake_completion)
+    router = ModelRouter([
+        summary_module.AIClient("openai/gpt-4o", "sk-primary"),
+        summary_module.AIClient("openai/local-model", None, "http://localhost:8000/v1"),
+    ])
+
+    assert router.call("本文") == "ローカルの応答"
+    assert [(r["model"], r.get("api_key"), r.get("api_base")) for r in requests] == [
+        ("openai/gpt-4o", "sk-primary", None),
+        ("openai/local-model", None, "http://localhost:8000/v1"),
+    ]
+    assert all(r["max_retries"] == 0 for r in requests)
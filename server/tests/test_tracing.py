@@ -0,0 +1,170 @@
+"""トレーシング（app/tracing.py）のテスト
+
+TRACING_EXPORTER=jsonでJSON Linesのファイルに出力したスパンを読み込み、
+スパンの親子関係・スレッドをまたいだコンテキストの引き継ぎ・終了時の出力を確認する。
+OCR・AI APIはスタブとLiteLLMのcompletionの差し替えで置き換える。
+"""
+
+import importlib
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Dict, List
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image as PILImage
+
+from app import tracing
+from app.config import settings
+from app.services.llm_router import ModelRouter
+from app.services.ocr_service import BaseOCRService
+from app.tracing import shutdown_tracing, span, submit_with_context
+
+# app.servicesではモジュールと同名のシングルトンインスタンスを公開しているため、モジュールはimportlibで取得する
+ocr_module = importlib.import_module("app.services.ocr_service")
+summary_module = importlib.import_module("app.services.summary_service")
+
+
+class StubOCRService(BaseOCRService):
+    """固定のテキストを返すOCRサービス"""
+
+    engine_name = "stub"
+
+    def process_image(self, image_path: str) -> str:
+        return "テスト用のOCRテキスト。\n" * 20
+
+
+def fake_completion(**kwargs):
+    """LiteLLMのcompletionの代わりに固定の応答を返す"""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content="テスト用の要約"))],
+        usage=SimpleNamespace(prompt_tokens=120, completion_tokens=30, prompt_tokens_details=None),
+    )
+
+
+@pytest.fixture
+def trace_path(tmp_path, monkeypatch):
+    """JSONファイルのエクスポーターでトレーシングを初期化する"""
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(settings, "TRACING_EXPORTER", "json")
+    monkeypatch.setattr(settings, "TRACING_JSON_PATH", str(path))
+    tracing.setup_tracing()
+    yield path
+    shutdown_tracing()
+
+
+def read_spans(path) -> List[dict]:
+    """出力されたスパンを読み込む"""
+    if not path.exists():
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def ancestors(target: dict, spans: List[dict]) -> List[str]:
+    """スパンの祖先のスパン名（近い順）"""
+    by_id: Dict[str, dict] = {s["context"]["span_id"]: s for s in spans}
+    names = []
+    parent_id = target["parent_id"]
+    while parent_id in by_id:
+        parent = by_id[parent_id]
+        names.append(parent["name"])
+        parent_id = parent["parent_id"]
+    return names
+
+
+def find(spans: List[dict], name: str) -> dict:
+    matches = [s for s in spans if s["name"] == name]
+    assert matches, f"スパンがありません: {name}（{sorted({s['name'] for s in spans})}）"
+    return matches[0]
+
+
+def png_bytes() -> bytes:
+    buffer = io.BytesIO()
+    PILImage.new("RGB", (64, 64), "white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_request_spans_contain_ocr_and_llm_spans(trace_path, monkeypatch):
+    import main
+
+    monkeypatch.setattr(settings, "AI_RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(ocr_module, "ocr_service", StubOCRService())
+    monkeypatch.setattr(summary_module, "completion", fake_completion)
+    monkeypatch.setattr(
+        summary_module.summary_service, "client", ModelRouter([summary_module.AIClient("openai/gpt-4o", "sk-test")])
+    )
+    # ライフスパン（終了時にトレーシングを終了する）は実行しない
+    client = TestClient(main.app)
+
+    response = client.post(
+        "/api/summaries",
+        json={"title": "トレースのテスト", "original_text": "本文", "summarized_text": "要約"},
+    )
+    summary_id = response.json()["id"]
+    response = client.post(
+        "/api/images/upload",
+        params={"summary_id": summary_id},
+        files=[("files", ("page.png", png_bytes(), "image/png"))],
+    )
+    image_id = response.json()[0]["id"]
+
+    assert client.post("/api/ocr/process", json={"image_ids": [image_id]}).status_code == 200
+    assert client.post("/api/summaries/generate", json={"summary_id": summary_id}).status_code == 200
+    shutdown_tracing()
+
+    spans = read_spans(trace_path)
+    ocr_span = find(spans, "ocr.process_image")
+    assert "POST /api/ocr/process" in ancestors(ocr_span, spans)
+    assert ocr_span["attributes"]["ocr.engine"] == "stub"
+
+    llm_span = find(spans, "llm.call")
+    assert "POST /api/summaries/generate" in ancestors(llm_span, spans)
+    assert "llm.route" in ancestors(llm_span, spans)
+    assert llm_span["attributes"]["llm.prompt_tokens"] == 120
+    assert llm_span["attributes"]["llm.completion_tokens"] == 30
+
+    request_span = find(spans, "POST /api/summaries/generate")
+    assert request_span["parent_id"] is None
+    assert request_span["attributes"]["http.route"] == "/api/summaries/generate"
+    assert llm_span["context"]["trace_id"] == request_span["context"]["trace_id"]
+
+
+def test_submit_with_context_propagates_trace_to_thread(trace_path):
+    def work(name: str) -> None:
+        with span(name):
+            pass
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with span("parent"):
+            submit_with_context(executor, work, "with_context").result()
+            executor.submit(work, "without_context").result()
+    shutdown_tracing()
+
+    spans = read_spans(trace_path)
+    parent = find(spans, "parent")
+    child = find(spans, "with_context")
+    assert child["parent_id"] == parent["context"]["span_id"]
+    assert child["context"]["trace_id"] == parent["context"]["trace_id"]
+
+    # エグゼキューターにそのまま投入した処理は別のトレースになる
+    orphan = find(spans, "without_context")
+    assert orphan["parent_id"] is None
+    assert orphan["context"]["trace_id"] != parent["context"]["trace_id"]
+
+
+def test_shutdown_flushes_pending_spans(trace_path):
+    with span("pending", **{"test.attribute": "値", "test.none": None}):
+        pass
+    # バッチの送信間隔より前に終了しても、未送信のスパンが出力される
+    shutdown_tracing()
+
+    pending = find(read_spans(trace_path), "pending")
+    assert pending["attributes"] == {"test.attribute": "値"}
+
+    # 終了後のスパン操作は何もしない
+    with span("after_shutdown") as after:
+        after.set_attribute("ignored", True)
+    assert all(s["name"] != "after_shutdown" for s in read_spans(trace_path))